@@ -1,6 +1,9 @@
 #!/usr/bin/env python
 from app import create_app, db
-from app.models import User, Department, DepartmentTracking
+from app.analytics import record_entry_in_rollup
+from app.cache import ACTIVITY_DATA, bump_data_version
+from app.custom_fields import record_custom_field_values
+from app.models import User, Department, DepartmentTracking, TrackingField
 from datetime import datetime, timedelta
 
 app = create_app()
@@ -103,9 +106,15 @@ with app.app_context():
         }
     ]
     
-    # Add activity entries
+    # Add activity entries through the same helpers as add_department_entry, so the
+    # rollup, typed field values, entry numbers and cache versions stay in step
+    fields_by_dept = {}
+    for field in TrackingField.query.order_by(TrackingField.order).all():
+        fields_by_dept.setdefault(field.department_id, []).append(field)
+
     for activity in activities:
         date_logged = datetime.utcnow() - timedelta(days=activity['days_ago'])
+        tracking_fields = fields_by_dept.get(activity['department_id'], [])
         
         entry = DepartmentTracking(
             user_id=activity['user_id'],
@@ -117,8 +126,16 @@ with app.app_context():
             frequency_per_day=activity['frequency'],
             date_logged=date_logged
         )
+
+        entry_no = Department.allocate_entry_no(activity['department_id'])
+        if any(field.field_name == 'entry_no' for field in tracking_fields):
+            entry.set_custom_fields_data({'entry_no': entry_no})
+
+        record_custom_field_values(entry, tracking_fields)
         db.session.add(entry)
-    
+        record_entry_in_rollup(entry)
+
+    bump_data_version(ACTIVITY_DATA)
     db.session.commit()
     print(f"✓ Added {len(activities)} test activities to the database!")
     print(f"  - {len([a for a in activities if a['user_id'] == admin_user.id])} entries by admin")
@@ -35,6 +35,19 @@ def create_app():
     # Session Configuration
     app.config['SESSION_COOKIE_SECURE'] = is_production
     app.permanent_session_lifetime = 3600
+    
+    # Per-worker cache of management chart payloads (number of filter sets kept)
+    app.config['ANALYTICS_CACHE_SIZE'] = int(os.environ.get('ANALYTICS_CACHE_SIZE', 512))
+    # Per-worker cache of logged-in user identities: entries kept and their lifetime (seconds, 0 disables)
+    app.config['USER_CACHE_SIZE'] = int(os.environ.get('USER_CACHE_SIZE', 1024))
+    app.config['USER_CACHE_TTL'] = int(os.environ.get('USER_CACHE_TTL', 30))
+
+    # Worker processes used to build the per-department sheets of the XLSX export
+    app.config['EXPORT_WORKERS'] = int(os.environ.get('EXPORT_WORKERS', min(4, os.cpu_count() or 1)))
+    # Background export jobs: artifact directory, reuse/retention window (seconds) and worker threads
+    app.config['EXPORT_JOB_DIR'] = os.environ.get('EXPORT_JOB_DIR', os.path.join(app.instance_path, 'exports'))
+    app.config['EXPORT_JOB_TTL'] = int(os.environ.get('EXPORT_JOB_TTL', 900))
+    app.config['EXPORT_JOB_THREADS'] = int(os.environ.get('EXPORT_JOB_THREADS', 2))
 
     db.init_app(app)
     bcrypt.init_app(app)
@@ -42,6 +55,12 @@ def create_app():
     login_manager.login_view = 'main.login'
     login_manager.login_message = 'Please log in to access this page.'
 
+    from app.analytics import analytics_cache
+    analytics_cache.max_size = app.config['ANALYTICS_CACHE_SIZE']
+    from app.cache import user_identity_cache
+    user_identity_cache.max_size = app.config['USER_CACHE_SIZE']
+    user_identity_cache.ttl = app.config['USER_CACHE_TTL']
+
     from app.routes import main
     app.register_blueprint(main)
 
@@ -0,0 +1,613 @@
+"""
+Aggregation helpers shared by the management views and analytics APIs.
+All stats are computed with grouped SQL queries instead of loading rows into Python.
+
+Chart APIs read from ActivityRollup, which is kept in step with DepartmentTracking
+by record_entry_in_rollup()/remove_user_from_rollup() and can be rebuilt from
+scratch with rebuild_activity_rollup() (see rebuild_activity_rollup.py).
+Chart payloads are cached per filter set in analytics_cache until the ACTIVITY_DATA
+version is bumped by a write.
+
+Anything that writes DepartmentTracking rows outside add_department_entry (seed and
+import scripts, manual fixes) must do what that route does: record_entry_in_rollup() and
+record_custom_field_values() for each entry, then bump_data_version(ACTIVITY_DATA) before
+committing. Bulk loads can instead run rebuild_activity_rollup() and
+backfill_custom_field_values() afterwards. Rows written any other way never reach the
+management views.
+"""
+
+from app import db
+from app.buckets import day_bucket, hour_bucket, weekday_bucket, weekday_index
+from app.cache import ACTIVITY_DATA, VersionedLRUCache, bump_data_version, get_data_version
+from app.filters import ActivityFilter
+from app.models import ROLLUP_KEY_COLUMNS, User, DepartmentTracking, ActivityRollup, TrackingFieldValue
+from datetime import datetime, timedelta
+from sqlalchemy import and_, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import aliased
+
+
+def department_totals_query(dept_ids):
+    """All-time (entry_count, total_duration) per department, summed from the rollup."""
+    return db.session.query(
+        ActivityRollup.department_id,
+        func.sum(ActivityRollup.entry_count),
+        func.coalesce(func.sum(ActivityRollup.duration_total), 0)
+    ).filter(
+        ActivityRollup.department_id.in_(dept_ids)
+    ).group_by(ActivityRollup.department_id)
+
+
+def user_counts_by_department():
+    """{department_id: number of users}, in one grouped query on the indexed User.department_id."""
+    return dict(
+        db.session.query(User.department_id, func.count(User.id)).group_by(User.department_id).all()
+    )
+
+
+def department_stats(departments):
+    """
+    Compute per-department entry count, total/average duration and user count.
+
+    Returns: {
+        'department_stats': [{'id', 'name', 'total_entries', 'total_duration', 'avg_duration', 'users_count'}],
+        'total_entries': int,
+        'total_duration': int
+    }
+    """
+    dept_ids = [d.id for d in departments]
+
+    entry_totals = {}
+    if dept_ids:
+        rows = department_totals_query(dept_ids).all()
+        entry_totals = {r[0]: (int(r[1] or 0), int(r[2] or 0)) for r in rows}
+
+    user_counts = user_counts_by_department()
+
+    stats = []
+    total_all_entries = 0
+    total_all_duration = 0
+
+    for dept in departments:
+        total_entries, total_duration = entry_totals.get(dept.id, (0, 0))
+        avg_duration = total_duration / total_entries if total_entries > 0 else 0
+
+        stats.append({
+            'id': dept.id,
+            'name': dept.name,
+            'total_entries': total_entries,
+            'total_duration': total_duration,
+            'avg_duration': round(avg_duration, 2),
+            'users_count': user_counts.get(dept.id, 0)
+        })
+
+        total_all_entries += total_entries
+        total_all_duration += total_duration
+
+    return {
+        'department_stats': stats,
+        'total_entries': total_all_entries,
+        'total_duration': total_all_duration
+    }
+
+
+def today_totals_statement(flt):
+    return flt.cached('today_totals', lambda: db.select(
+        func.count(DepartmentTracking.id),
+        func.coalesce(func.sum(DepartmentTracking.duration_mins), 0)
+    ))
+
+
+def today_totals():
+    """Return (entry_count, total_duration) for entries logged today (UTC)."""
+    flt = ActivityFilter.for_day(datetime.utcnow().date())
+    count, duration = db.session.execute(today_totals_statement(flt), flt.params()).one()
+
+    return count, int(duration or 0)
+
+
+def user_totals_query(user_id, department_id):
+    return db.session.query(
+        func.coalesce(func.sum(ActivityRollup.entry_count), 0),
+        func.coalesce(func.sum(ActivityRollup.duration_total), 0)
+    ).filter(
+        ActivityRollup.user_id == user_id,
+        ActivityRollup.department_id == department_id
+    )
+
+
+def user_activity_totals(user_id, department_id):
+    """Return (entry_count, total_duration) for one user's entries in a department, from the rollup."""
+    count, duration = user_totals_query(user_id, department_id).one()
+
+    return int(count or 0), int(duration or 0)
+
+
+# --------------------------
+# Activity rollup maintenance
+# --------------------------
+def _rollup_key(date_logged, department_id, user_id, priority, ticket_request_type, status):
+    return (date_logged.date(), weekday_index(date_logged), date_logged.hour,
+            department_id, user_id, priority or '', ticket_request_type or '', status or '')
+
+
+def record_entry_in_rollup(entry):
+    """
+    Add a new DepartmentTracking entry to the rollup.
+    Runs in the caller's session so it commits (or rolls back) together with the entry.
+    """
+    if entry.date_logged is None:
+        db.session.flush()  # apply the date_logged column default
+
+    key = dict(zip(ROLLUP_KEY_COLUMNS, _rollup_key(
+        entry.date_logged, entry.department_id, entry.user_id,
+        entry.priority, entry.ticket_request_type, entry.status
+    )))
+    duration = entry.duration_mins or 0
+
+    # One INSERT ... ON CONFLICT DO UPDATE on uq_activity_rollup_key, so concurrent first writes
+    # for a key cannot add duplicate rows and increments are never lost
+    dialect = postgresql if db.engine.dialect.name == 'postgresql' else sqlite
+    insert = dialect.insert(ActivityRollup).values(entry_count=1, duration_total=duration, **key)
+    db.session.execute(insert.on_conflict_do_update(
+        index_elements=list(ROLLUP_KEY_COLUMNS),
+        set_={
+            'entry_count': ActivityRollup.entry_count + insert.excluded.entry_count,
+            'duration_total': ActivityRollup.duration_total + insert.excluded.duration_total
+        }
+    ))
+
+
+def remove_user_from_rollup(user_id):
+    """Drop all rollup rows for a user whose activity logs are being deleted."""
+    ActivityRollup.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+
+
+def fill_missing_tracking_buckets():
+    """Compute log_day/log_weekday/log_hour in SQL for entries written before those columns existed."""
+    return DepartmentTracking.query.filter(DepartmentTracking.log_day.is_(None)).update({
+        DepartmentTracking.log_day: day_bucket(DepartmentTracking.date_logged),
+        DepartmentTracking.log_weekday: weekday_bucket(DepartmentTracking.date_logged),
+        DepartmentTracking.log_hour: hour_bucket(DepartmentTracking.date_logged)
+    }, synchronize_session=False)
+
+
+def rebuild_activity_rollup():
+    """
+    Recompute the whole rollup from DepartmentTracking (backfills and repairs).
+    Runs as a single INSERT ... SELECT ... GROUP BY on the precomputed time bucket columns.
+    Returns the number of rollup rows written. The caller commits.
+    """
+    fill_missing_tracking_buckets()
+    ActivityRollup.query.delete(synchronize_session=False)
+
+    # Stored as '' rather than NULL (see ActivityRollup)
+    key_texts = [func.coalesce(column, '') for column in (
+        DepartmentTracking.priority, DepartmentTracking.ticket_request_type, DepartmentTracking.status
+    )]
+
+    grouped = db.select(
+        DepartmentTracking.log_day,
+        DepartmentTracking.log_weekday,
+        DepartmentTracking.log_hour,
+        DepartmentTracking.department_id,
+        DepartmentTracking.user_id,
+        *key_texts,
+        func.count(DepartmentTracking.id),
+        func.coalesce(func.sum(DepartmentTracking.duration_mins), 0)
+    ).group_by(
+        DepartmentTracking.log_day,
+        DepartmentTracking.log_weekday,
+        DepartmentTracking.log_hour,
+        DepartmentTracking.department_id,
+        DepartmentTracking.user_id,
+        *key_texts
+    )
+    db.session.execute(
+        ActivityRollup.__table__.insert().from_select(
+            list(ROLLUP_KEY_COLUMNS) + ['entry_count', 'duration_total'], grouped
+        )
+    )
+
+    bump_data_version(ACTIVITY_DATA)
+    return db.session.query(func.count(ActivityRollup.id)).scalar()
+
+
+def rollup_needs_backfill():
+    """True when there are tracking entries but the rollup has never been populated."""
+    has_rollup = db.session.query(ActivityRollup.id).first() is not None
+    if has_rollup:
+        return False
+    return db.session.query(DepartmentTracking.id).first() is not None
+
+
+# --------------------------
+# Management dashboard series
+# --------------------------
+# Rollup dimensions each chart groups by, and which of the dept/priority filters it honours.
+# Date filters (start/end) apply to every chart.
+DASHBOARD_SERIES = {
+    'activities_by_dept': {'dims': ('department_id',), 'filters': ('dept', 'priority')},
+    'duration_by_dept': {'dims': ('department_id', 'priority'), 'filters': ('dept', 'priority')},
+    'avg_duration_by_dept': {'dims': ('department_id',), 'filters': ('dept', 'priority')},
+    'activities_over_time': {'dims': ('day',), 'filters': ('dept',)},
+    'top_users': {'dims': ('user_id',), 'filters': ('dept',)},
+    'users_by_dept': {'dims': ('department_id', 'user_id'), 'filters': ()},
+    'ticket_types': {'dims': ('ticket_request_type',), 'filters': ('dept', 'priority')},
+    'day_hour_heatmap': {'dims': ('weekday', 'hour'), 'filters': ('dept', 'priority')},
+}
+
+WEEKDAYS = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+
+
+def _reads_rollup(name, users_mode):
+    return name != 'users_by_dept' or users_mode == 'active'
+
+
+def _over_time_window(start_date, end_date):
+    """Default window for activities_over_time: the 30 days ending at end (or today)."""
+    window_end = end_date or datetime.utcnow().date()
+    window_start = start_date or window_end - timedelta(days=29)
+    return window_start, window_end
+
+
+def rollup_rows_query(dims, start_date, end_date, dept_id, priority):
+    """Grouped rollup query over the union of dimensions the requested charts need."""
+    columns = [getattr(ActivityRollup, d) for d in dims]
+    q = db.session.query(
+        *columns,
+        func.sum(ActivityRollup.entry_count).label('entry_count'),
+        func.sum(ActivityRollup.duration_total).label('duration_total')
+    )
+    if start_date:
+        q = q.filter(ActivityRollup.day >= start_date)
+    if end_date:
+        q = q.filter(ActivityRollup.day <= end_date)
+    if dept_id is not None:
+        q = q.filter(ActivityRollup.department_id == dept_id)
+    if priority:
+        q = q.filter(ActivityRollup.priority == priority)
+    if columns:
+        q = q.group_by(*columns)
+    return q
+
+
+def _fetch_rollup_rows(dims, start_date, end_date, dept_id, priority):
+    """One grouped pass over the rollup."""
+    return rollup_rows_query(dims, start_date, end_date, dept_id, priority).all()
+
+
+def _rows_for(rows, name, ctx):
+    """Apply the filters that could not be pushed into SQL for this chart."""
+    spec = DASHBOARD_SERIES[name]
+    if 'dept' in spec['filters'] and ctx['dept_id'] is not None and 'department_id' in ctx['python_filters']:
+        rows = [r for r in rows if r.department_id == ctx['dept_id']]
+    if 'priority' in spec['filters'] and ctx['priority'] and 'priority' in ctx['python_filters']:
+        rows = [r for r in rows if r.priority == ctx['priority']]
+    if name == 'activities_over_time' and 'day' in ctx['python_filters']:
+        window_start, window_end = _over_time_window(ctx['start_date'], ctx['end_date'])
+        rows = [r for r in rows if window_start <= r.day <= window_end]
+    return rows
+
+
+def _chart_departments(ctx, honour_dept=True):
+    departments = ctx['departments']
+    if honour_dept and ctx['dept_id'] is not None:
+        departments = [d for d in departments if d.id == ctx['dept_id']]
+    return departments
+
+
+def _series_activities_by_dept(rows, ctx):
+    counts = {}
+    for r in rows:
+        counts[r.department_id] = counts.get(r.department_id, 0) + int(r.entry_count or 0)
+    departments = _chart_departments(ctx)
+    return {'labels': [d.name for d in departments], 'counts': [counts.get(d.id, 0) for d in departments]}
+
+
+def _series_duration_by_dept(rows, ctx):
+    # NULL priorities are reported as 'Other'
+    totals = {}
+    priority_set = set()
+    for r in rows:
+        pval = r.priority or 'Other'
+        priority_set.add(pval)
+        totals[(r.department_id, pval)] = totals.get((r.department_id, pval), 0) + int(r.duration_total or 0)
+
+    priorities = sorted(priority_set) if priority_set else ['High', 'Medium', 'Low', 'Other']
+    departments = _chart_departments(ctx)
+
+    series = []
+    for pr in priorities:
+        series.append({'priority': pr, 'durations': [totals.get((d.id, pr), 0) for d in departments]})
+
+    return {'labels': [d.name for d in departments], 'priorities': priorities, 'series': series}
+
+
+def _series_avg_duration_by_dept(rows, ctx):
+    totals = {}
+    for r in rows:
+        count, total = totals.get(r.department_id, (0, 0))
+        totals[r.department_id] = (count + int(r.entry_count or 0), total + int(r.duration_total or 0))
+
+    departments = _chart_departments(ctx)
+    averages = []
+    for d in departments:
+        count, total = totals.get(d.id, (0, 0))
+        averages.append(round((total / count) if count > 0 else 0, 2))
+
+    return {'labels': [d.name for d in departments], 'averages': averages}
+
+
+def _series_activities_over_time(rows, ctx):
+    counts_by_date = {}
+    for r in rows:
+        # rows may return string dates depending on DB driver; normalize
+        key = r.day.strftime('%Y-%m-%d') if hasattr(r.day, 'strftime') else str(r.day)
+        counts_by_date[key] = counts_by_date.get(key, 0) + int(r.entry_count or 0)
+
+    window_start, window_end = _over_time_window(ctx['start_date'], ctx['end_date'])
+    labels = []
+    counts = []
+    cur = window_start
+    while cur <= window_end:
+        key = cur.strftime('%Y-%m-%d')
+        labels.append(key)
+        counts.append(counts_by_date.get(key, 0))
+        cur = cur + timedelta(days=1)
+
+    return {'labels': labels, 'counts': counts}
+
+
+def _series_top_users(rows, ctx):
+    counts = {}
+    for r in rows:
+        counts[r.user_id] = counts.get(r.user_id, 0) + int(r.entry_count or 0)
+    top = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:max(ctx['limit'], 0)]
+
+    users = []
+    if top:
+        user_map = dict(db.session.query(User.id, User.name).filter(User.id.in_([uid for uid, _ in top])).all())
+        users = [user_map.get(uid, f'User {uid}') for uid, _ in top]
+
+    return {'users': users, 'counts': [cnt for _, cnt in top]}
+
+
+def _series_users_by_dept(rows, ctx):
+    departments = _chart_departments(ctx, honour_dept=False)
+    if ctx['users_mode'] == 'active':
+        # count distinct users who logged activities in the date range per department
+        active = {}
+        for r in rows:
+            if r.entry_count:
+                active.setdefault(r.department_id, set()).add(r.user_id)
+        counts = [len(active.get(d.id, ())) for d in departments]
+    else:
+        user_counts = user_counts_by_department()
+        counts = [user_counts.get(d.id, 0) for d in departments]
+
+    return {'labels': [d.name for d in departments], 'counts': counts, 'mode': ctx['users_mode']}
+
+
+def _series_ticket_types(rows, ctx):
+    counts = {}
+    for r in rows:
+        typ = r.ticket_request_type or 'Unknown'
+        counts[typ] = counts.get(typ, 0) + int(r.entry_count or 0)
+    ordered = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    return {'labels': [typ for typ, _ in ordered], 'counts': [cnt for _, cnt in ordered]}
+
+
+def _series_day_hour_heatmap(rows, ctx):
+    hours = [h for h in range(24)]
+    # matrix [7][24], index 0 = Sunday
+    matrix = [[0 for _ in hours] for _ in WEEKDAYS]
+    for r in rows:
+        if r.weekday is None or r.hour is None or not (0 <= r.weekday <= 6 and 0 <= r.hour <= 23):
+            continue
+        matrix[r.weekday][r.hour] += int(r.entry_count or 0)
+    return {'weekdays': WEEKDAYS, 'hours': hours, 'matrix': matrix}
+
+
+SERIES_BUILDERS = {
+    'activities_by_dept': _series_activities_by_dept,
+    'duration_by_dept': _series_duration_by_dept,
+    'avg_duration_by_dept': _series_avg_duration_by_dept,
+    'activities_over_time': _series_activities_over_time,
+    'top_users': _series_top_users,
+    'users_by_dept': _series_users_by_dept,
+    'ticket_types': _series_ticket_types,
+    'day_hour_heatmap': _series_day_hour_heatmap,
+}
+
+
+def dashboard_series(names, departments, start_date=None, end_date=None, dept_id=None, priority=None,
+                     limit=10, users_mode='all'):
+    """
+    Compute management chart payloads from a single grouped pass over ActivityRollup.
+
+    names: iterable of DASHBOARD_SERIES keys
+    departments: non-Management departments, in display order
+    Filters shared by every requested chart are applied in SQL; the rest are applied per chart
+    on the grouped rows. Returns {name: payload}, payloads match the individual chart APIs.
+    """
+    names = [n for n in names if n in DASHBOARD_SERIES]
+    rollup_names = [n for n in names if _reads_rollup(n, users_mode)]
+
+    # Push a filter into SQL only if every rollup-reading chart honours it
+    sql_dept = dept_id if rollup_names and all('dept' in DASHBOARD_SERIES[n]['filters'] for n in rollup_names) else None
+    sql_priority = priority if rollup_names and all('priority' in DASHBOARD_SERIES[n]['filters'] for n in rollup_names) else None
+    sql_start, sql_end = start_date, end_date
+    if rollup_names == ['activities_over_time']:
+        sql_start, sql_end = _over_time_window(start_date, end_date)
+
+    python_filters = set()
+    if dept_id is not None and sql_dept is None:
+        python_filters.add('department_id')
+    if priority and not sql_priority:
+        python_filters.add('priority')
+    if 'activities_over_time' in rollup_names and len(rollup_names) > 1:
+        python_filters.add('day')
+
+    rows = []
+    if rollup_names:
+        dims = []
+        for n in rollup_names:
+            for d in DASHBOARD_SERIES[n]['dims']:
+                if d not in dims:
+                    dims.append(d)
+        for d in python_filters:
+            if d not in dims:
+                dims.append(d)
+        rows = _fetch_rollup_rows(dims, sql_start, sql_end, sql_dept, sql_priority)
+
+    ctx = {
+        'departments': departments,
+        'start_date': start_date,
+        'end_date': end_date,
+        'dept_id': dept_id,
+        'priority': priority,
+        'limit': limit,
+        'users_mode': users_mode,
+        'python_filters': python_filters,
+    }
+
+    return {n: SERIES_BUILDERS[n](_rows_for(rows, n, ctx) if _reads_rollup(n, users_mode) else [], ctx) for n in names}
+
+
+# --------------------------
+# Cached dashboard series
+# --------------------------
+analytics_cache = VersionedLRUCache()
+
+
+def _series_cache_key(name, departments, start_date, end_date, dept_id, priority, limit, users_mode):
+    """Normalise the filters to the ones that affect this chart, so equivalent requests share an entry."""
+    spec = DASHBOARD_SERIES[name]
+    if name == 'users_by_dept' and users_mode != 'active':
+        dates = None  # total user counts ignore the date range
+    elif name == 'activities_over_time':
+        dates = _over_time_window(start_date, end_date)
+    else:
+        dates = (start_date, end_date)
+    return (
+        name,
+        tuple((d.id, d.name) for d in departments),
+        dates,
+        dept_id if 'dept' in spec['filters'] else None,
+        priority if 'priority' in spec['filters'] else None,
+        limit if name == 'top_users' else None,
+        users_mode if name == 'users_by_dept' else None,
+    )
+
+
+def cached_dashboard_series(names, departments, start_date=None, end_date=None, dept_id=None, priority=None,
+                            limit=10, users_mode='all'):
+    """dashboard_series() backed by analytics_cache; only charts missing from the cache are computed."""
+    filters = dict(start_date=start_date, end_date=end_date, dept_id=dept_id, priority=priority,
+                   limit=limit, users_mode=users_mode)
+    version = get_data_version(ACTIVITY_DATA)
+
+    result = {}
+    keys = {}
+    for name in names:
+        if name not in DASHBOARD_SERIES:
+            continue
+        keys[name] = _series_cache_key(name, departments, **filters)
+        cached = analytics_cache.get(keys[name], version)
+        if cached is not None:
+            result[name] = cached
+
+    missing = [n for n in keys if n not in result]
+    if missing:
+        for name, payload in dashboard_series(missing, departments, **filters).items():
+            analytics_cache.set(keys[name], version, payload)
+            result[name] = payload
+
+    return result
+
+
+# --------------------------
+# Custom field breakdowns
+# --------------------------
+BREAKDOWN_METRICS = ('count', 'duration')
+
+
+def custom_field_breakdown_statement(group_field, flt, metric='count', metric_field=None):
+    """
+    Grouped query over TrackingFieldValue: (value, entry count, metric sum) per value of group_field.
+    metric: 'count' (sum is 0), 'duration' (sum of duration_mins), or 'field' to sum metric_field's
+    value_number. flt's filters apply to the entries. Execute with flt.params().
+    """
+    grouped = aliased(TrackingFieldValue)
+    stmt = db.select(grouped.value_text, func.count(grouped.entry_id).label('entry_count'))
+    join_entries = metric == 'duration' or bool(flt.shape())
+
+    if metric == 'duration':
+        total = func.coalesce(func.sum(DepartmentTracking.duration_mins), 0)
+    elif metric == 'field':
+        summed = aliased(TrackingFieldValue)
+        total = func.coalesce(func.sum(summed.value_number), 0)
+    else:
+        total = db.literal(0)
+    stmt = stmt.add_columns(total.label('metric_total')).where(grouped.field_id == group_field.id)
+
+    if join_entries:
+        stmt = stmt.join(DepartmentTracking, DepartmentTracking.id == grouped.entry_id).where(*flt.conditions())
+    if metric == 'field':
+        stmt = stmt.outerjoin(summed, and_(summed.entry_id == grouped.entry_id, summed.field_id == metric_field.id))
+    return stmt.group_by(grouped.value_text)
+
+
+def custom_field_breakdown(group_field, flt, metric='count', metric_field=None, limit=50):
+    """
+    Entry counts (and metric sums) per value of a custom field, largest first, computed in SQL from
+    the typed value table. Entries with no value for the field are not counted.
+
+    Returns: {'labels', 'counts', 'sums' (None for metric='count'), 'total_count', 'total_sum', 'truncated'}
+    """
+    # The field already pins the department
+    flt = flt.replace(department_id=None)
+    stmt = custom_field_breakdown_statement(group_field, flt, metric, metric_field)
+    order = 'entry_count' if metric == 'count' else 'metric_total'
+    ranked = stmt.order_by(db.desc(order), 'value_text').limit(limit + 1)
+    rows = db.session.execute(ranked, flt.params()).all()
+
+    truncated = len(rows) > limit
+    rows = rows[:limit]
+    if truncated:
+        totals = stmt.subquery()
+        total_count, total_sum = db.session.execute(
+            db.select(func.coalesce(func.sum(totals.c.entry_count), 0),
+                      func.coalesce(func.sum(totals.c.metric_total), 0)),
+            flt.params()
+        ).one()
+    else:
+        total_count = sum(r.entry_count for r in rows)
+        total_sum = sum(r.metric_total or 0 for r in rows)
+
+    def number(value):
+        value = float(value or 0)
+        return int(value) if value.is_integer() else round(value, 2)
+
+    return {
+        'labels': [r.value_text for r in rows],
+        'counts': [int(r.entry_count) for r in rows],
+        'sums': [number(r.metric_total) for r in rows] if metric != 'count' else None,
+        'total_count': int(total_count),
+        'total_sum': number(total_sum) if metric != 'count' else None,
+        'truncated': truncated,
+    }
+
+
+def cached_custom_field_breakdown(group_field, flt, metric='count', metric_field=None, limit=50):
+    """custom_field_breakdown() backed by analytics_cache."""
+    key = ('custom_field_breakdown', group_field.id, group_field.field_type, metric,
+           metric_field.id if metric_field else None, metric_field.field_type if metric_field else None,
+           flt.replace(department_id=None), limit)
+    version = get_data_version(ACTIVITY_DATA)
+    cached = analytics_cache.get(key, version)
+    if cached is None:
+        cached = custom_field_breakdown(group_field, flt, metric, metric_field, limit)
+        analytics_cache.set(key, version, cached)
+    return cached
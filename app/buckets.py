@@ -0,0 +1,104 @@
+"""
+Dialect-aware time bucketing.
+
+The SQL constructs below compile to the native expression on SQLite (staging) and
+PostgreSQL (production). Hot analytics queries should not wrap timestamp columns in these
+functions; they group on the precomputed bucket columns (DepartmentTracking.log_day/...,
+Grievance.submitted_day/...), which are filled on insert with time_buckets() and
+backfilled with these expressions by migrate_time_buckets.py.
+
+Weekdays follow the SQLite '%w' convention used by the heatmap: 0 = Sunday ... 6 = Saturday.
+"""
+
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.types import Date, Integer
+
+
+class day_bucket(FunctionElement):
+    """Calendar day (DATE) of a timestamp"""
+    type = Date()
+    name = 'day_bucket'
+    inherit_cache = True
+
+
+class month_bucket(FunctionElement):
+    """First day of the month (DATE) of a timestamp"""
+    type = Date()
+    name = 'month_bucket'
+    inherit_cache = True
+
+
+class weekday_bucket(FunctionElement):
+    """Day of week (INTEGER, 0 = Sunday) of a timestamp"""
+    type = Integer()
+    name = 'weekday_bucket'
+    inherit_cache = True
+
+
+class hour_bucket(FunctionElement):
+    """Hour of day (INTEGER, 0-23) of a timestamp"""
+    type = Integer()
+    name = 'hour_bucket'
+    inherit_cache = True
+
+
+def _arg(element, compiler, **kw):
+    return compiler.process(element.clauses, **kw)
+
+
+# PostgreSQL (and the generic default)
+@compiles(day_bucket)
+def _day_default(element, compiler, **kw):
+    return 'CAST(%s AS DATE)' % _arg(element, compiler, **kw)
+
+
+@compiles(month_bucket)
+def _month_default(element, compiler, **kw):
+    return "CAST(date_trunc('month', %s) AS DATE)" % _arg(element, compiler, **kw)
+
+
+@compiles(weekday_bucket)
+def _weekday_default(element, compiler, **kw):
+    return 'CAST(EXTRACT(DOW FROM %s) AS INTEGER)' % _arg(element, compiler, **kw)
+
+
+@compiles(hour_bucket)
+def _hour_default(element, compiler, **kw):
+    return 'CAST(EXTRACT(HOUR FROM %s) AS INTEGER)' % _arg(element, compiler, **kw)
+
+
+# SQLite
+@compiles(day_bucket, 'sqlite')
+def _day_sqlite(element, compiler, **kw):
+    return 'date(%s)' % _arg(element, compiler, **kw)
+
+
+@compiles(month_bucket, 'sqlite')
+def _month_sqlite(element, compiler, **kw):
+    return "date(%s, 'start of month')" % _arg(element, compiler, **kw)
+
+
+@compiles(weekday_bucket, 'sqlite')
+def _weekday_sqlite(element, compiler, **kw):
+    return "CAST(strftime('%%w', %s) AS INTEGER)" % _arg(element, compiler, **kw)
+
+
+@compiles(hour_bucket, 'sqlite')
+def _hour_sqlite(element, compiler, **kw):
+    return "CAST(strftime('%%H', %s) AS INTEGER)" % _arg(element, compiler, **kw)
+
+
+def weekday_index(dt):
+    """Python equivalent of weekday_bucket (0 = Sunday)."""
+    return (dt.weekday() + 1) % 7
+
+
+def time_buckets(dt):
+    """Return {'day', 'month', 'weekday', 'hour'} for a datetime, matching the SQL buckets."""
+    return {
+        'day': dt.date(),
+        'month': dt.date().replace(day=1),
+        'weekday': weekday_index(dt),
+        'hour': dt.hour,
+    }
@@ -0,0 +1,204 @@
+"""
+Process-local caches and the database-backed version counters that invalidate them.
+
+Every gunicorn worker keeps its own cache. Writers bump a DataVersion counter in the same
+transaction as the data change, and readers compare it before trusting a cached value, so
+all workers see a change on their next request.
+"""
+
+from app import db
+from app.models import DataVersion
+from collections import OrderedDict
+from flask import g, has_request_context
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+import threading
+import time
+
+# DataVersion names
+ACTIVITY_DATA = 'activity'
+GRIEVANCE_DATA = 'grievance'
+SCHEMA_DATA = 'schema'  # Department and TrackingField definitions (app.schema_cache)
+USER_DATA = 'users'  # name, department and admin flag of users (app.models.load_user)
+
+
+def get_data_version(name):
+    """Return the current counter for name (0 if it was never bumped)."""
+    version = db.session.query(DataVersion.version).filter_by(name=name).scalar()
+    return version or 0
+
+
+def bump_data_version(name):
+    """Increment the counter for name in the current transaction. The caller commits."""
+    updated = DataVersion.query.filter_by(name=name).update(
+        {DataVersion.version: DataVersion.version + 1}, synchronize_session=False
+    )
+    if updated:
+        return
+
+    # First bump for this name: insert the row, tolerating a concurrent insert
+    try:
+        with db.session.begin_nested():
+            db.session.add(DataVersion(name=name, version=1))
+    except IntegrityError:
+        DataVersion.query.filter_by(name=name).update(
+            {DataVersion.version: DataVersion.version + 1}, synchronize_session=False
+        )
+
+
+def request_data_version(name):
+    """
+    get_data_version() read at most once per request: the first call loads every counter in
+    one query and keeps them on g. For caches consulted on every request (schema, identities);
+    outside a request it queries each time.
+    """
+    if not has_request_context():
+        return get_data_version(name)
+    versions = g.get('_data_versions')
+    if versions is None:
+        versions = g._data_versions = dict(db.session.query(DataVersion.name, DataVersion.version).all())
+    return versions.get(name, 0)
+
+
+def table_watermark(name, id_column):
+    """
+    Cheap validator for a table: its DataVersion counter plus max(id).
+    max(id) also catches rows inserted outside the app (seed and import scripts).
+    """
+    max_id = db.session.query(func.max(id_column)).scalar()
+    return f'{get_data_version(name)}-{max_id or 0}'
+
+
+class VersionedLRUCache:
+    """
+    Bounded LRU cache whose entries are only valid for one data version.
+    Seeing a different version drops every entry. Thread-safe; tracks hits and misses.
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _check_version(self, version):
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def get(self, key, version):
+        """Return the cached value for key, or None if missing or stale."""
+        with self._lock:
+            self._check_version(version)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, version, value):
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0,
+                'invalidations': self.invalidations,
+                'version': self._version
+            }
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries expire ttl seconds after they were set. Entries may also
+    be tagged with a data version: get() with a different version treats the entry as gone,
+    so a bumped counter reaches every worker on its next request. Writers that know a key
+    changed can also call invalidate(). Thread-safe; tracks hits and misses. ttl <= 0
+    disables caching.
+    """
+
+    def __init__(self, max_size=1024, ttl=30):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key, version=None):
+        """Return the cached value for key, or None if missing, expired or set for another version."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, entry_version, value = entry
+                if entry_version != version:
+                    del self._entries[key]
+                    self.invalidations += 1
+                elif expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                else:
+                    del self._entries[key]
+                    self.expirations += 1
+            self.misses += 1
+            return None
+
+    def set(self, key, value, version=None):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+
+
+# Flask-Login identities (app.models.load_user), keyed by user id and tagged with USER_DATA
+user_identity_cache = TTLCache()
+
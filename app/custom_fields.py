@@ -0,0 +1,138 @@
+"""
+Typed, queryable storage for department custom field values.
+
+custom_fields_data keeps each entry's values as a JSON object keyed by TrackingField.field_name;
+that stays the source for forms and exports. Every value is also written to TrackingFieldValue,
+one row per (entry, field) keyed by TrackingField.id, with the value as text plus a number or
+date column for number/date fields. Indexes on (field_id, value_*) let reports filter and group
+by a custom field in SQL instead of decoding every row in Python, on SQLite and PostgreSQL alike.
+
+record_custom_field_values() runs with each new entry; backfill_custom_field_values() fills
+the table for entries written before it existed (see backfill_custom_field_values.py).
+"""
+
+from app import db
+from app.jsoncodec import loads
+from app.models import DepartmentTracking, TrackingField, TrackingFieldValue
+from datetime import date, datetime
+
+TEXT_LENGTH = TrackingFieldValue.value_text.type.length
+
+
+def typed_value(field_type, value):
+    """Return (value_text, value_number, value_date) for a custom field value, or None if it is empty."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (date, datetime)):
+        value = value.isoformat()
+
+    number = value_date = None
+    if isinstance(value, bool):
+        text = str(value).lower()
+    elif isinstance(value, (int, float)):
+        text, number = str(value), float(value)
+    else:
+        text = str(value).strip()
+        if field_type == 'number':
+            try:
+                number = float(text)
+            except ValueError:
+                pass
+    if field_type == 'date':
+        try:
+            value_date = datetime.strptime(text[:10], '%Y-%m-%d').date()
+        except ValueError:
+            pass
+    return text[:TEXT_LENGTH], number, value_date
+
+
+def _value_rows(values, fields):
+    """Yield (field_id, text, number, date) for the values that match one of fields (by field_name)."""
+    for field in fields:
+        typed = typed_value(field.field_type, values.get(field.field_name))
+        if typed is not None:
+            yield (field.id,) + typed
+
+
+def record_custom_field_values(entry, fields):
+    """
+    Add TrackingFieldValue rows for a new entry's custom_fields_data.
+    fields: the entry department's TrackingFields. Runs in the caller's session.
+    """
+    values = entry.get_custom_fields_data()
+    for field_id, text, number, value_date in _value_rows(values, fields):
+        entry.field_values.append(TrackingFieldValue(
+            field_id=field_id, value_text=text, value_number=number, value_date=value_date
+        ))
+
+
+def remove_user_field_values(user_id):
+    """Drop the custom field values of a user whose activity logs are being deleted."""
+    entry_ids = db.select(DepartmentTracking.id).where(DepartmentTracking.user_id == user_id)
+    TrackingFieldValue.query.filter(TrackingFieldValue.entry_id.in_(entry_ids)).delete(synchronize_session=False)
+
+
+def remove_field_values(field_id):
+    """Drop every value stored for a tracking field that is being deleted."""
+    TrackingFieldValue.query.filter_by(field_id=field_id).delete(synchronize_session=False)
+
+
+def retype_field_values(field):
+    """Recompute value_number/value_date from value_text after a field's type changed. The caller commits."""
+    rows = db.session.query(TrackingFieldValue.id, TrackingFieldValue.value_text).filter_by(field_id=field.id).all()
+    updates = []
+    for value_id, text in rows:
+        _, number, value_date = typed_value(field.field_type, text)
+        updates.append({'id': value_id, 'value_number': number, 'value_date': value_date})
+    if updates:
+        db.session.execute(db.update(TrackingFieldValue), updates)
+    return len(updates)
+
+
+def backfill_custom_field_values(batch_size=1000, rebuild=False):
+    """
+    Write TrackingFieldValue rows for entries that have custom_fields_data but no values yet
+    (all entries with rebuild=True). Works through department_tracking in id order, batch_size
+    entries at a time, committing after each batch so it can run on a live database and be
+    resumed. Returns the number of value rows written.
+    """
+    if rebuild:
+        TrackingFieldValue.query.delete(synchronize_session=False)
+        db.session.commit()
+
+    fields = {}
+    for field in TrackingField.query.all():
+        fields.setdefault(field.department_id, []).append(field)
+
+    has_values = db.select(TrackingFieldValue.id).where(TrackingFieldValue.entry_id == DepartmentTracking.id).exists()
+    written, last_id = 0, 0
+    while True:
+        entries = db.session.query(
+            DepartmentTracking.id, DepartmentTracking.department_id, DepartmentTracking.custom_fields_data
+        ).filter(
+            DepartmentTracking.id > last_id,
+            DepartmentTracking.custom_fields_data.isnot(None),
+            ~has_values
+        ).order_by(DepartmentTracking.id).limit(batch_size).all()
+        if not entries:
+            break
+
+        rows = []
+        for entry_id, department_id, data in entries:
+            try:
+                values = loads(data)
+            except ValueError:
+                continue
+            if not isinstance(values, dict):
+                continue
+            for field_id, text, number, value_date in _value_rows(values, fields.get(department_id, ())):
+                rows.append({'entry_id': entry_id, 'field_id': field_id, 'value_text': text,
+                             'value_number': number, 'value_date': value_date})
+        if rows:
+            db.session.execute(db.insert(TrackingFieldValue), rows)
+        db.session.commit()
+        written += len(rows)
+        last_id = entries[-1][0]
+
+    return written
+
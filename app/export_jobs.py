@@ -0,0 +1,229 @@
+"""
+Background export jobs.
+
+submit_export_job() records a job and returns at once; a local worker thread writes the file
+into EXPORT_JOB_DIR (<instance>/exports by default) and reports progress as it goes.
+
+Each job's state is a small JSON file next to its artifact, so any gunicorn worker on the host
+can answer progress polls and serve the download, and progress writes never contend with the
+export's own read transaction (SQLite staging). A request for the same export (kind, format and
+filters) within EXPORT_JOB_TTL seconds of the last one reuses that job and file.
+"""
+
+from app.exports import EXPORT_FORMATS, activity_export_total, department_export_total, \
+    export_download_name, write_activity_export, write_department_export
+from app.filters import ActivityFilter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+_executor = None
+_executor_lock = threading.Lock()
+_submit_lock = threading.Lock()
+_last_purge = 0.0
+
+
+def _config(app):
+    return app.config['EXPORT_JOB_DIR'], app.config['EXPORT_JOB_TTL']
+
+
+def _state_path(directory, job_id):
+    return os.path.join(directory, f'{job_id}.json')
+
+
+def _artifact_path(directory, job):
+    return os.path.join(directory, f"{job['id']}.{EXPORT_FORMATS[job['format']]['extension']}")
+
+
+def _write_json(path, data):
+    """Replace path atomically so readers never see a half-written file."""
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _job_key(kind, fmt, filters):
+    spec = {'kind': kind, 'format': fmt, 'filters': filters}
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+
+def _is_live(job, ttl, now):
+    """A finished job is reusable for ttl seconds; an unfinished one while it keeps reporting progress."""
+    if job['status'] == DONE:
+        return now - job['finished_at'] < ttl
+    if job['status'] in (QUEUED, RUNNING):
+        return now - job['updated_at'] < ttl
+    return False
+
+
+def _get_executor(app):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=app.config['EXPORT_JOB_THREADS'],
+                                           thread_name_prefix='export-job')
+        return _executor
+
+
+def get_export_job(app, job_id):
+    """Return the job's state dict, or None if it does not exist (or has been purged)."""
+    directory, ttl = _config(app)
+    if not all(c in '0123456789abcdef' for c in job_id):
+        return None
+    job = _read_json(_state_path(directory, job_id))
+    if job and job['status'] in (QUEUED, RUNNING) and not _is_live(job, ttl, time.time()):
+        job['status'], job['error'] = FAILED, 'export stopped reporting progress'
+    return job
+
+
+def export_job_artifact(app, job):
+    """Path of a finished job's file, or None once it has expired or been removed."""
+    directory, ttl = _config(app)
+    path = _artifact_path(directory, job)
+    if job['status'] != DONE or not _is_live(job, ttl, time.time()) or not os.path.exists(path):
+        return None
+    return path
+
+
+def submit_export_job(app, kind, fmt, flt, user_id=None):
+    """
+    Queue an export ('activities', or 'department' with flt.department_id set) and return (job, reused).
+    flt: the ActivityFilter to export, stored as flt.to_dict().
+    """
+    directory, ttl = _config(app)
+    os.makedirs(directory, exist_ok=True)
+    filters = flt.to_dict()
+    key = _job_key(kind, fmt, filters)
+    now = time.time()
+
+    with _submit_lock:
+        _purge_expired(directory, ttl, now)
+        key_path = os.path.join(directory, f'{key}.key')
+        latest = _read_json(key_path)
+        if latest:
+            job = _read_json(_state_path(directory, latest['job_id']))
+            if job and _is_live(job, ttl, now) and (job['status'] != DONE or os.path.exists(_artifact_path(directory, job))):
+                return job, True
+
+        job = {
+            'id': uuid.uuid4().hex,
+            'key': key,
+            'kind': kind,
+            'format': fmt,
+            'department_id': flt.department_id,
+            'filters': filters,
+            'user_id': user_id,
+            'status': QUEUED,
+            'rows_done': 0,
+            'rows_total': None,
+            'error': None,
+            'download_name': export_download_name(kind, fmt),
+            'mimetype': EXPORT_FORMATS[fmt]['mimetype'],
+            'created_at': now,
+            'updated_at': now,
+            'finished_at': None,
+        }
+        _write_json(_state_path(directory, job['id']), job)
+        _write_json(key_path, {'job_id': job['id']})
+
+    _get_executor(app).submit(_run_job, app, job['id'])
+    return job, False
+
+
+def _update(directory, job, **changes):
+    job.update(changes, updated_at=time.time())
+    _write_json(_state_path(directory, job['id']), job)
+
+
+def _run_job(app, job_id):
+    from app import db
+
+    directory, _ = _config(app)
+    job = _read_json(_state_path(directory, job_id))
+    artifact = _artifact_path(directory, job)
+    partial = f'{artifact}.part'
+
+    with app.app_context():
+        try:
+            flt = ActivityFilter.from_dict(job['filters'])
+            if job['kind'] == 'activities':
+                total = activity_export_total(flt)
+            else:
+                total = department_export_total(flt)
+            _update(directory, job, status=RUNNING, rows_total=total)
+
+            on_progress = lambda rows: _update(directory, job, rows_done=rows)
+            with open(partial, 'wb') as fileobj:
+                if job['kind'] == 'activities':
+                    write_activity_export(fileobj, job['format'], flt,
+                                          workers=app.config['EXPORT_WORKERS'], on_progress=on_progress)
+                else:
+                    write_department_export(fileobj, job['format'], flt, on_progress=on_progress)
+            os.replace(partial, artifact)
+            _update(directory, job, status=DONE, finished_at=time.time())
+        except Exception as e:
+            app.logger.exception('Export job %s failed', job_id)
+            if os.path.exists(partial):
+                os.remove(partial)
+            _update(directory, job, status=FAILED, error=str(e), finished_at=time.time())
+        finally:
+            db.session.remove()
+
+
+def _purge_expired(directory, ttl, now):
+    """Delete expired jobs, their artifacts and dangling key files (at most once a minute per process)."""
+    global _last_purge
+    if now - _last_purge < 60:
+        return
+    _last_purge = now
+
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.endswith('.json'):
+            job = _read_json(path)
+            if job is None or _is_live(job, ttl, now):
+                continue
+            artifact = _artifact_path(directory, job)
+            for stale in (artifact, f'{artifact}.part', path):
+                if os.path.exists(stale):
+                    os.remove(stale)
+        elif name.endswith('.key') and now - os.path.getmtime(path) > ttl:
+            os.remove(path)
+
+
+def job_status_payload(job, download_url=None):
+    """JSON body for the progress endpoint."""
+    progress = None
+    if job['status'] == DONE:
+        progress = 100
+    elif job['rows_total']:
+        progress = min(99, int(job['rows_done'] * 100 / job['rows_total']))
+    return {
+        'job_id': job['id'],
+        'kind': job['kind'],
+        'format': job['format'],
+        'status': job['status'],
+        'rows_done': job['rows_done'],
+        'rows_total': job['rows_total'],
+        'progress': progress,
+        'error': job['error'],
+        'created_at': datetime.utcfromtimestamp(job['created_at']).isoformat(),
+        'finished_at': datetime.utcfromtimestamp(job['finished_at']).isoformat() if job['finished_at'] else None,
+        'download_url': download_url if job['status'] == DONE else None,
+    }
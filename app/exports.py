@@ -0,0 +1,581 @@
+"""
+Streaming exports of activity data.
+
+Rows are read as plain tuples in fixed-size batches (yield_per, which uses a server-side
+cursor on PostgreSQL) and written to the client chunk by chunk, so memory stays flat no
+matter how many rows are exported.
+
+CSV is streamed straight to the response. Columnar formats (Parquet, Feather) are written
+batch by batch into a temporary file with typed columns and custom fields expanded, then sent.
+The XLSX workbook (one sheet per department, like the original tracking spreadsheet) uses
+openpyxl's write-only mode; department sheets are built in worker processes and merged.
+
+write_activity_export()/write_department_export() produce any format into a binary file and
+report progress, for the synchronous downloads and the background jobs in app.export_jobs.
+"""
+
+from app import db
+from app.filters import ActivityFilter
+from app.jsoncodec import loads, loads_many
+from app.models import User, Department, DepartmentTracking, TrackingField
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from sqlalchemy import func
+import csv
+import io
+import multiprocessing
+import os
+import re
+import tempfile
+
+EXPORT_BATCH_SIZE = 1000
+
+ACTIVITY_EXPORT_HEADER = ['id', 'date_logged', 'department_id', 'user_id', 'ticket_request_type', 'priority',
+                          'duration_mins', 'frequency_per_day', 'activity_description']
+
+
+def _activity_export_select():
+    return db.select(
+        DepartmentTracking.id,
+        DepartmentTracking.date_logged,
+        DepartmentTracking.department_id,
+        DepartmentTracking.user_id,
+        DepartmentTracking.ticket_request_type,
+        DepartmentTracking.priority,
+        DepartmentTracking.duration_mins,
+        DepartmentTracking.frequency_per_day,
+        DepartmentTracking.activity_description,
+        DepartmentTracking.system_application,
+        DepartmentTracking.sla_tat,
+        DepartmentTracking.tool_platform_used,
+        DepartmentTracking.status,
+        DepartmentTracking.custom_fields_data
+    ).order_by(DepartmentTracking.date_logged.desc())
+
+
+def activity_export_query(flt):
+    """Select the management export columns for an ActivityFilter, newest first. Execute with flt.params()."""
+    return flt.cached('activity_export', _activity_export_select)
+
+
+def _department_export_select():
+    return db.select(
+        DepartmentTracking.id,
+        DepartmentTracking.date_logged,
+        User.name.label('employee_name'),
+        DepartmentTracking.priority,
+        DepartmentTracking.sla_tat,
+        DepartmentTracking.duration_mins,
+        DepartmentTracking.frequency_per_day,
+        DepartmentTracking.status,
+        DepartmentTracking.activity_description,
+        DepartmentTracking.ticket_request_type,
+        DepartmentTracking.system_application,
+        DepartmentTracking.tool_platform_used,
+        DepartmentTracking.custom_fields_data
+    ).outerjoin(User, User.id == DepartmentTracking.user_id).order_by(DepartmentTracking.date_logged.desc())
+
+
+def department_export_query(flt):
+    """Select a department's export columns (flt.department_id), employee name joined in, newest first."""
+    return flt.cached('department_export', _department_export_select)
+
+
+def export_rows(stmt, flt, batch_size=EXPORT_BATCH_SIZE, connection=None):
+    """
+    Yield the rows of an export query in batches. Rows are named tuples, not ORM objects.
+    connection: run on this Connection instead of the session (used by workbook worker processes).
+    """
+    result = (connection or db.session).execute(stmt.execution_options(yield_per=batch_size), flt.params())
+    try:
+        for row in result:
+            yield row
+    finally:
+        result.close()
+
+
+def activity_export_rows(flt, batch_size=EXPORT_BATCH_SIZE):
+    """Yield activity rows matching the management export filters, newest first."""
+    return export_rows(activity_export_query(flt), flt, batch_size)
+
+
+def export_row_count(stmt, flt, connection=None):
+    """Count the rows an export query will produce (for progress reporting)."""
+    count_stmt = db.select(func.count()).select_from(stmt.order_by(None).subquery())
+    return (connection or db.session).execute(count_stmt, flt.params()).scalar()
+
+
+def activity_csv_record(row):
+    """Format one activity_export_rows() row for the CSV export."""
+    return [
+        row.id,
+        (row.date_logged.isoformat() if hasattr(row.date_logged, 'isoformat') else str(row.date_logged)),
+        row.department_id,
+        row.user_id,
+        row.ticket_request_type or '',
+        row.priority or '',
+        row.duration_mins or '',
+        row.frequency_per_day or '',
+        (row.activity_description or '').replace('\n', ' ')
+    ]
+
+
+# Tracking fields exported as fixed columns of the department export rather than custom columns
+DEPARTMENT_EXPORT_FIXED_FIELDS = ('entry_no', 'priority', 'sla_tat', 'duration_mins', 'frequency_per_day', 'status')
+# Tracking fields that are also stored on DepartmentTracking itself (used when the JSON lacks them)
+LEGACY_FIELD_COLUMNS = ('ticket_request_type', 'system_application', 'tool_platform_used')
+
+
+def department_export_fields(department_id, connection=None):
+    """Return (field_name, field_label) for the department's custom export columns, in display order."""
+    stmt = db.select(TrackingField.field_name, TrackingField.field_label).where(
+        TrackingField.department_id == department_id
+    ).order_by(TrackingField.order, TrackingField.id)
+    rows = (connection or db.session).execute(stmt).all()
+    return [(name, label) for name, label in rows if name not in DEPARTMENT_EXPORT_FIXED_FIELDS]
+
+
+def department_export_header(fields):
+    return [
+        'Activity No',
+        'Date Logged',
+        'Employee',
+        'Priority',
+        'SLA / TAT',
+        'Duration (mins)',
+        'Frequency per Day',
+        'Status',
+        'Activity Description'
+    ] + [label for _, label in fields]
+
+
+def department_export_rows(flt, batch_size=EXPORT_BATCH_SIZE, connection=None):
+    """Yield a department's entries (flt.department_id) for export, newest first."""
+    return export_rows(department_export_query(flt), flt, batch_size, connection)
+
+
+def with_custom_fields(rows, batch_size=EXPORT_BATCH_SIZE):
+    """Yield (row, custom_fields dict) pairs, decoding custom_fields_data batch_size rows at a time."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield from zip(batch, loads_many(r.custom_fields_data for r in batch))
+            batch = []
+    if batch:
+        yield from zip(batch, loads_many(r.custom_fields_data for r in batch))
+
+
+def department_csv_record(row, fields, custom_fields=None):
+    """
+    Format one department_export_rows() row, expanding custom fields into their own columns.
+    custom_fields: the row's decoded custom_fields_data, if already decoded (see department_csv_records).
+    """
+    if custom_fields is None:
+        custom_fields = loads(row.custom_fields_data) if row.custom_fields_data else {}
+
+    record = [
+        custom_fields.get('entry_no', ''),
+        row.date_logged.strftime('%Y-%m-%d %H:%M'),
+        row.employee_name or '',
+        row.priority or '',
+        row.sla_tat or '',
+        row.duration_mins or '',
+        row.frequency_per_day or '',
+        row.status or '',
+        row.activity_description or ''
+    ]
+    for name, _ in fields:
+        value = custom_fields.get(name)
+        if value is None and name in LEGACY_FIELD_COLUMNS:
+            value = getattr(row, name)
+        record.append('' if value is None else value)
+    return record
+
+
+def department_csv_records(rows, fields):
+    """department_csv_record() for each row, with the custom field JSON decoded in batches."""
+    for row, custom_fields in with_custom_fields(rows):
+        yield department_csv_record(row, fields, custom_fields)
+
+
+def csv_chunks(header, records, rows_per_chunk=EXPORT_BATCH_SIZE):
+    """Yield CSV text in chunks of rows_per_chunk records, header first."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+
+    pending = 0
+    for record in records:
+        writer.writerow(record)
+        pending += 1
+        if pending >= rows_per_chunk:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+
+    yield buffer.getvalue()
+
+
+def write_csv(fileobj, header, records):
+    """Write csv_chunks() output to a binary file as UTF-8."""
+    for chunk in csv_chunks(header, records):
+        fileobj.write(chunk.encode('utf-8'))
+
+
+def counted(rows, on_progress, every=EXPORT_BATCH_SIZE, offset=0):
+    """Pass rows through, calling on_progress(rows so far + offset) every `every` rows and at the end."""
+    count = 0
+    for row in rows:
+        yield row
+        count += 1
+        if on_progress and count % every == 0:
+            on_progress(offset + count)
+    if on_progress:
+        on_progress(offset + count)
+
+
+# --------------------------
+# Columnar (Parquet / Feather) exports
+# --------------------------
+COLUMNAR_FORMATS = {
+    'parquet': {'extension': 'parquet', 'mimetype': 'application/vnd.apache.parquet'},
+    'feather': {'extension': 'feather', 'mimetype': 'application/vnd.apache.arrow.file'},
+}
+
+# (column name, type) of the fixed columns; types are 'int', 'string' or 'timestamp'
+ACTIVITY_COLUMNAR_COLUMNS = [
+    ('id', 'int'), ('date_logged', 'timestamp'), ('department_id', 'int'), ('user_id', 'int'),
+    ('ticket_request_type', 'string'), ('priority', 'string'), ('duration_mins', 'int'),
+    ('frequency_per_day', 'int'), ('activity_description', 'string'), ('system_application', 'string'),
+    ('sla_tat', 'string'), ('tool_platform_used', 'string'), ('status', 'string'),
+]
+DEPARTMENT_COLUMNAR_COLUMNS = [
+    ('id', 'int'), ('date_logged', 'timestamp'), ('employee_name', 'string'), ('priority', 'string'),
+    ('sla_tat', 'string'), ('duration_mins', 'int'), ('frequency_per_day', 'int'), ('status', 'string'),
+    ('activity_description', 'string'), ('ticket_request_type', 'string'), ('system_application', 'string'),
+    ('tool_platform_used', 'string'),
+]
+
+# TrackingField.field_type -> column type
+FIELD_TYPE_COLUMNS = {'number': 'int', 'date': 'date'}
+
+
+def custom_field_columns(department_ids=None, exclude=()):
+    """
+    Return [(field_name, type)] for the custom fields of the given departments (all if None),
+    in display order. A name defined with different types across departments is exported as string.
+    """
+    q = db.session.query(TrackingField.field_name, TrackingField.field_type)
+    if department_ids is not None:
+        q = q.filter(TrackingField.department_id.in_(department_ids))
+    columns = {}
+    for name, field_type in q.order_by(TrackingField.order, TrackingField.id).all():
+        if name in exclude:
+            continue
+        kind = FIELD_TYPE_COLUMNS.get(field_type, 'string')
+        if name in columns and columns[name] != kind:
+            kind = 'string'
+        columns[name] = kind
+    return list(columns.items())
+
+
+def _coerce(value, kind):
+    """Convert a JSON custom field value to the column type; unparseable values become null."""
+    if value is None or value == '':
+        return None
+    try:
+        if kind == 'int':
+            return int(value)
+        if kind == 'date':
+            return value if hasattr(value, 'year') else datetime.strptime(str(value), '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+    return str(value)
+
+
+def write_columnar(fileobj, fmt, columns, custom_columns, rows, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Write rows to fileobj as Parquet or Feather (Arrow IPC), one row group / record batch per batch_size rows.
+    columns: [(name, type)] read from the row tuples; custom_columns: [(field_name, type)] read from
+    the row's custom_fields_data JSON. Returns the number of rows written.
+    """
+    import pyarrow as pa  # imported lazily: only columnar exports need it
+
+    arrow_types = {'int': pa.int64(), 'string': pa.string(), 'timestamp': pa.timestamp('us'), 'date': pa.date32()}
+    schema = pa.schema(
+        [pa.field(name, arrow_types[kind]) for name, kind in columns] +
+        [pa.field(name, arrow_types[kind]) for name, kind in custom_columns]
+    )
+
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(fileobj, schema)
+        write_batch = lambda batch: writer.write_table(pa.Table.from_batches([batch]))
+    else:
+        writer = pa.ipc.new_file(fileobj, schema, options=pa.ipc.IpcWriteOptions(compression='lz4'))
+        write_batch = writer.write_batch
+
+    column_count = len(columns) + len(custom_columns)
+    values = [[] for _ in range(column_count)]
+    total = 0
+
+    def flush():
+        if values[0]:
+            write_batch(pa.record_batch([pa.array(v, type=f.type) for v, f in zip(values, schema)], schema=schema))
+            for v in values:
+                v.clear()
+
+    try:
+        for row, custom_fields in with_custom_fields(rows, batch_size):
+            for i, (name, _) in enumerate(columns):
+                values[i].append(getattr(row, name))
+            for j, (name, kind) in enumerate(custom_columns, start=len(columns)):
+                values[j].append(_coerce(custom_fields.get(name), kind))
+            total += 1
+            if total % batch_size == 0:
+                flush()
+        flush()
+    finally:
+        writer.close()
+    return total
+
+
+# --------------------------
+# XLSX workbook export
+# --------------------------
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def workbook_sheet_titles(names):
+    """Map department names to valid, unique Excel sheet titles (max 31 chars, no []:*?/\\)."""
+    titles, used = [], set()
+    for name in names:
+        base = re.sub(r'[\[\]:*?/\\]', '-', name).strip("' ")[:31] or 'Sheet'
+        title, n = base, 2
+        while title.lower() in used:
+            suffix = f' ({n})'
+            title, n = base[:31 - len(suffix)] + suffix, n + 1
+        used.add(title.lower())
+        titles.append(title)
+    return titles
+
+
+# openpyxl stores a string starting with "=" as a formula; spreadsheet apps also evaluate +, - and @
+FORMULA_PREFIXES = ('=', '+', '-', '@')
+
+
+def _text_cell(ws, value):
+    """A write-only cell that always holds value as text, never as a formula."""
+    from openpyxl.cell import WriteOnlyCell
+
+    cell = WriteOnlyCell(ws, value=value)
+    cell.data_type = 's'
+    return cell
+
+
+def _sheet_row(ws, values):
+    """Row values for ws.append(), with user text that looks like a formula kept as plain text."""
+    return [_text_cell(ws, value) if isinstance(value, str) and value.startswith(FORMULA_PREFIXES) else value
+            for value in values]
+
+
+def _start_sheet(wb, title, header):
+    from openpyxl.styles import Font
+
+    ws = wb.create_sheet(title)
+    ws.freeze_panes = 'A2'
+    cells = []
+    for label in header:
+        cell = _text_cell(ws, label)
+        cell.font = Font(bold=True)
+        cells.append(cell)
+    ws.append(cells)
+    return ws
+
+
+def _write_department_sheet(wb, title, fields, rows):
+    """Append one department's sheet to a write-only workbook; dates stay real Excel dates. Returns the row count."""
+    ws = _start_sheet(wb, title, department_export_header(fields))
+    count = 0
+    for row, custom_fields in with_custom_fields(rows):
+        record = department_csv_record(row, fields, custom_fields)
+        record[1] = row.date_logged
+        ws.append(_sheet_row(ws, [None if value == '' else value for value in record]))
+        count += 1
+    return count
+
+
+def _build_department_part(database_url, title, filters):
+    """
+    Worker process: write one department's sheet into its own workbook file and return (path, rows).
+    Runs outside the Flask app, on a private engine.
+    """
+    from openpyxl import Workbook
+    from sqlalchemy import create_engine
+
+    engine = create_engine(database_url)
+    fd, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    try:
+        with engine.connect() as connection:
+            wb = Workbook(write_only=True)
+            flt = ActivityFilter.from_dict(filters)
+            fields = department_export_fields(flt.department_id, connection=connection)
+            rows = department_export_rows(flt, connection=connection)
+            count = _write_department_sheet(wb, title, fields, rows)
+            wb.save(path)
+    except Exception:
+        os.remove(path)
+        raise
+    finally:
+        engine.dispose()
+    return path, count
+
+
+def _append_department_part(wb, title, path):
+    """Stream the rows of a worker's single-sheet workbook into the merged write-only workbook."""
+    from openpyxl import load_workbook
+
+    part = load_workbook(path, read_only=True)
+    try:
+        rows = part.worksheets[0].iter_rows(values_only=True)
+        ws = _start_sheet(wb, title, next(rows, ()))
+        for values in rows:
+            ws.append(_sheet_row(ws, values))
+    finally:
+        part.close()
+
+
+def _can_share_database(database_url):
+    """Worker processes open their own connections, which an in-memory SQLite database cannot serve."""
+    return not (database_url.get_backend_name() == 'sqlite' and database_url.database in (None, '', ':memory:'))
+
+
+def write_department_workbook(fileobj, departments, flt, workers=1, on_progress=None):
+    """
+    Write one sheet per department (columns from its TrackingField definitions) to fileobj as XLSX.
+    flt: ActivityFilter applied to every sheet (its department_id is replaced per sheet).
+    With workers > 1 each sheet is built in a separate process and the parts are merged in department order.
+    on_progress(rows written so far) is called as sheets are built.
+    """
+    from openpyxl import Workbook
+
+    titles = workbook_sheet_titles([d.name for d in departments])
+    database_url = db.engine.url
+    wb = Workbook(write_only=True)
+
+    if workers <= 1 or len(departments) <= 1 or not _can_share_database(database_url):
+        written = 0
+        for department, title in zip(departments, titles):
+            rows = counted(department_export_rows(flt.replace(department_id=department.id)), on_progress, offset=written)
+            written += _write_department_sheet(wb, title, department_export_fields(department.id), rows)
+        wb.save(fileobj)
+        return
+
+    url = database_url.render_as_string(hide_password=False)
+    parts, failure, written = {}, None, 0
+    # spawn, not fork: forked children would inherit the parent's pooled connections
+    with ProcessPoolExecutor(max_workers=min(workers, len(departments)),
+                             mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = {pool.submit(_build_department_part, url, title, flt.replace(department_id=d.id).to_dict()): title
+                   for d, title in zip(departments, titles)}
+        for future in as_completed(futures):
+            if future.exception() is not None:
+                failure = failure or future.exception()
+                continue
+            path, count = future.result()
+            parts[futures[future]] = path
+            written += count
+            if on_progress:
+                on_progress(written)
+
+    try:
+        if failure is not None:
+            raise failure
+        for title in titles:
+            _append_department_part(wb, title, parts[title])
+        wb.save(fileobj)
+    finally:
+        for path in parts.values():
+            os.remove(path)
+
+
+# --------------------------
+# Export entry points
+# --------------------------
+EXPORT_FORMATS = {
+    'csv': {'extension': 'csv', 'mimetype': 'text/csv'},
+    'xlsx': {'extension': 'xlsx', 'mimetype': XLSX_MIMETYPE},
+    **COLUMNAR_FORMATS,
+}
+
+
+def export_download_name(kind, fmt):
+    """Attachment file name for an 'activities' (management) or 'department' export."""
+    if kind == 'activities' and fmt == 'xlsx':
+        return 'Department_Daily_Operational_Tracking.xlsx'
+    base = 'activities_export' if kind == 'activities' else 'productivity_entries'
+    return f"{base}.{EXPORT_FORMATS[fmt]['extension']}"
+
+
+def activity_export_total(flt):
+    return export_row_count(activity_export_query(flt), flt)
+
+
+def department_export_total(flt):
+    return export_row_count(department_export_query(flt), flt)
+
+
+def write_activity_export(fileobj, fmt, flt, workers=1, on_progress=None):
+    """
+    Write the management export for an ActivityFilter to a binary file.
+    xlsx writes one sheet per department (just flt.department_id if set).
+    """
+    if fmt == 'xlsx':
+        departments = Department.query.order_by(Department.id)
+        if flt.department_id is not None:
+            departments = departments.filter(Department.id == flt.department_id)
+        write_department_workbook(fileobj, departments.all(), flt, workers, on_progress)
+        return
+
+    rows = counted(activity_export_rows(flt), on_progress)
+    if fmt in COLUMNAR_FORMATS:
+        custom_columns = custom_field_columns(
+            [flt.department_id] if flt.department_id is not None else None,
+            exclude=[name for name, _ in ACTIVITY_COLUMNAR_COLUMNS]
+        )
+        write_columnar(fileobj, fmt, ACTIVITY_COLUMNAR_COLUMNS, custom_columns, rows)
+    else:
+        write_csv(fileobj, ACTIVITY_EXPORT_HEADER, (activity_csv_record(r) for r in rows))
+
+
+def write_department_export(fileobj, fmt, flt, on_progress=None):
+    """Write one department's export (flt.department_id) to a binary file."""
+    if fmt == 'xlsx':
+        write_department_workbook(fileobj, [db.session.get(Department, flt.department_id)], flt,
+                                  on_progress=on_progress)
+        return
+
+    rows = counted(department_export_rows(flt), on_progress)
+    if fmt in COLUMNAR_FORMATS:
+        custom_columns = custom_field_columns(
+            [flt.department_id], exclude=[name for name, _ in DEPARTMENT_COLUMNAR_COLUMNS]
+        )
+        write_columnar(fileobj, fmt, DEPARTMENT_COLUMNAR_COLUMNS, custom_columns, rows)
+    else:
+        fields = department_export_fields(flt.department_id)
+        write_csv(fileobj, department_export_header(fields), department_csv_records(rows, fields))
+
+
+def export_to_tempfile(writer, *args, **kwargs):
+    """Run an export writer into an anonymous temporary file and return it rewound."""
+    fileobj = tempfile.TemporaryFile()
+    try:
+        writer(fileobj, *args, **kwargs)
+    except Exception:
+        fileobj.close()
+        raise
+    fileobj.seek(0)
+    return fileobj
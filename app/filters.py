@@ -0,0 +1,184 @@
+"""
+ActivityFilter: the one place activity filters are parsed, validated and turned into SQL.
+
+Dates always become half-open ranges on the raw timestamp (date_logged >= start AND
+date_logged < end + 1 day), never func.date(column) = day, so the date_logged indexes stay
+usable. Predicates use named bind parameters, so the SQL for a filter shape (which filters
+are set) is identical whatever the values. Statements built through cached() are kept per
+shape and SQLAlchemy's compiled cache serves their SQL.
+"""
+
+from app.models import DepartmentTracking
+from datetime import date, datetime, timedelta
+from sqlalchemy import bindparam
+import threading
+
+# Filter -> request argument names it is read from (management APIs use start/end/dept,
+# the department pages date_from/date_to)
+ARG_NAMES = {
+    'start_date': ('start', 'date_from'),
+    'end_date': ('end', 'date_to'),
+    'department_id': ('dept',),
+    'priority': ('priority',),
+    'status': ('status',),
+    'ticket_type': ('ticket_type',),
+}
+FIELDS = ('start_date', 'end_date', 'department_id', 'user_id', 'priority', 'status', 'ticket_type')
+
+_statements = {}
+_statements_lock = threading.Lock()
+
+
+class ActivityFilter:
+    """
+    Immutable set of DepartmentTracking filters: start_date/end_date (dates, end inclusive),
+    department_id, user_id, priority, status, ticket_type. None means "not filtered".
+    """
+
+    def __init__(self, start_date=None, end_date=None, department_id=None, user_id=None,
+                 priority=None, status=None, ticket_type=None, errors=()):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.department_id = department_id
+        self.user_id = user_id
+        self.priority = priority or None
+        self.status = status or None
+        self.ticket_type = ticket_type or None
+        self.errors = list(errors)
+
+    @classmethod
+    def from_args(cls, args, **fixed):
+        """
+        Parse request args. Invalid values are left out of the filter and described in .errors
+        for the route to report. fixed: filters set by the route (e.g. the user's department),
+        which request args cannot override.
+        """
+        values, errors = {}, []
+        for field, names in ARG_NAMES.items():
+            if field in fixed:
+                continue
+            name = next((n for n in names if args.get(n)), None)
+            if name is None:
+                continue
+            raw = args.get(name).strip()
+            if field in ('start_date', 'end_date'):
+                try:
+                    values[field] = datetime.strptime(raw, '%Y-%m-%d').date()
+                except ValueError:
+                    errors.append(f'{name}: expected a date as YYYY-MM-DD')
+            elif field == 'department_id':
+                try:
+                    values[field] = int(raw)
+                except ValueError:
+                    errors.append(f'{name}: expected a department id')
+            else:
+                values[field] = raw
+
+        values.update(fixed)
+        if values.get('start_date') and values.get('end_date') and values['end_date'] < values['start_date']:
+            errors.append('end date is before start date')
+            values.pop('end_date')
+        return cls(errors=errors, **values)
+
+    @classmethod
+    def for_day(cls, day, **filters):
+        """Entries logged on one (UTC) day."""
+        return cls(start_date=day, end_date=day, **filters)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Inverse of to_dict()."""
+        values = dict(data)
+        for field in ('start_date', 'end_date'):
+            if values.get(field):
+                values[field] = date.fromisoformat(values[field])
+        return cls(**values)
+
+    def to_dict(self):
+        """The set filters as JSON-safe values (dates as ISO strings)."""
+        data = {}
+        for field in FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value.isoformat() if isinstance(value, date) else value
+        return data
+
+    def replace(self, **changes):
+        values = {field: getattr(self, field) for field in FIELDS}
+        values.update(changes)
+        return ActivityFilter(**values)
+
+    @property
+    def start_at(self):
+        """Inclusive lower timestamp bound, or None."""
+        return datetime.combine(self.start_date, datetime.min.time()) if self.start_date else None
+
+    @property
+    def end_before(self):
+        """Exclusive upper timestamp bound (midnight after end_date), or None."""
+        return datetime.combine(self.end_date + timedelta(days=1), datetime.min.time()) if self.end_date else None
+
+    def shape(self):
+        """Which filters are set; statements only differ between shapes."""
+        return tuple(field for field in FIELDS if getattr(self, field) is not None)
+
+    def conditions(self, model=DepartmentTracking):
+        """WHERE predicates on model's columns, with bind parameters named af_<filter>."""
+        columns = {
+            'start_date': (model.date_logged, '>='),
+            'end_date': (model.date_logged, '<'),
+            'department_id': (model.department_id, '=='),
+            'user_id': (model.user_id, '=='),
+            'priority': (model.priority, '=='),
+            'status': (model.status, '=='),
+            'ticket_type': (model.ticket_request_type, '=='),
+        }
+        predicates = []
+        for field in self.shape():
+            column, op = columns[field]
+            param = bindparam(f'af_{field}', type_=column.type)
+            if op == '>=':
+                predicates.append(column >= param)
+            elif op == '<':
+                predicates.append(column < param)
+            else:
+                predicates.append(column == param)
+        return predicates
+
+    def params(self):
+        """Values for the bind parameters of conditions()."""
+        values = {}
+        for field in self.shape():
+            if field == 'start_date':
+                values['af_start_date'] = self.start_at
+            elif field == 'end_date':
+                values['af_end_date'] = self.end_before
+            else:
+                values[f'af_{field}'] = getattr(self, field)
+        return values
+
+    def apply(self, query, model=DepartmentTracking):
+        """Filter an ORM Query."""
+        return query.filter(*self.conditions(model)).params(**self.params())
+
+    def cached(self, key, build):
+        """
+        Return build() with this filter's predicates added, built once per (key, shape).
+        Execute it with .params() as parameters.
+        """
+        cache_key = (key, self.shape())
+        stmt = _statements.get(cache_key)
+        if stmt is None:
+            stmt = build().where(*self.conditions())
+            with _statements_lock:
+                _statements.setdefault(cache_key, stmt)
+        return stmt
+
+    def __eq__(self, other):
+        return isinstance(other, ActivityFilter) and self.to_dict() == other.to_dict()
+
+    def __hash__(self):
+        return hash(tuple(sorted(self.to_dict().items())))
+
+    def __repr__(self):
+        return f'<ActivityFilter {self.to_dict()}>'
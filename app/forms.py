@@ -2,6 +2,11 @@ from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, SubmitField, SelectField, IntegerField, TextAreaField, BooleanField, FieldList, FormField, HiddenField
 from wtforms.validators import DataRequired, Length, EqualTo, Optional
 from wtforms.fields import Field
+import threading
+
+# Generated form classes: department id -> (field definitions they were built from, class)
+_department_form_classes = {}
+_department_form_classes_lock = threading.Lock()
 
 class RegistrationForm(FlaskForm):
     name = StringField('Name', validators=[DataRequired(), Length(min=2, max=150)])
@@ -42,8 +47,21 @@ class DynamicDepartmentTrackingForm(FlaskForm):
     @staticmethod
     def create_form_for_department(department_obj):
         """
-        Factory method to create a form with fields based on department configuration
+        Factory method to create a form with fields based on department configuration.
+        department_obj: a CachedDepartment (app.schema_cache). The form class is built once per
+        set of field definitions and reused until an admin change alters them.
         """
+        fields = tuple(department_obj.tracking_fields)
+        cached = _department_form_classes.get(department_obj.id)
+        if cached is None or cached[0] != fields:
+            cached = (fields, DynamicDepartmentTrackingForm.build_form_class(department_obj))
+            with _department_form_classes_lock:
+                _department_form_classes[department_obj.id] = cached
+        return cached[1]()
+
+    @staticmethod
+    def build_form_class(department_obj):
+        """Build the WTForms class for a department from its TrackingField definitions"""
         class GeneratedForm(FlaskForm):
             activity_description = TextAreaField('Activity Description', validators=[DataRequired(), Length(min=5, max=1000)])
             priority = SelectField('Priority', choices=[('Low', 'Low'), ('Medium', 'Medium'), ('High', 'High')], validators=[Optional()])
@@ -87,7 +105,7 @@ class DynamicDepartmentTrackingForm(FlaskForm):
         # Add submit button
         GeneratedForm.submit = SubmitField('Log Activity')
         
-        return GeneratedForm()
+        return GeneratedForm
 
 class AddUserForm(FlaskForm):
     name = StringField('Full Name', validators=[DataRequired(), Length(min=2, max=150)])
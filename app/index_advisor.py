@@ -0,0 +1,135 @@
+"""
+Index advisor: EXPLAIN the hot activity queries and report any that scan a whole table or index.
+
+Each check builds the same statement the app runs (via the shared query builders in
+analytics, exports and ActivityFilter) with sample ids from the database, so a missing or
+unusable index shows up here before it shows up as a slow page. Run it from
+check_indexes.py after a migration or open /debug/index-advisor as an admin.
+"""
+
+from app import db
+from app.analytics import custom_field_breakdown_statement, department_totals_query, rollup_rows_query, \
+    today_totals_statement, user_totals_query
+from app.exports import activity_export_query, department_export_query
+from app.filters import ActivityFilter
+from app.models import DepartmentTracking, TrackingField
+from datetime import datetime, timedelta
+import json
+
+
+def _statement(query):
+    """Core statement for an ORM Query or a select(), with any bound values attached."""
+    return query.statement if hasattr(query, 'statement') else query
+
+
+def _sql(stmt):
+    return str(stmt.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+
+
+def _sqlite_plan(sql):
+    rows = db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}').all()
+    plan = [row[-1] for row in rows]
+    # Only SEARCH seeks into an index. "SCAN t" reads every row, and "SCAN t USING [COVERING]
+    # INDEX ix" reads every entry of ix; "SCAN CONSTANT ROW" and "SCAN (subquery-1)" read no table.
+    full_scans = []
+    for line in plan:
+        words = line.split()
+        if words[0] != 'SCAN' or words[1] == 'CONSTANT' or words[1].startswith('('):
+            continue
+        full_scans.append(f'{words[1]} (index {words[-1]})' if 'INDEX' in words else words[1])
+    return plan, full_scans
+
+
+def _postgresql_plan(sql):
+    raw = db.session.connection().exec_driver_sql(f'EXPLAIN (FORMAT JSON) {sql}').scalar()
+    tree = (json.loads(raw) if isinstance(raw, str) else raw)[0]['Plan']
+    plan, full_scans = [], []
+
+    def walk(node, depth):
+        relation = node.get('Relation Name')
+        plan.append('  ' * depth + node['Node Type'] + (f' on {relation}' if relation else ''))
+        if node['Node Type'] == 'Seq Scan':
+            full_scans.append(relation)
+        elif node['Node Type'] in ('Index Scan', 'Index Only Scan') and 'Index Cond' not in node:
+            # Walks the whole index (e.g. only for its order), reading every entry
+            full_scans.append(f"{relation} (index {node.get('Index Name')})")
+        for child in node.get('Plans', []):
+            walk(child, depth + 1)
+
+    walk(tree, 0)
+    return plan, full_scans
+
+
+def explain(stmt):
+    """
+    Return (sql, plan lines, full scans) for a statement on the current database. full_scans
+    names each table read in full, as "table (index name)" when it is a full index scan.
+    """
+    sql = _sql(stmt)
+    if db.engine.dialect.name == 'postgresql':
+        plan, full_scans = _postgresql_plan(sql)
+    else:
+        plan, full_scans = _sqlite_plan(sql)
+    return sql, plan, full_scans
+
+
+def _sample_ids():
+    """A (department_id, user_id) pair that has entries, or (1, 1) on an empty database."""
+    row = db.session.query(DepartmentTracking.department_id, DepartmentTracking.user_id).first()
+    return (row[0], row[1]) if row else (1, 1)
+
+
+def advisor_checks():
+    """(name, statement) for each hot query, built with sample ids and the usual date windows."""
+    dept_id, user_id = _sample_ids()
+    today = datetime.utcnow().date()
+    month_ago = today - timedelta(days=29)
+
+    today_flt = ActivityFilter.for_day(today)
+    day_user_flt = ActivityFilter.for_day(today, user_id=user_id, department_id=dept_id)
+    day_dept_flt = ActivityFilter.for_day(today, department_id=dept_id)
+    history_flt = ActivityFilter(department_id=dept_id, user_id=user_id)
+    export_flt = ActivityFilter(start_date=month_ago, end_date=today, priority='High')
+    dept_export_flt = ActivityFilter(start_date=month_ago, end_date=today, department_id=dept_id)
+
+    checks = [
+        ('chart rollup, last 30 days',
+         rollup_rows_query(('day', 'department_id'), month_ago, today, None, None)),
+        ('chart rollup, one department',
+         rollup_rows_query(('day',), month_ago, today, dept_id, None)),
+        ('department totals', department_totals_query([dept_id])),
+        ('user totals', user_totals_query(user_id, dept_id)),
+        ('today totals', today_totals_statement(today_flt).params(**today_flt.params())),
+        ('today entries, user', day_user_flt.apply(DepartmentTracking.query).order_by(DepartmentTracking.date_logged)),
+        ('today entries, department', day_dept_flt.apply(DepartmentTracking.query)),
+        ('department history page',
+         history_flt.apply(DepartmentTracking.query).order_by(
+             DepartmentTracking.date_logged.desc(), DepartmentTracking.id.desc()).limit(21)),
+        ('add-entry history',
+         ActivityFilter(department_id=dept_id).apply(DepartmentTracking.query).order_by(
+             DepartmentTracking.date_logged.desc()).limit(100)),
+        ('activity export, date range and priority',
+         activity_export_query(export_flt).params(**export_flt.params())),
+        ('department export',
+         department_export_query(dept_export_flt).params(**dept_export_flt.params())),
+    ]
+
+    field = TrackingField.query.filter_by(department_id=dept_id).order_by(TrackingField.order).first()
+    if field is not None:
+        breakdown_flt = ActivityFilter(start_date=month_ago, end_date=today)
+        checks.append(('custom field breakdown, last 30 days',
+                       custom_field_breakdown_statement(field, breakdown_flt, 'duration').params(
+                           **breakdown_flt.params())))
+    return checks
+
+
+def run_index_advisor():
+    """
+    EXPLAIN every check. Returns [{'name', 'sql', 'plan', 'full_scans'}]; full_scans lists
+    the tables and indexes each query reads in full and should be empty.
+    """
+    results = []
+    for name, query in advisor_checks():
+        sql, plan, full_scans = explain(_statement(query))
+        results.append({'name': name, 'sql': sql, 'plan': plan, 'full_scans': full_scans})
+    return results
@@ -0,0 +1,44 @@
+"""
+Decoding of the JSON text columns (DepartmentTracking.custom_fields_data, TrackingField.choices).
+
+orjson is used when it is installed (it decodes several times faster than the standard
+library); otherwise this falls back to json. loads_many() decodes a whole batch of rows in
+one call, for exports and list views that read thousands of entries.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # optional: pip install orjson
+    orjson = None
+
+
+def loads(raw):
+    """Decode one JSON document (str or bytes)."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def loads_many(raws, empty=None):
+    """
+    Decode a batch of JSON documents, returning a list in the same order. Null/empty values
+    decode to empty() ({} by default, a fresh object per row). The batch is decoded as one JSON
+    array; if that fails, each is decoded on its own so a malformed one raises as loads() would.
+    """
+    empty = empty or dict
+    raws = list(raws)
+    present = [raw for raw in raws if raw]
+    if not present:
+        return [empty() for _ in raws]
+
+    try:
+        decoded = loads('[' + ','.join(present) + ']')
+    except ValueError:
+        decoded = None
+    # A malformed document can also shift the array (e.g. '1,2'), so check the count too
+    if decoded is None or len(decoded) != len(present):
+        decoded = [loads(raw) for raw in present]
+    decoded = iter(decoded)
+    return [next(decoded) if raw else empty() for raw in raws]
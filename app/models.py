@@ -1,17 +1,55 @@
 from app import db, login_manager
+from app.buckets import time_buckets
+from app.jsoncodec import loads
 from flask_login import UserMixin
+from sqlalchemy import event, inspect
 from datetime import datetime
 import json
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    """
+    Return the logged-in user's identity, from user_identity_cache when possible. Entries are
+    tagged with the USER_DATA version (read once per request), so a user edited or deleted on
+    another worker is reloaded on the next request; USER_CACHE_TTL bounds their age otherwise.
+    """
+    from app.cache import USER_DATA, request_data_version, user_identity_cache
+
+    user_id = int(user_id)
+    version = request_data_version(USER_DATA)
+    identity = user_identity_cache.get(user_id, version)
+    if identity is None:
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        identity = UserIdentity.from_user(user)
+        user_identity_cache.set(user_id, identity, version)
+    return identity
+
+class UserIdentity(UserMixin):
+    """Read-only snapshot of the User fields routes and templates use, cached by load_user"""
+    __slots__ = ('id', 'name', 'department', 'department_id', 'is_admin')
+
+    def __init__(self, id, name, department, department_id, is_admin):
+        self.id = id
+        self.name = name
+        self.department = department
+        self.department_id = department_id
+        self.is_admin = bool(is_admin)
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.name, user.department, user.department_id, user.is_admin)
+
+    def __repr__(self):
+        return f'<UserIdentity {self.name}>'
 
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(150), nullable=False)
     employee_id = db.Column(db.String(50), nullable=False)
-    department = db.Column(db.String(100), nullable=False)
+    department = db.Column(db.String(100), nullable=False)  # department name, kept for display
+    department_id = db.Column(db.Integer, db.ForeignKey('department.id'), index=True)
     login_id = db.Column(db.String(150), unique=True, nullable=False)
     password = db.Column(db.String(200), nullable=False)
     is_admin = db.Column(db.Boolean, default=False)
@@ -24,12 +62,25 @@ class Department(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), unique=True, nullable=False)
     description = db.Column(db.String(500))
+    # Last entry number handed out by allocate_entry_no()
+    last_entry_no = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     tracking_entries = db.relationship('DepartmentTracking', backref='department', lazy=True)
     tracking_fields = db.relationship('TrackingField', backref='department', lazy=True, cascade='all, delete-orphan')
 
     def __repr__(self):
         return f'<Department {self.name}>'
 
+    @staticmethod
+    def allocate_entry_no(department_id):
+        """
+        Reserve the department's next entry number in the current transaction. The UPDATE
+        holds the department row until commit, so concurrent submissions get distinct numbers.
+        """
+        Department.query.filter_by(id=department_id).update(
+            {Department.last_entry_no: Department.last_entry_no + 1}, synchronize_session=False
+        )
+        return db.session.query(Department.last_entry_no).filter_by(id=department_id).scalar()
+
 class TrackingField(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     department_id = db.Column(db.Integer, db.ForeignKey('department.id'), nullable=False)
@@ -45,14 +96,16 @@ class TrackingField(db.Model):
         return f'<TrackingField {self.field_name}>'
     
     def get_choices(self):
-        """Parse choices JSON"""
-        if self.choices:
-            return json.loads(self.choices)
-        return []
+        """Parse choices JSON (decoded once per stored value and kept on the instance)"""
+        cached = getattr(self, '_choices_cache', None)
+        if cached is None or cached[0] is not self.choices:
+            cached = self._choices_cache = (self.choices, loads(self.choices) if self.choices else [])
+        return cached[1]
     
     def set_choices(self, choices_list):
         """Store choices as JSON"""
         self.choices = json.dumps(choices_list) if choices_list else None
+        self._choices_cache = None
 
 class DepartmentTracking(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -70,19 +123,104 @@ class DepartmentTracking(db.Model):
     # New field to store custom field values as JSON
     custom_fields_data = db.Column(db.Text)  # JSON object with custom field values
     date_logged = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Time buckets of date_logged (UTC), filled on write so analytics group on plain indexed columns
+    log_day = db.Column(db.Date, index=True)
+    log_weekday = db.Column(db.Integer)  # 0 = Sunday
+    log_hour = db.Column(db.Integer)
+    # Typed copies of custom_fields_data (app/custom_fields.py)
+    field_values = db.relationship('TrackingFieldValue', backref='entry', lazy=True,
+                                   cascade='all, delete-orphan', passive_deletes=True)
+
+    __table_args__ = (
+        db.Index('ix_department_tracking_weekday_hour', 'log_weekday', 'log_hour'),
+        # Department pages and exports: department_id = ? AND date_logged range, newest first
+        db.Index('ix_department_tracking_department_logged', 'department_id', 'date_logged'),
+        # Personal history and today lists: user_id = ? AND department_id = ? AND date_logged range
+        db.Index('ix_department_tracking_user_department_logged', 'user_id', 'department_id', 'date_logged'),
+        # Management exports and today totals: date_logged range, optionally by priority
+        db.Index('ix_department_tracking_logged_priority', 'date_logged', 'priority'),
+    )
 
     def __repr__(self):
         return f'<DepartmentTracking {self.activity_description}>'
     
     def get_custom_fields_data(self):
-        """Parse custom fields data JSON"""
-        if self.custom_fields_data:
-            return json.loads(self.custom_fields_data)
-        return {}
+        """Parse custom fields data JSON (decoded once per stored value and kept on the instance)"""
+        cached = getattr(self, '_custom_fields_cache', None)
+        if cached is None or cached[0] is not self.custom_fields_data:
+            raw = self.custom_fields_data
+            cached = self._custom_fields_cache = (raw, loads(raw) if raw else {})
+        return cached[1]
     
     def set_custom_fields_data(self, data_dict):
         """Store custom fields data as JSON"""
         self.custom_fields_data = json.dumps(data_dict) if data_dict else None
+        self._custom_fields_cache = None
+
+class TrackingFieldValue(db.Model):
+    """
+    One custom field value of a DepartmentTracking entry, typed so it can be indexed, filtered and grouped in SQL.
+    Mirrors custom_fields_data (which stays the source for forms and exports); see app/custom_fields.py.
+    """
+    __tablename__ = 'tracking_field_value'
+
+    id = db.Column(db.Integer, primary_key=True)
+    entry_id = db.Column(db.Integer, db.ForeignKey('department_tracking.id', ondelete='CASCADE'), nullable=False, index=True)
+    field_id = db.Column(db.Integer, db.ForeignKey('tracking_field.id', ondelete='CASCADE'), nullable=False)
+    value_text = db.Column(db.String(500))  # every value, as text (long values are truncated)
+    value_number = db.Column(db.Float)  # number fields (and numeric text)
+    value_date = db.Column(db.Date)  # date fields
+
+    __table_args__ = (
+        db.UniqueConstraint('entry_id', 'field_id', name='uq_tracking_field_value_entry_field'),
+        db.Index('ix_tracking_field_value_field_text', 'field_id', 'value_text'),
+        db.Index('ix_tracking_field_value_field_number', 'field_id', 'value_number'),
+        db.Index('ix_tracking_field_value_field_date', 'field_id', 'value_date'),
+    )
+
+    def __repr__(self):
+        return f'<TrackingFieldValue entry={self.entry_id} field={self.field_id} {self.value_text!r}>'
+
+# Columns that identify an ActivityRollup row (uq_activity_rollup_key)
+ROLLUP_KEY_COLUMNS = ('day', 'weekday', 'hour', 'department_id', 'user_id', 'priority', 'ticket_request_type', 'status')
+
+class ActivityRollup(db.Model):
+    """
+    Pre-aggregated DepartmentTracking counts for analytics, one row per hourly bucket and dimension set.
+    Missing priority/type/status are stored as '' so the unique key also covers them (NULLs never conflict).
+    """
+    __tablename__ = 'activity_rollup'
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    weekday = db.Column(db.Integer, nullable=False)  # 0 = Sunday, derived from day
+    hour = db.Column(db.Integer, nullable=False)  # 0-23 (UTC)
+    department_id = db.Column(db.Integer, db.ForeignKey('department.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    priority = db.Column(db.String(50), nullable=False, default='', server_default='')
+    ticket_request_type = db.Column(db.String(200), nullable=False, default='', server_default='')
+    status = db.Column(db.String(50), nullable=False, default='', server_default='')
+    entry_count = db.Column(db.Integer, nullable=False, default=0)
+    duration_total = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint(*ROLLUP_KEY_COLUMNS, name='uq_activity_rollup_key'),
+        db.Index('ix_activity_rollup_day_department', 'day', 'department_id'),
+        db.Index('ix_activity_rollup_department', 'department_id'),  # all-time department totals
+    )
+
+    def __repr__(self):
+        return f'<ActivityRollup {self.day} {self.hour} dept={self.department_id} user={self.user_id}>'
+
+class DataVersion(db.Model):
+    """Named counters bumped on writes; process-local caches compare them to detect stale entries"""
+    __tablename__ = 'data_version'
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<DataVersion {self.name}={self.version}>'
 
 class Grievance(db.Model):
     """Model for employee grievances"""
@@ -109,6 +247,11 @@ class Grievance(db.Model):
     
     # Timestamps
     submitted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    # Time buckets of submitted_at (UTC), filled on write
+    submitted_day = db.Column(db.Date, index=True)
+    submitted_month = db.Column(db.Date, index=True)  # first day of the month
+    submitted_weekday = db.Column(db.Integer)  # 0 = Sunday
+    submitted_hour = db.Column(db.Integer)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
     # Relationships
@@ -156,4 +299,46 @@ class GrievanceAttachment(db.Model):
     sha256_hash = db.Column(db.String(64))  # for integrity verification
     
     def __repr__(self):
-        return f'<GrievanceAttachment {self.original_filename}>'
\ No newline at end of file
+        return f'<GrievanceAttachment {self.original_filename}>'
+
+
+# --------------------------
+# User department link
+# --------------------------
+@event.listens_for(User, 'before_insert')
+@event.listens_for(User, 'before_update')
+def _set_user_department_id(mapper, connection, target):
+    """Fill department_id from the department name for writers that only set the name (setup scripts)."""
+    state = inspect(target)
+    if state.attrs.department_id.history.has_changes():
+        return
+    if target.department_id is None or state.attrs.department.history.has_changes():
+        target.department_id = connection.execute(
+            db.select(Department.id).where(Department.name == target.department)
+        ).scalar()
+
+
+# --------------------------
+# Time bucket maintenance
+# --------------------------
+@event.listens_for(DepartmentTracking, 'before_insert')
+@event.listens_for(DepartmentTracking, 'before_update')
+def _set_tracking_time_buckets(mapper, connection, target):
+    if target.date_logged is None:
+        target.date_logged = datetime.utcnow()
+    buckets = time_buckets(target.date_logged)
+    target.log_day = buckets['day']
+    target.log_weekday = buckets['weekday']
+    target.log_hour = buckets['hour']
+
+
+@event.listens_for(Grievance, 'before_insert')
+@event.listens_for(Grievance, 'before_update')
+def _set_grievance_time_buckets(mapper, connection, target):
+    if target.submitted_at is None:
+        target.submitted_at = datetime.utcnow()
+    buckets = time_buckets(target.submitted_at)
+    target.submitted_day = buckets['day']
+    target.submitted_month = buckets['month']
+    target.submitted_weekday = buckets['weekday']
+    target.submitted_hour = buckets['hour']
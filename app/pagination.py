@@ -0,0 +1,74 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are read newest first by (order_column, id_column) with a WHERE on the last row seen
+instead of OFFSET, so every page costs the same however deep it is. Cursors are opaque
+URL-safe tokens holding that position and the direction to read in.
+"""
+
+from datetime import date, datetime
+from sqlalchemy import or_
+import base64
+import json
+
+
+def encode_cursor(value, row_id, direction):
+    if isinstance(value, (date, datetime)):
+        value = value.isoformat()
+    raw = json.dumps([value, row_id, direction], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, order_column):
+    """Return (value, row_id, direction); raise ValueError for a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        value, row_id, direction = json.loads(raw)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError('invalid cursor') from e
+    if direction not in ('next', 'prev') or not isinstance(row_id, int):
+        raise ValueError('invalid cursor')
+
+    python_type = order_column.type.python_type
+    if python_type is datetime:
+        value = datetime.fromisoformat(value)
+    elif python_type is date:
+        value = date.fromisoformat(value)
+    return value, row_id, direction
+
+
+def keyset_page(query, order_column, id_column, per_page, cursor=None):
+    """
+    Return (items, next_cursor, prev_cursor) for one page of query, newest first.
+    next_cursor/prev_cursor are None at either end. Raises ValueError for a bad cursor.
+    """
+    direction = 'next'
+    if cursor:
+        value, row_id, direction = decode_cursor(cursor, order_column)
+        # The leading range keeps the order_column index usable; the OR breaks ties on id
+        if direction == 'next':
+            query = query.filter(order_column <= value, or_(order_column < value, id_column < row_id))
+        else:
+            query = query.filter(order_column >= value, or_(order_column > value, id_column > row_id))
+
+    if direction == 'next':
+        query = query.order_by(order_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(order_column.asc(), id_column.asc())
+
+    items = query.limit(per_page + 1).all()
+    has_more = len(items) > per_page
+    items = items[:per_page]
+    if direction == 'prev':
+        items.reverse()
+
+    has_next = has_more if direction == 'next' else True
+    has_prev = bool(cursor) if direction == 'next' else has_more
+    if not items:
+        return items, None, None
+
+    order_key, id_key = order_column.key, id_column.key
+    first, last = items[0], items[-1]
+    next_cursor = encode_cursor(getattr(last, order_key), getattr(last, id_key), 'next') if has_next else None
+    prev_cursor = encode_cursor(getattr(first, order_key), getattr(first, id_key), 'prev') if has_prev else None
+    return items, next_cursor, prev_cursor
@@ -1,14 +1,27 @@
-from flask import Blueprint, render_template, url_for, flash, redirect, session, request, jsonify, current_app
+from flask import Blueprint, render_template, url_for, flash, redirect, session, request, jsonify, current_app, abort, make_response, Response, stream_with_context, send_file
 from flask_login import login_user, logout_user, login_required, current_user
 from app import db, bcrypt
 from app.models import User, Department, DepartmentTracking, TrackingField, Grievance, GrievanceAudit, GrievanceAttachment
+from app.analytics import department_stats, today_totals, user_activity_totals, record_entry_in_rollup, remove_user_from_rollup, cached_dashboard_series, cached_custom_field_breakdown, analytics_cache, DASHBOARD_SERIES, BREAKDOWN_METRICS
+from app.exports import (ACTIVITY_EXPORT_HEADER, activity_export_rows, activity_csv_record, csv_chunks,
+                         department_export_fields, department_export_header, department_export_rows, department_csv_records,
+                         EXPORT_FORMATS, export_download_name, export_to_tempfile, write_activity_export,
+                         write_department_export)
+from app.export_jobs import submit_export_job, get_export_job, export_job_artifact, job_status_payload
+from app.cache import ACTIVITY_DATA, GRIEVANCE_DATA, VersionedLRUCache, SCHEMA_DATA, USER_DATA, bump_data_version, \
+    request_data_version, table_watermark, user_identity_cache
+from app.custom_fields import record_custom_field_values, remove_field_values, remove_user_field_values, retype_field_values
+from app.filters import ActivityFilter
+from app.pagination import keyset_page
+from app.schema_cache import all_departments, get_department, get_department_by_name
+from app.index_advisor import run_index_advisor
 from app.forms import RegistrationForm, LoginForm, DepartmentTrackingForm, DynamicDepartmentTrackingForm, AddUserForm, EditUserForm, TrackingFieldForm
 from datetime import datetime, timedelta
-from sqlalchemy import func
+from functools import wraps
+from sqlalchemy import case, func, tuple_
+import hashlib
 import uuid
 import re
-import csv
-import io
 
 # Create a Blueprint
 main = Blueprint('main', __name__)
@@ -30,6 +43,89 @@ def _parse_sla_minutes(value):
         return int(number * 60)
     return int(number)
 
+
+def _invalid_filters(flt):
+    return jsonify({'error': 'invalid filters', 'details': flt.errors}), 400
+
+
+def _chart_series(names):
+    """Parse the management chart filters from the request once and compute the named series.
+    Returns {name: payload}. Invalid filter values are rejected with 400.
+    """
+    flt = ActivityFilter.from_args(request.args)
+    if flt.errors:
+        abort(make_response(_invalid_filters(flt)))
+
+    departments = [d for d in all_departments() if d.name != 'Management']
+    return cached_dashboard_series(
+        names,
+        departments,
+        start_date=flt.start_date,
+        end_date=flt.end_date,
+        dept_id=flt.department_id,
+        priority=flt.priority,
+        limit=request.args.get('limit', 10, type=int),
+        users_mode=request.args.get('mode', 'all')
+    )
+
+
+def _current_department():
+    """The logged-in user's CachedDepartment (by department_id; the name for users not yet backfilled)."""
+    if current_user.department_id is not None:
+        return get_department(current_user.department_id)
+    return get_department_by_name(current_user.department)
+
+
+def _export_job_response(job, reused):
+    payload = job_status_payload(job, url_for('main.download_export_job', job_id=job['id']))
+    payload['reused'] = reused
+    payload['status_url'] = url_for('main.export_job_status', job_id=job['id'])
+    return jsonify(payload), 202
+
+
+def _activity_watermark():
+    return table_watermark(ACTIVITY_DATA, DepartmentTracking.id)
+
+
+def _activity_schema_watermark():
+    """_activity_watermark() plus the SCHEMA_DATA version, for responses that describe tracking fields."""
+    return f'{_activity_watermark()}-{request_data_version(SCHEMA_DATA)}'
+
+
+def _grievance_watermark():
+    return table_watermark(GRIEVANCE_DATA, Grievance.id)
+
+
+def conditional_get(watermark):
+    """
+    Add ETag / If-None-Match support to an admin-only JSON endpoint.
+    The ETag hashes the path, query args, today's date (some defaults are date-relative) and
+    watermark(); a matching If-None-Match gets a 304 without running the view.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Let the view reject non-admins itself
+            if not current_user.is_admin:
+                return view(*args, **kwargs)
+
+            args_key = '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+            raw = f'{request.path}?{args_key}|{datetime.utcnow().date()}|{watermark()}'
+            etag = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+            if etag in request.if_none_match:
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
+
+
 # --------------------------
 # Home Route
 # --------------------------
@@ -68,12 +164,14 @@ def register():
             name=form.name.data,
             employee_id=form.employee_id.data,
             department=dept.name,
+            department_id=dept.id,
             login_id=form.login_id.data,
             password=hashed_pw
         )
 
-        # Add and commit to the database
+        # Add and commit to the database (user counts feed the management charts)
         db.session.add(new_user)
+        bump_data_version(ACTIVITY_DATA)
         db.session.commit()
 
         flash('Account created successfully! You can now log in.', 'success')
@@ -151,7 +249,7 @@ def dashboard():
 @login_required
 def department_tracking():
     # Get user's department
-    user_dept = Department.query.filter_by(name=current_user.department).first()
+    user_dept = _current_department()
     
     if not user_dept:
         flash('Your department is not configured. Please contact support.', 'danger')
@@ -160,20 +258,12 @@ def department_tracking():
     today = datetime.utcnow().date()
     
     # Get today's entries for current user in their department
-    today_entries = DepartmentTracking.query.filter(
-        DepartmentTracking.user_id == current_user.id,
-        DepartmentTracking.department_id == user_dept.id,
-        func.date(DepartmentTracking.date_logged) == today
-    ).all()
+    today_entries = ActivityFilter.for_day(
+        today, user_id=current_user.id, department_id=user_dept.id
+    ).apply(DepartmentTracking.query).order_by(DepartmentTracking.date_logged).all()
     
     # Get overall stats for user's department
-    all_entries = DepartmentTracking.query.filter(
-        DepartmentTracking.user_id == current_user.id,
-        DepartmentTracking.department_id == user_dept.id
-    ).all()
-    
-    total_entries = len(all_entries)
-    total_duration = sum(entry.duration_mins or 0 for entry in all_entries)
+    total_entries, total_duration = user_activity_totals(current_user.id, user_dept.id)
     
     return render_template('department_tracking.html', 
                          department=user_dept,
@@ -190,7 +280,7 @@ def department_tracking():
 @login_required
 def add_department_entry():
     # Get user's department
-    user_dept = Department.query.filter_by(name=current_user.department).first()
+    user_dept = _current_department()
     
     if not user_dept:
         flash('Your department is not configured. Please contact support.', 'danger')
@@ -199,12 +289,8 @@ def add_department_entry():
     # Use dynamic form based on department configuration
     form = DynamicDepartmentTrackingForm.create_form_for_department(user_dept)
 
-    next_entry_no = DepartmentTracking.query.filter_by(department_id=user_dept.id).count() + 1
     today = datetime.utcnow().date()
-    today_entries = DepartmentTracking.query.filter(
-        DepartmentTracking.department_id == user_dept.id,
-        func.date(DepartmentTracking.date_logged) == today
-    ).all()
+    today_entries = ActivityFilter.for_day(today, department_id=user_dept.id).apply(DepartmentTracking.query).all()
     high_priority_count = sum(
         1 for entry in today_entries
         if (entry.priority or '').lower() in ['high', 'urgent']
@@ -217,30 +303,17 @@ def add_department_entry():
         if entry.duration_mins and entry.duration_mins > sla_minutes:
             sla_breached_count += 1
 
-    date_from = request.args.get('date_from')
-    date_to = request.args.get('date_to')
-    status_filter = request.args.get('status')
-    priority_filter = request.args.get('priority')
-
-    history_query = DepartmentTracking.query.filter_by(department_id=user_dept.id)
-    if date_from:
-        try:
-            start_date = datetime.strptime(date_from, '%Y-%m-%d')
-            history_query = history_query.filter(DepartmentTracking.date_logged >= start_date)
-        except ValueError:
-            date_from = None
-    if date_to:
-        try:
-            end_date = datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1)
-            history_query = history_query.filter(DepartmentTracking.date_logged < end_date)
-        except ValueError:
-            date_to = None
-    if status_filter:
-        history_query = history_query.filter(DepartmentTracking.status == status_filter)
-    if priority_filter:
-        history_query = history_query.filter(DepartmentTracking.priority == priority_filter)
-
-    history_entries = history_query.order_by(DepartmentTracking.date_logged.desc()).limit(100).all()
+    history_filter = ActivityFilter.from_args(request.args, department_id=user_dept.id)
+    for error in history_filter.errors:
+        flash(f'Filter ignored ({error}).', 'warning')
+    date_from = history_filter.start_date.isoformat() if history_filter.start_date else None
+    date_to = history_filter.end_date.isoformat() if history_filter.end_date else None
+    status_filter = history_filter.status
+    priority_filter = history_filter.priority
+
+    history_entries = history_filter.apply(DepartmentTracking.query).order_by(
+        DepartmentTracking.date_logged.desc()
+    ).limit(100).all()
 
     if form.validate_on_submit():
         # Only set legacy fields if they exist in the form (backward compatibility)
@@ -256,14 +329,15 @@ def add_department_entry():
 
         # Collect custom field data
         custom_fields_data = {}
+        entry_no = Department.allocate_entry_no(user_dept.id)
 
-        # Get all tracking fields for this department
-        tracking_fields = TrackingField.query.filter_by(department_id=user_dept.id).all()
+        # Tracking fields for this department, from the schema cache
+        tracking_fields = user_dept.tracking_fields
 
         # Collect custom field values from form
         for field_def in tracking_fields:
             if field_def.field_name in ['entry_no']:
-                custom_fields_data['entry_no'] = next_entry_no
+                custom_fields_data['entry_no'] = entry_no
                 continue
             if field_def.field_name in ['priority', 'sla_tat', 'duration_mins', 'frequency_per_day', 'status']:
                 continue
@@ -291,12 +365,18 @@ def add_department_entry():
         if custom_fields_data:
             entry.set_custom_fields_data(custom_fields_data)
 
+        record_custom_field_values(entry, tracking_fields)
         db.session.add(entry)
+        record_entry_in_rollup(entry)
+        bump_data_version(ACTIVITY_DATA)
         db.session.commit()
 
         flash('Activity logged successfully!', 'success')
         return redirect(url_for('main.department_tracking'))
 
+    # Preview only; the number is allocated when the entry is saved
+    next_entry_no = db.session.query(Department.last_entry_no).filter_by(id=user_dept.id).scalar() + 1
+
     return render_template(
         'add_department_entry.html',
         form=form,
@@ -317,74 +397,93 @@ def add_department_entry():
 @main.route('/export-department-entries')
 @login_required
 def export_department_entries():
-    user_dept = Department.query.filter_by(name=current_user.department).first()
+    user_dept = _current_department()
     if not user_dept:
         flash('Your department is not configured. Please contact support.', 'danger')
         return redirect(url_for('main.department_tracking'))
 
-    date_from = request.args.get('date_from')
-    date_to = request.args.get('date_to')
-    status_filter = request.args.get('status')
-    priority_filter = request.args.get('priority')
-
-    export_query = DepartmentTracking.query.filter_by(department_id=user_dept.id)
-    if date_from:
-        try:
-            start_date = datetime.strptime(date_from, '%Y-%m-%d')
-            export_query = export_query.filter(DepartmentTracking.date_logged >= start_date)
-        except ValueError:
-            pass
-    if date_to:
-        try:
-            end_date = datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1)
-            export_query = export_query.filter(DepartmentTracking.date_logged < end_date)
-        except ValueError:
-            pass
-    if status_filter:
-        export_query = export_query.filter(DepartmentTracking.status == status_filter)
-    if priority_filter:
-        export_query = export_query.filter(DepartmentTracking.priority == priority_filter)
-
-    entries = export_query.order_by(DepartmentTracking.date_logged.desc()).all()
-
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow([
-        'Activity No',
-        'Date Logged',
-        'Employee',
-        'Priority',
-        'SLA / TAT',
-        'Duration (mins)',
-        'Frequency per Day',
-        'Status',
-        'Activity Description',
-        'Custom Fields'
-    ])
-
-    for entry in entries:
-        custom_fields = entry.get_custom_fields_data() if entry.custom_fields_data else {}
-        writer.writerow([
-            custom_fields.get('entry_no', ''),
-            entry.date_logged.strftime('%Y-%m-%d %H:%M'),
-            entry.user.name if entry.user else '',
-            entry.priority or '',
-            entry.sla_tat or '',
-            entry.duration_mins or '',
-            entry.frequency_per_day or '',
-            entry.status or '',
-            entry.activity_description or '',
-            custom_fields
-        ])
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        flash(f'Unsupported export format "{export_format}".', 'danger')
+        return redirect(url_for('main.add_department_entry'))
+
+    flt = ActivityFilter.from_args(request.args, department_id=user_dept.id)
+    if flt.errors:
+        flash(f'Invalid export filters: {"; ".join(flt.errors)}.', 'danger')
+        return redirect(url_for('main.add_department_entry'))
+
+    if export_format != 'csv':
+        fileobj = export_to_tempfile(write_department_export, export_format, flt)
+        return send_file(fileobj, mimetype=EXPORT_FORMATS[export_format]['mimetype'], as_attachment=True,
+                         download_name=export_download_name('department', export_format))
+
+    # One column per custom tracking field, in the department's display order
+    fields = department_export_fields(user_dept.id)
+    records = department_csv_records(department_export_rows(flt), fields)
 
     response = current_app.response_class(
-        output.getvalue(),
+        stream_with_context(csv_chunks(department_export_header(fields), records)),
         mimetype='text/csv'
     )
     response.headers['Content-Disposition'] = 'attachment; filename=productivity_entries.csv'
     return response
 
 
+@main.route('/export-department-entries/jobs', methods=['POST'])
+@login_required
+def submit_department_export_job():
+    """Start a background export of the user's department entries (same args as export_department_entries)."""
+    user_dept = _current_department()
+    if not user_dept:
+        return jsonify({'error': 'department not configured'}), 400
+
+    export_format = request.values.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f'unsupported format: {export_format}'}), 400
+
+    flt = ActivityFilter.from_args(request.values, department_id=user_dept.id)
+    if flt.errors:
+        return _invalid_filters(flt)
+
+    job, reused = submit_export_job(
+        current_app._get_current_object(), 'department', export_format, flt, user_id=current_user.id
+    )
+    return _export_job_response(job, reused)
+
+
+def _export_job_for_current_user(job_id):
+    """Load a job the current user may see: admins see all, others their own department's exports."""
+    job = get_export_job(current_app, job_id)
+    if job is None or current_user.is_admin:
+        return job
+    user_dept = _current_department()
+    if job['kind'] == 'department' and user_dept and job['department_id'] == user_dept.id:
+        return job
+    return None
+
+
+@main.route('/api/export-jobs/<job_id>')
+@login_required
+def export_job_status(job_id):
+    """Progress of a background export: status, rows_done/rows_total, progress (%) and download_url when done."""
+    job = _export_job_for_current_user(job_id)
+    if job is None:
+        return jsonify({'error': 'not found'}), 404
+    return jsonify(job_status_payload(job, url_for('main.download_export_job', job_id=job_id)))
+
+
+@main.route('/api/export-jobs/<job_id>/download')
+@login_required
+def download_export_job(job_id):
+    job = _export_job_for_current_user(job_id)
+    if job is None:
+        return jsonify({'error': 'not found'}), 404
+    path = export_job_artifact(current_app, job)
+    if path is None:
+        return jsonify({'error': 'export not available', 'status': job['status']}), 409 if job['status'] != 'done' else 410
+    return send_file(path, mimetype=job['mimetype'], as_attachment=True, download_name=job['download_name'])
+
+
 # --------------------------
 # Management Dashboard - Overall Productivity
 # --------------------------
@@ -397,40 +496,15 @@ def management_dashboard():
         return redirect(url_for('main.department_tracking'))
     
     # Get all departments except 'Management'
-    departments = Department.query.filter(Department.name != 'Management').all()
-    
-    # Compile department stats
-    department_stats = []
-    total_all_entries = 0
-    total_all_duration = 0
-    
-    for dept in departments:
-        entries = DepartmentTracking.query.filter_by(department_id=dept.id).all()
-        total_entries = len(entries)
-        total_duration = sum(entry.duration_mins or 0 for entry in entries)
-        avg_duration = total_duration / total_entries if total_entries > 0 else 0
-        
-        # Count users in this department
-        users_count = db.session.query(func.count(User.id)).filter(User.department == dept.name).scalar()
-        
-        department_stats.append({
-            'id': dept.id,
-            'name': dept.name,
-            'total_entries': total_entries,
-            'total_duration': total_duration,
-            'avg_duration': round(avg_duration, 2),
-            'users_count': users_count
-        })
-        
-        total_all_entries += total_entries
-        total_all_duration += total_duration
+    departments = [d for d in all_departments() if d.name != 'Management']
+    
+    # Compile department stats with grouped queries
+    stats = department_stats(departments)
+    total_all_entries = stats['total_entries']
+    total_all_duration = stats['total_duration']
     
     # Get today's stats
-    today = datetime.utcnow().date()
-    today_entries = DepartmentTracking.query.filter(
-        func.date(DepartmentTracking.date_logged) == today
-    ).all()
-    today_duration = sum(entry.duration_mins or 0 for entry in today_entries)
+    today_count, today_duration = today_totals()
     
     # Get total users
     total_users = User.query.count()
@@ -439,11 +513,11 @@ def management_dashboard():
     overall_avg_duration = total_all_duration / total_all_entries if total_all_entries > 0 else 0
     
     return render_template('management_dashboard.html',
-                         department_stats=department_stats,
+                         department_stats=stats['department_stats'],
                          total_entries=total_all_entries,
                          total_duration=total_all_duration,
                          overall_avg_duration=round(overall_avg_duration, 2),
-                         today_entries=len(today_entries),
+                         today_entries=today_count,
                          today_duration=today_duration,
                          total_users=total_users,
                          departments_count=len(departments))
@@ -451,558 +525,237 @@ def management_dashboard():
 
 @main.route('/api/management/activities-by-dept')
 @login_required
+@conditional_get(_activity_watermark)
 def api_activities_by_dept():
     """Return JSON counts of activities per department. Optional query params: start, end (YYYY-MM-DD), dept, priority."""
     if not current_user.is_admin:
         return jsonify({'error': 'forbidden'}), 403
-
-    start = request.args.get('start')
-    end = request.args.get('end')
-    dept_filter = request.args.get('dept')
-    priority_filter = request.args.get('priority')
-
-    departments = Department.query.filter(Department.name != 'Management').order_by(Department.id).all()
-    if dept_filter:
-        try:
-            dept_id = int(dept_filter)
-            departments = [d for d in departments if d.id == dept_id]
-        except Exception:
-            pass
-    
-    labels = []
-    counts = []
-
-    for dept in departments:
-        q = DepartmentTracking.query.filter_by(department_id=dept.id)
-        if start:
-            try:
-                start_dt = datetime.strptime(start, '%Y-%m-%d')
-                q = q.filter(DepartmentTracking.date_logged >= start_dt)
-            except Exception:
-                pass
-        if end:
-            try:
-                end_dt = datetime.strptime(end, '%Y-%m-%d')
-                end_dt = end_dt + timedelta(days=1)
-                q = q.filter(DepartmentTracking.date_logged < end_dt)
-            except Exception:
-                pass
-        if priority_filter:
-            q = q.filter(DepartmentTracking.priority == priority_filter)
-
-        labels.append(dept.name)
-        counts.append(q.count())
-
-    return jsonify({'labels': labels, 'counts': counts})
+    return jsonify(_chart_series(['activities_by_dept'])['activities_by_dept'])
 
 
 @main.route('/api/management/duration-by-dept')
 @login_required
+@conditional_get(_activity_watermark)
 def api_duration_by_dept():
     """Return JSON duration totals per department broken down by priority.
     Optional query params: start, end (YYYY-MM-DD), dept, priority.
     """
     if not current_user.is_admin:
         return jsonify({'error': 'forbidden'}), 403
-
-    start = request.args.get('start')
-    end = request.args.get('end')
-    dept_filter = request.args.get('dept')
-    priority_filter = request.args.get('priority')
-
-    departments = Department.query.filter(Department.name != 'Management').order_by(Department.id).all()
-    if dept_filter:
-        try:
-            dept_id = int(dept_filter)
-            departments = [d for d in departments if d.id == dept_id]
-        except Exception:
-            pass
-
-    # collect priority values present in the filtered set
-    priority_set = set()
-    base_q = DepartmentTracking.query
-    if start:
-        try:
-            start_dt = datetime.strptime(start, '%Y-%m-%d')
-            base_q = base_q.filter(DepartmentTracking.date_logged >= start_dt)
-        except Exception:
-            pass
-    if end:
-        try:
-            end_dt = datetime.strptime(end, '%Y-%m-%d') + timedelta(days=1)
-            base_q = base_q.filter(DepartmentTracking.date_logged < end_dt)
-        except Exception:
-            pass
-    if dept_filter:
-        try:
-            dept_id = int(dept_filter)
-            base_q = base_q.filter(DepartmentTracking.department_id == dept_id)
-        except Exception:
-            pass
-    if priority_filter:
-        base_q = base_q.filter(DepartmentTracking.priority == priority_filter)
-
-    for p in base_q.with_entities(DepartmentTracking.priority).distinct().all():
-        val = (p[0] or 'Other')
-        priority_set.add(val)
-
-    priorities = sorted(priority_set) if priority_set else ['High', 'Medium', 'Low', 'Other']
-
-    labels = [d.name for d in departments]
-
-    # Build series: for each priority, list total duration per department
-    series = []
-    for pr in priorities:
-        durations = []
-        for dept in departments:
-            q = DepartmentTracking.query.filter_by(department_id=dept.id)
-            if start:
-                try:
-                    start_dt = datetime.strptime(start, '%Y-%m-%d')
-                    q = q.filter(DepartmentTracking.date_logged >= start_dt)
-                except Exception:
-                    pass
-            if end:
-                try:
-                    end_dt = datetime.strptime(end, '%Y-%m-%d') + timedelta(days=1)
-                    q = q.filter(DepartmentTracking.date_logged < end_dt)
-                except Exception:
-                    pass
-            if priority_filter:
-                q = q.filter(DepartmentTracking.priority == priority_filter)
-
-            total = 0
-            for entry in q.all():
-                pval = entry.priority or 'Other'
-                if pval == pr:
-                    total += (entry.duration_mins or 0)
-            durations.append(total)
-        series.append({'priority': pr, 'durations': durations})
-
-    return jsonify({'labels': labels, 'priorities': priorities, 'series': series})
+    return jsonify(_chart_series(['duration_by_dept'])['duration_by_dept'])
 
 
 @main.route('/api/management/avg-duration-by-dept')
 @login_required
+@conditional_get(_activity_watermark)
 def api_avg_duration_by_dept():
     """Return JSON average duration per department. Optional query params: start, end (YYYY-MM-DD), dept, priority."""
     if not current_user.is_admin:
         return jsonify({'error': 'forbidden'}), 403
-
-    start = request.args.get('start')
-    end = request.args.get('end')
-    dept_filter = request.args.get('dept')
-    priority_filter = request.args.get('priority')
-
-    departments = Department.query.filter(Department.name != 'Management').order_by(Department.id).all()
-    if dept_filter:
-        try:
-            dept_id = int(dept_filter)
-            departments = [d for d in departments if d.id == dept_id]
-        except Exception:
-            pass
-    
-    labels = []
-    averages = []
-
-    for dept in departments:
-        q = DepartmentTracking.query.filter_by(department_id=dept.id)
-        if start:
-            try:
-                start_dt = datetime.strptime(start, '%Y-%m-%d')
-                q = q.filter(DepartmentTracking.date_logged >= start_dt)
-            except Exception:
-                pass
-        if end:
-            try:
-                end_dt = datetime.strptime(end, '%Y-%m-%d') + timedelta(days=1)
-                q = q.filter(DepartmentTracking.date_logged < end_dt)
-            except Exception:
-                pass
-        if priority_filter:
-            q = q.filter(DepartmentTracking.priority == priority_filter)
-
-        entries = q.all()
-        total = sum(e.duration_mins or 0 for e in entries)
-        avg = (total / len(entries)) if len(entries) > 0 else 0
-
-        labels.append(dept.name)
-        averages.append(round(avg, 2))
-
-    return jsonify({'labels': labels, 'averages': averages})
+    return jsonify(_chart_series(['avg_duration_by_dept'])['avg_duration_by_dept'])
 
 
 @main.route('/api/management/activities-over-time')
 @login_required
+@conditional_get(_activity_watermark)
 def api_activities_over_time():
-    """Return daily activity counts for a date range.
+    """Return daily activity counts for a date range (default: last 30 days).
     Query params: start, end (YYYY-MM-DD). Optional dept (department id) to filter.
     """
     if not current_user.is_admin:
         return jsonify({'error': 'forbidden'}), 403
-
-    start = request.args.get('start')
-    end = request.args.get('end')
-    dept_id = request.args.get('dept')
-
-    # Default: last 30 days
-    today = datetime.utcnow().date()
-    if not end:
-        end_date = today
-    else:
-        try:
-            end_date = datetime.strptime(end, '%Y-%m-%d').date()
-        except Exception:
-            end_date = today
-
-    if not start:
-        start_date = end_date - timedelta(days=29)
-    else:
-        try:
-            start_date = datetime.strptime(start, '%Y-%m-%d').date()
-        except Exception:
-            start_date = end_date - timedelta(days=29)
-
-    # Query grouped by date
-    q = db.session.query(func.date(DepartmentTracking.date_logged), func.count(DepartmentTracking.id))
-    q = q.filter(DepartmentTracking.date_logged >= datetime.combine(start_date, datetime.min.time()))
-    q = q.filter(DepartmentTracking.date_logged < datetime.combine(end_date + timedelta(days=1), datetime.min.time()))
-    if dept_id:
-        try:
-            did = int(dept_id)
-            q = q.filter(DepartmentTracking.department_id == did)
-        except Exception:
-            pass
-
-    q = q.group_by(func.date(DepartmentTracking.date_logged)).order_by(func.date(DepartmentTracking.date_logged))
-    rows = q.all()
-
-    # rows may return string dates depending on DB driver; normalize
-    counts_by_date = {}
-    for r in rows:
-        d = r[0]
-        if not hasattr(d, 'strftime'):
-            # assume string 'YYYY-MM-DD'
-            key = str(d)
-        else:
-            key = d.strftime('%Y-%m-%d')
-        counts_by_date[key] = r[1]
-
-    # Build full date range
-    labels = []
-    counts = []
-    cur = start_date
-    while cur <= end_date:
-        key = cur.strftime('%Y-%m-%d')
-        labels.append(key)
-        counts.append(counts_by_date.get(key, 0))
-        cur = cur + timedelta(days=1)
-
-    return jsonify({'labels': labels, 'counts': counts})
+    return jsonify(_chart_series(['activities_over_time'])['activities_over_time'])
 
 
 @main.route('/api/management/top-users')
 @login_required
+@conditional_get(_activity_watermark)
 def api_top_users():
     """Return top users by activity count.
     Optional query params: start, end (YYYY-MM-DD), dept (department id), limit (int)
     """
     if not current_user.is_admin:
         return jsonify({'error': 'forbidden'}), 403
-
-    start = request.args.get('start')
-    end = request.args.get('end')
-    dept_id = request.args.get('dept')
-    limit = request.args.get('limit', 10)
-    try:
-        limit = int(limit)
-    except Exception:
-        limit = 10
-
-    q = db.session.query(DepartmentTracking.user_id, func.count(DepartmentTracking.id).label('cnt'))
-    if start:
-        try:
-            start_dt = datetime.strptime(start, '%Y-%m-%d')
-            q = q.filter(DepartmentTracking.date_logged >= start_dt)
-        except Exception:
-            pass
-    if end:
-        try:
-            end_dt = datetime.strptime(end, '%Y-%m-%d') + timedelta(days=1)
-            q = q.filter(DepartmentTracking.date_logged < end_dt)
-        except Exception:
-            pass
-    if dept_id:
-        try:
-            did = int(dept_id)
-            q = q.filter(DepartmentTracking.department_id == did)
-        except Exception:
-            pass
-
-    q = q.group_by(DepartmentTracking.user_id).order_by(func.count(DepartmentTracking.id).desc()).limit(limit)
-    rows = q.all()
-
-    user_ids = [r[0] for r in rows]
-    counts = [r[1] for r in rows]
-    users = []
-    if user_ids:
-        user_objs = User.query.filter(User.id.in_(user_ids)).all()
-        user_map = {u.id: u.name for u in user_objs}
-        for uid in user_ids:
-            users.append(user_map.get(uid, f'User {uid}'))
-
-    return jsonify({'users': users, 'counts': counts})
+    return jsonify(_chart_series(['top_users'])['top_users'])
 
 
 @main.route('/api/management/users-by-dept')
 @login_required
+@conditional_get(_activity_watermark)
 def api_users_by_dept():
     """Return user counts per department.
     Optional query params: start, end (YYYY-MM-DD), mode=(all|active). If mode=active, counts unique users with entries in date range.
     """
     if not current_user.is_admin:
         return jsonify({'error': 'forbidden'}), 403
-
-    mode = request.args.get('mode', 'all')
-    start = request.args.get('start')
-    end = request.args.get('end')
-
-    departments = Department.query.filter(Department.name != 'Management').order_by(Department.id).all()
-    labels = [d.name for d in departments]
-    counts = []
-
-    if mode == 'active':
-        # count distinct users who logged activities in the date range per department
-        q = db.session.query(DepartmentTracking.department_id, func.count(func.distinct(DepartmentTracking.user_id))).group_by(DepartmentTracking.department_id)
-        if start:
-            try:
-                start_dt = datetime.strptime(start, '%Y-%m-%d')
-                q = q.filter(DepartmentTracking.date_logged >= start_dt)
-            except Exception:
-                pass
-        if end:
-            try:
-                end_dt = datetime.strptime(end, '%Y-%m-%d') + timedelta(days=1)
-                q = q.filter(DepartmentTracking.date_logged < end_dt)
-            except Exception:
-                pass
-        rows = q.all()
-        map_counts = {r[0]: r[1] for r in rows}
-        for d in departments:
-            counts.append(map_counts.get(d.id, 0))
-    else:
-        # default: total users per department from User.department field
-        for d in departments:
-            c = db.session.query(func.count(User.id)).filter(User.department == d.name).scalar()
-            counts.append(c)
-
-    return jsonify({'labels': labels, 'counts': counts, 'mode': mode})
+    return jsonify(_chart_series(['users_by_dept'])['users_by_dept'])
 
 
 @main.route('/api/management/ticket-types')
 @login_required
+@conditional_get(_activity_watermark)
 def api_ticket_types():
     """Return counts of ticket_request_type values. Optional start/end (YYYY-MM-DD), dept, priority."""
     if not current_user.is_admin:
         return jsonify({'error': 'forbidden'}), 403
-
-    start = request.args.get('start')
-    end = request.args.get('end')
-    dept_filter = request.args.get('dept')
-    priority_filter = request.args.get('priority')
-
-    q = db.session.query(DepartmentTracking.ticket_request_type, func.count(DepartmentTracking.id))
-    if start:
-        try:
-            start_dt = datetime.strptime(start, '%Y-%m-%d')
-            q = q.filter(DepartmentTracking.date_logged >= start_dt)
-        except Exception:
-            pass
-    if end:
-        try:
-            end_dt = datetime.strptime(end, '%Y-%m-%d') + timedelta(days=1)
-            q = q.filter(DepartmentTracking.date_logged < end_dt)
-        except Exception:
-            pass
-    if dept_filter:
-        try:
-            dept_id = int(dept_filter)
-            q = q.filter(DepartmentTracking.department_id == dept_id)
-        except Exception:
-            pass
-    if priority_filter:
-        q = q.filter(DepartmentTracking.priority == priority_filter)
-
-    q = q.group_by(DepartmentTracking.ticket_request_type).order_by(func.count(DepartmentTracking.id).desc())
-    rows = q.all()
-
-    labels = []
-    counts = []
-    for r in rows:
-        typ = r[0] or 'Unknown'
-        labels.append(typ)
-        counts.append(r[1])
-
-    return jsonify({'labels': labels, 'counts': counts})
+    return jsonify(_chart_series(['ticket_types'])['ticket_types'])
 
 
 @main.route('/api/management/day-hour-heatmap')
 @login_required
+@conditional_get(_activity_watermark)
 def api_day_hour_heatmap():
     """Return counts by weekday and hour. Optional start/end (YYYY-MM-DD), dept, priority.
     Returns: {'weekdays': [...Sunday..Saturday...], 'hours': [0..23], 'matrix': [[counts]]}
     """
     if not current_user.is_admin:
         return jsonify({'error': 'forbidden'}), 403
+    return jsonify(_chart_series(['day_hour_heatmap'])['day_hour_heatmap'])
 
-    start = request.args.get('start')
-    end = request.args.get('end')
-    dept_filter = request.args.get('dept')
-    priority_filter = request.args.get('priority')
-
-    q = db.session.query(func.strftime('%w', DepartmentTracking.date_logged), func.strftime('%H', DepartmentTracking.date_logged), func.count(DepartmentTracking.id))
-    if start:
-        try:
-            start_dt = datetime.strptime(start, '%Y-%m-%d')
-            q = q.filter(DepartmentTracking.date_logged >= start_dt)
-        except Exception:
-            pass
-    if end:
-        try:
-            end_dt = datetime.strptime(end, '%Y-%m-%d') + timedelta(days=1)
-            q = q.filter(DepartmentTracking.date_logged < end_dt)
-        except Exception:
-            pass
-    if dept_filter:
-        try:
-            dept_id = int(dept_filter)
-            q = q.filter(DepartmentTracking.department_id == dept_id)
-        except Exception:
-            pass
-    if priority_filter:
-        q = q.filter(DepartmentTracking.priority == priority_filter)
-
-    q = q.group_by(func.strftime('%w', DepartmentTracking.date_logged), func.strftime('%H', DepartmentTracking.date_logged))
-    rows = q.all()
-
-    # Weekdays: SQLite '%w' => '0' = Sunday ... '6' = Saturday
-    weekdays = ['Sunday','Monday','Tuesday','Wednesday','Thursday','Friday','Saturday']
-    hours = [h for h in range(24)]
-
-    # initialize matrix [7][24]
-    matrix = [[0 for _ in hours] for _ in weekdays]
-
-    for r in rows:
-        try:
-            day_idx = int(r[0])
-            hour_idx = int(r[1])
-            cnt = int(r[2])
-            if 0 <= day_idx <= 6 and 0 <= hour_idx <= 23:
-                matrix[day_idx][hour_idx] = cnt
-        except Exception:
-            continue
 
-    return jsonify({'weekdays': weekdays, 'hours': hours, 'matrix': matrix})
+@main.route('/api/management/bundle')
+@login_required
+@conditional_get(_activity_watermark)
+def api_dashboard_bundle():
+    """Return several management chart payloads computed in one pass.
+    Query params: series (comma-separated, default all of activities_by_dept, duration_by_dept,
+    avg_duration_by_dept, activities_over_time, top_users, users_by_dept, ticket_types, day_hour_heatmap),
+    plus the chart filters start, end (YYYY-MM-DD), dept, priority, limit, mode.
+    Each payload matches the corresponding /api/management/<chart> endpoint.
+    """
+    if not current_user.is_admin:
+        return jsonify({'error': 'forbidden'}), 403
+
+    requested = request.args.get('series')
+    if requested:
+        names = [n.strip() for n in requested.split(',') if n.strip()]
+        unknown = [n for n in names if n not in DASHBOARD_SERIES]
+        if unknown:
+            return jsonify({'error': f'unknown series: {", ".join(unknown)}'}), 400
+    else:
+        names = list(DASHBOARD_SERIES)
+
+    return jsonify({'series': _chart_series(names)})
+
+
+def _department_field(dept_id, name):
+    """A department's CachedField by field_name, or by id when name is numeric."""
+    department = get_department(dept_id)
+    for field in department.tracking_fields if department else ():
+        if (name.isdigit() and field.id == int(name)) or field.field_name == name:
+            return field
+    return None
+
+
+@main.route('/api/management/custom-field-breakdown')
+@login_required
+@conditional_get(_activity_schema_watermark)
+def api_custom_field_breakdown():
+    """Return entry counts and sums grouped by the values of one department custom field.
+    Query params: dept (department id, required), field (TrackingField name or id, required),
+    metric (count (default), duration = sum of duration_mins, or the name of a number field to sum),
+    limit (groups returned, default 50, max 500), plus the filters start, end (YYYY-MM-DD), priority,
+    status, ticket_type.
+    """
+    if not current_user.is_admin:
+        return jsonify({'error': 'forbidden'}), 403
+
+    flt = ActivityFilter.from_args(request.args)
+    if flt.errors:
+        return _invalid_filters(flt)
+    if flt.department_id is None or not request.args.get('field'):
+        return jsonify({'error': 'dept and field are required'}), 400
+
+    group_field = _department_field(flt.department_id, request.args['field'].strip())
+    if group_field is None:
+        return jsonify({'error': 'unknown field for this department'}), 404
+
+    metric = request.args.get('metric', 'count').strip() or 'count'
+    metric_field = None
+    if metric not in BREAKDOWN_METRICS:
+        metric_field = _department_field(flt.department_id, metric)
+        if metric_field is None or metric_field.field_type != 'number':
+            return jsonify({'error': 'metric must be count, duration or a number field of this department'}), 400
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+
+    breakdown = cached_custom_field_breakdown(
+        group_field, flt, 'field' if metric_field else metric, metric_field, limit
+    )
+    return jsonify({
+        'department_id': flt.department_id,
+        'field': {'name': group_field.field_name, 'label': group_field.field_label, 'type': group_field.field_type},
+        'metric': metric_field.field_name if metric_field else metric,
+        **breakdown
+    })
 
 
 @main.route('/api/management/export')
 @login_required
 def api_export_activities():
-    """Export activities as CSV. Optional filters: start, end (YYYY-MM-DD), dept (id), priority, ticket_type."""
+    """Export activities. Optional filters: start, end (YYYY-MM-DD), dept (id), priority, ticket_type.
+    format=csv (default, streamed in chunks) | parquet | feather (typed columns, custom fields expanded)
+    | xlsx (one sheet per department with its own tracking-field columns).
+    """
     if not current_user.is_admin:
         return jsonify({'error': 'forbidden'}), 403
 
-    start = request.args.get('start')
-    end = request.args.get('end')
-    dept_id = request.args.get('dept')
-    priority = request.args.get('priority')
-    ticket = request.args.get('ticket_type')
-
-    q = DepartmentTracking.query
-    if start:
-        try:
-            start_dt = datetime.strptime(start, '%Y-%m-%d')
-            q = q.filter(DepartmentTracking.date_logged >= start_dt)
-        except Exception:
-            pass
-    if end:
-        try:
-            end_dt = datetime.strptime(end, '%Y-%m-%d') + timedelta(days=1)
-            q = q.filter(DepartmentTracking.date_logged < end_dt)
-        except Exception:
-            pass
-    if dept_id:
-        try:
-            did = int(dept_id)
-            q = q.filter(DepartmentTracking.department_id == did)
-        except Exception:
-            pass
-    if priority:
-        q = q.filter(DepartmentTracking.priority == priority)
-    if ticket:
-        q = q.filter(DepartmentTracking.ticket_request_type == ticket)
-
-    rows = q.order_by(DepartmentTracking.date_logged.desc()).all()
-
-    # Build CSV
-    from io import StringIO
-    import csv
-    si = StringIO()
-    writer = csv.writer(si)
-    writer.writerow(['id','date_logged','department_id','user_id','ticket_request_type','priority','duration_mins','frequency_per_day','activity_description'])
-    for r in rows:
-        writer.writerow([
-            r.id,
-            (r.date_logged.isoformat() if hasattr(r.date_logged, 'isoformat') else str(r.date_logged)),
-            r.department_id,
-            r.user_id,
-            r.ticket_request_type or '',
-            r.priority or '',
-            r.duration_mins or '',
-            r.frequency_per_day or '',
-            (r.activity_description or '').replace('\n',' ')
-        ])
-
-    output = si.getvalue()
-    from flask import Response
-    resp = Response(output, mimetype='text/csv')
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f'unsupported format: {export_format}'}), 400
+
+    flt = ActivityFilter.from_args(request.args)
+    if flt.errors:
+        return _invalid_filters(flt)
+
+    if export_format != 'csv':
+        fileobj = export_to_tempfile(write_activity_export, export_format, flt,
+                                     workers=current_app.config['EXPORT_WORKERS'])
+        return send_file(fileobj, mimetype=EXPORT_FORMATS[export_format]['mimetype'], as_attachment=True,
+                         download_name=export_download_name('activities', export_format))
+
+    records = (activity_csv_record(r) for r in activity_export_rows(flt))
+
+    resp = Response(stream_with_context(csv_chunks(ACTIVITY_EXPORT_HEADER, records)), mimetype='text/csv')
     resp.headers['Content-Disposition'] = 'attachment; filename=activities_export.csv'
     return resp
 
 
+@main.route('/api/management/export/jobs', methods=['POST'])
+@login_required
+def submit_activity_export_job():
+    """Start a background management export (same args as api_export_activities, as query or form values)."""
+    if not current_user.is_admin:
+        return jsonify({'error': 'forbidden'}), 403
+
+    export_format = request.values.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f'unsupported format: {export_format}'}), 400
+
+    flt = ActivityFilter.from_args(request.values)
+    if flt.errors:
+        return _invalid_filters(flt)
+
+    job, reused = submit_export_job(
+        current_app._get_current_object(), 'activities', export_format, flt, user_id=current_user.id
+    )
+    return _export_job_response(job, reused)
+
+
 @main.route('/debug/department-stats')
 @login_required
+@conditional_get(_activity_watermark)
 def debug_department_stats():
     """Return department stats JSON for debugging (admin only)."""
     if not current_user.is_admin:
         return jsonify({'error': 'forbidden'}), 403
 
     departments = Department.query.all()
-    department_stats = []
-    total_all_entries = 0
-    total_all_duration = 0
-
-    for dept in departments:
-        entries = DepartmentTracking.query.filter_by(department_id=dept.id).all()
-        total_entries = len(entries)
-        total_duration = sum(entry.duration_mins or 0 for entry in entries)
-        avg_duration = total_duration / total_entries if total_entries > 0 else 0
-        users_count = db.session.query(func.count(User.id)).filter(User.department == dept.name).scalar()
-
-        department_stats.append({
-            'id': dept.id,
-            'name': dept.name,
-            'total_entries': total_entries,
-            'total_duration': total_duration,
-            'avg_duration': round(avg_duration, 2),
-            'users_count': users_count
-        })
-
-        total_all_entries += total_entries
-        total_all_duration += total_duration
+    stats = department_stats(departments)
+    total_all_entries = stats['total_entries']
+    total_all_duration = stats['total_duration']
 
     return jsonify({
-        'department_stats': department_stats,
+        'department_stats': stats['department_stats'],
         'total_entries': total_all_entries,
         'total_duration': total_all_duration,
         'overall_avg_duration': round((total_all_duration / total_all_entries) if total_all_entries > 0 else 0, 2),
@@ -1010,31 +763,101 @@ def debug_department_stats():
     })
 
 
+@main.route('/debug/analytics-cache')
+@login_required
+def debug_analytics_cache():
+    """Return analytics cache size and hit/miss counters for this worker (admin only)."""
+    if not current_user.is_admin:
+        return jsonify({'error': 'forbidden'}), 403
+    return jsonify(analytics_cache.stats())
+
+
+@main.route('/debug/user-cache')
+@login_required
+def debug_user_cache():
+    """Return login identity cache size and hit rate for this worker (admin only)."""
+    if not current_user.is_admin:
+        return jsonify({'error': 'forbidden'}), 403
+    return jsonify(user_identity_cache.stats())
+
+
+@main.route('/debug/index-advisor')
+@login_required
+def debug_index_advisor():
+    """EXPLAIN the hot activity queries and list any full-table scans (admin only)."""
+    if not current_user.is_admin:
+        return jsonify({'error': 'forbidden'}), 403
+
+    checks = run_index_advisor()
+    return jsonify({
+        'dialect': db.engine.dialect.name,
+        'checks': checks,
+        'full_scan_count': sum(1 for check in checks if check['full_scans'])
+    })
+
+
 # --------------------------
 # View Department Details
 # --------------------------
 @main.route('/department/<int:dept_id>')
 @login_required
 def view_department(dept_id):
-    department = Department.query.get_or_404(dept_id)
-    entries = DepartmentTracking.query.filter_by(
-        department_id=dept_id,
-        user_id=current_user.id
-    ).order_by(DepartmentTracking.date_logged.desc()).all()
-    
-    # Get stats for this department
-    total_entries = len(entries)
-    total_duration = sum(entry.duration_mins or 0 for entry in entries)
+    department = get_department(dept_id)
+    if department is None:
+        abort(404)
+
+    # Get stats for this department; the entries themselves are paged in from department_history
+    total_entries, total_duration = user_activity_totals(current_user.id, dept_id)
     avg_duration = total_duration / total_entries if total_entries > 0 else 0
     
     return render_template('department_details.html',
                          department=department,
-                         entries=entries,
                          total_entries=total_entries,
                          total_duration=total_duration,
                          avg_duration=avg_duration)
 
 
+@main.route('/api/department/<int:dept_id>/history')
+@login_required
+def department_history(dept_id):
+    """
+    The current user's entries in a department, newest first.
+    Query parameters: cursor (next_cursor from the previous page), per_page (default 20, max 100),
+    and the ActivityFilter filters (date_from, date_to, status, priority, ticket_type).
+    """
+    department = get_department(dept_id)
+    if department is None:
+        abort(404)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+
+    flt = ActivityFilter.from_args(request.args, department_id=department.id, user_id=current_user.id)
+    if flt.errors:
+        return _invalid_filters(flt)
+    query = flt.apply(DepartmentTracking.query)
+    try:
+        entries, next_cursor, _ = keyset_page(
+            query, DepartmentTracking.date_logged, DepartmentTracking.id, per_page, request.args.get('cursor')
+        )
+    except ValueError:
+        return jsonify({'error': 'invalid cursor'}), 400
+
+    return jsonify({
+        'entries': [{
+            'id': e.id,
+            'activity_description': e.activity_description,
+            'date_logged': e.date_logged.strftime('%Y-%m-%d %H:%M'),
+            'ticket_request_type': e.ticket_request_type,
+            'priority': e.priority,
+            'system_application': e.system_application,
+            'tool_platform_used': e.tool_platform_used,
+            'duration_mins': e.duration_mins,
+            'frequency_per_day': e.frequency_per_day,
+            'sla_tat': e.sla_tat
+        } for e in entries],
+        'next_cursor': next_cursor
+    })
+
+
 # --------------------------
 # Admin - User Management
 # --------------------------
@@ -1086,12 +909,14 @@ def admin_add_user():
             name=form.name.data,
             employee_id=form.employee_id.data,
             department=dept.name,
+            department_id=dept.id,
             login_id=form.login_id.data,
             password=hashed_pw,
             is_admin=form.is_admin.data
         )
         
         db.session.add(new_user)
+        bump_data_version(ACTIVITY_DATA)
         db.session.commit()
         
         flash(f'User "{form.name.data}" added successfully!', 'success')
@@ -1129,12 +954,17 @@ def admin_edit_user(user_id):
         # Update department
         dept = Department.query.get(form.department.data)
         user.department = dept.name
+        user.department_id = dept.id
         
         # Update password if provided
         if form.password.data:
             user.password = bcrypt.generate_password_hash(form.password.data).decode('utf-8')
         
+        bump_data_version(ACTIVITY_DATA)
+        # Every worker reloads cached login identities, so the new name/department/admin flag apply at once
+        bump_data_version(USER_DATA)
         db.session.commit()
+        user_identity_cache.invalidate(user_id)
         
         flash(f'User "{user.name}" updated successfully!', 'success')
         return redirect(url_for('main.admin_users'))
@@ -1146,9 +976,7 @@ def admin_edit_user(user_id):
         form.login_id.data = user.login_id
         form.is_admin.data = user.is_admin
         # Set department
-        dept = Department.query.filter_by(name=user.department).first()
-        if dept:
-            form.department.data = dept.id
+        form.department.data = user.department_id
     
     return render_template('admin_edit_user.html', form=form, user=user)
 
@@ -1172,12 +1000,17 @@ def admin_delete_user(user_id):
     
     user_name = user.name
     
-    # Delete user's activity logs
+    # Delete user's activity logs, their custom field values and analytics rollup rows
+    remove_user_field_values(user_id)
     DepartmentTracking.query.filter_by(user_id=user_id).delete()
+    remove_user_from_rollup(user_id)
+    bump_data_version(ACTIVITY_DATA)
     
-    # Delete user
+    # Delete user; the USER_DATA bump logs them out on every worker
     db.session.delete(user)
+    bump_data_version(USER_DATA)
     db.session.commit()
+    user_identity_cache.invalidate(user_id)
     
     flash(f'User "{user_name}" deleted successfully!', 'success')
     return redirect(url_for('main.admin_users'))
@@ -1236,6 +1069,7 @@ def admin_add_field(dept_id):
         )
         
         db.session.add(field)
+        bump_data_version(SCHEMA_DATA)
         db.session.commit()
         
         flash(f'Field "{form.field_label.data}" added successfully!', 'success')
@@ -1268,12 +1102,16 @@ def admin_edit_field(field_id):
             flash(f'A field with name "{form.field_name.data}" already exists for this department.', 'danger')
             return redirect(url_for('main.admin_edit_field', field_id=field_id))
         
+        type_changed = field.field_type != form.field_type.data
         field.field_name = form.field_name.data
         field.field_type = form.field_type.data
         field.field_label = form.field_label.data
         field.is_required = form.is_required.data
         if form.order.data:
             field.order = form.order.data
+        if type_changed:
+            retype_field_values(field)
+        bump_data_version(SCHEMA_DATA)
         
         db.session.commit()
         
@@ -1302,7 +1140,9 @@ def admin_delete_field(field_id):
     dept_id = field.department_id
     field_label = field.field_label
     
+    remove_field_values(field.id)
     db.session.delete(field)
+    bump_data_version(SCHEMA_DATA)
     db.session.commit()
     
     flash(f'Field "{field_label}" deleted successfully!', 'success')
@@ -1500,11 +1340,16 @@ def analyze_grievance_with_ai(grievance_text):
         }), 500
 
 
+# Exact grievance counts per filter set, valid until the grievance watermark moves
+grievance_count_cache = VersionedLRUCache(max_size=256)
+
+
 @main.route('/api/grievances', methods=['GET'])
 @login_required
+@conditional_get(_grievance_watermark)
 def list_grievances():
     """
-    Retrieve grievances (HR Admin only).
+    Retrieve grievances (HR Admin only), newest first.
     
     Query parameters:
     - date_from: YYYY-MM-DD
@@ -1513,8 +1358,10 @@ def list_grievances():
     - status: str (Open, Under Review, etc.)
     - priority: str (High, Medium, Low)
     - search: employee_id or case_id
-    - page: int (default 1)
-    - per_page: int (default 20)
+    - cursor: next_cursor / prev_cursor from a previous response (omit for the first page)
+    - per_page: int (default 20, max 100)
+    - total: 0 to skip the total count (otherwise cached per filter set)
+    - page: legacy OFFSET pagination, used only when no cursor is given
     """
     if not current_user.is_admin:
         return jsonify({'success': False, 'message': 'Access denied. HR Admin privilege required.'}), 403
@@ -1548,14 +1395,38 @@ def list_grievances():
             )
         
         # Pagination
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 20))
-        
-        paginated = query.order_by(Grievance.submitted_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
-        
-        grievances_data = [{
+        per_page = min(max(int(request.args.get('per_page', 20)), 1), 100)
+        cursor = request.args.get('cursor')
+        page = request.args.get('page', type=int)
+
+        response = {'success': True, 'per_page': per_page}
+        if page and not cursor:
+            grievances = query.order_by(Grievance.submitted_at.desc(), Grievance.id.desc()).offset(
+                (max(page, 1) - 1) * per_page
+            ).limit(per_page).all()
+            response['page'] = page
+        else:
+            try:
+                grievances, next_cursor, prev_cursor = keyset_page(
+                    query, Grievance.submitted_at, Grievance.id, per_page, cursor
+                )
+            except ValueError:
+                return jsonify({'success': False, 'message': 'Invalid cursor.'}), 400
+            response['next_cursor'] = next_cursor
+            response['prev_cursor'] = prev_cursor
+
+        if request.args.get('total') != '0':
+            filter_key = tuple(sorted((k, v) for k, v in request.args.items()
+                                      if k not in ('cursor', 'page', 'per_page', 'total')))
+            watermark = _grievance_watermark()
+            total = grievance_count_cache.get(filter_key, watermark)
+            if total is None:
+                total = query.order_by(None).count()
+                grievance_count_cache.set(filter_key, watermark, total)
+            response['total'] = total
+            response['pages'] = (total + per_page - 1) // per_page
+
+        response['grievances'] = [{
             'id': g.id,
             'case_id': g.case_id,
             'employee_name': g.employee_name,
@@ -1566,16 +1437,9 @@ def list_grievances():
             'status': g.status,
             'submitted_at': g.submitted_at.isoformat() if g.submitted_at else None,
             'is_escalated': g.escalated_to_senior_hr
-        } for g in paginated.items]
-        
-        return jsonify({
-            'success': True,
-            'grievances': grievances_data,
-            'total': paginated.total,
-            'page': page,
-            'per_page': per_page,
-            'pages': paginated.pages
-        }), 200
+        } for g in grievances]
+
+        return jsonify(response), 200
     
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
@@ -1583,6 +1447,7 @@ def list_grievances():
 
 @main.route('/api/grievances/<case_id>', methods=['GET'])
 @login_required
+@conditional_get(_grievance_watermark)
 def view_grievance(case_id):
     """View grievance details (HR Admin only)"""
     if not current_user.is_admin:
@@ -1652,6 +1517,7 @@ def update_grievance_status(case_id):
     )
     
     db.session.add(audit_entry)
+    bump_data_version(GRIEVANCE_DATA)
     db.session.commit()
     
     return jsonify({
@@ -1661,71 +1527,101 @@ def update_grievance_status(case_id):
     }), 200
 
 
+# Per-dimension counts on the grievance dashboard: (breakdown name, column)
+GRIEVANCE_BREAKDOWNS = (
+    ('status', Grievance.status),
+    ('priority', Grievance.ai_priority),
+    ('category', Grievance.ai_category),
+    ('campaign', Grievance.campaign),
+)
+
+
+# Headline counts on the grievance dashboard: (metric name, condition), each a SUM(CASE ...)
+GRIEVANCE_HEADLINES = (
+    ('open_cases', Grievance.status == 'Open'),
+    ('resolved_cases', Grievance.status == 'Resolved'),
+    ('high_priority_cases', Grievance.ai_priority == 'High'),
+    ('escalated_cases', Grievance.escalated_to_senior_hr.is_(True)),
+)
+
+
+def _grievance_metrics(since):
+    """
+    Headline counts, GRIEVANCE_BREAKDOWNS and monthly totals of grievances submitted since
+    `since`, from one statement and so one table scan. On PostgreSQL GROUPING SETS give one row
+    per distinct value of each breakdown column and of submitted_month, plus the () grand total
+    row that carries the total and the SUM(CASE) headline counts. Elsewhere a single GROUP BY over
+    all of those columns is summed per column here. NULL values are counted under 'Unknown'
+    (JSON object keys must be strings).
+    """
+    names = [name for name, _ in GRIEVANCE_BREAKDOWNS]
+    columns = [column for _, column in GRIEVANCE_BREAKDOWNS] + [Grievance.submitted_month]
+    aggregates = [
+        func.count(Grievance.id),
+        *[func.sum(case((condition, 1), else_=0)) for _, condition in GRIEVANCE_HEADLINES],
+        func.sum(case((Grievance.submitted_at >= since, 1), else_=0)),
+    ]
+    totals = dict.fromkeys(['total_grievances', *[name for name, _ in GRIEVANCE_HEADLINES]], 0)
+    breakdowns = {name: {} for name in names}
+    monthly = {}
+
+    if db.engine.dialect.name == 'postgresql':
+        # GROUPING(column) is 0 for the rows grouped by that column, 1 for every column in the () row
+        rows = db.session.query(
+            *columns, *[func.grouping(column) for column in columns], *aggregates
+        ).group_by(func.grouping_sets(*columns, tuple_())).all()
+        for row in rows:
+            values, grouped = row[:len(columns)], list(row[len(columns):2 * len(columns)])
+            counts = [int(count or 0) for count in row[2 * len(columns):]]
+            if 0 not in grouped:
+                totals = dict(zip(totals, counts[:-1]))
+                continue
+            index = grouped.index(0)
+            if index < len(names):
+                breakdowns[names[index]][values[index] or 'Unknown'] = counts[0]
+            elif counts[-1]:
+                monthly[values[index]] = counts[-1]
+    else:
+        rows = db.session.query(*columns, *aggregates).group_by(*columns).all()
+        for row in rows:
+            values, counts = row[:len(columns)], [int(count or 0) for count in row[len(columns):]]
+            for name, count in zip(totals, counts):
+                totals[name] += count
+            for name, value in zip(names, values):
+                key = value or 'Unknown'
+                breakdowns[name][key] = breakdowns[name].get(key, 0) + counts[0]
+            if counts[-1]:
+                monthly[values[-1]] = monthly.get(values[-1], 0) + counts[-1]
+
+    monthly_data = [{
+        'month': str(month) if month else 'Unknown',
+        'count': monthly[month]
+    } for month in sorted(monthly, key=lambda month: (month is None, month))]
+    return totals, breakdowns, monthly_data
+
+
 @main.route('/api/grievances/dashboard/metrics', methods=['GET'])
 @login_required
+@conditional_get(_grievance_watermark)
 def grievance_dashboard_metrics():
     """Get dashboard metrics (HR Admin only)"""
     if not current_user.is_admin:
         return jsonify({'success': False, 'message': 'Access denied.'}), 403
     
     try:
-        # Total grievances by month (last 12 months)
+        # Everything below comes from a single pass over the table
         twelve_months_ago = datetime.utcnow() - timedelta(days=365)
-        monthly_totals = db.session.query(
-            func.date_trunc('month', Grievance.submitted_at).label('month'),
-            func.count(Grievance.id).label('count')
-        ).filter(Grievance.submitted_at >= twelve_months_ago).group_by('month').all()
-        
-        monthly_data = [{
-            'month': str(m[0]) if m[0] else 'Unknown',
-            'count': m[1] or 0
-        } for m in monthly_totals]
-        
-        # Status breakdown
-        status_counts = db.session.query(
-            Grievance.status,
-            func.count(Grievance.id).label('count')
-        ).group_by(Grievance.status).all()
-        
-        status_data = {s[0]: s[1] for s in status_counts}
-        
-        # Priority breakdown
-        priority_counts = db.session.query(
-            Grievance.ai_priority,
-            func.count(Grievance.id).label('count')
-        ).group_by(Grievance.ai_priority).all()
-        
-        priority_data = {p[0]: p[1] for p in priority_counts}
-        
-        # Category breakdown
-        category_counts = db.session.query(
-            Grievance.ai_category,
-            func.count(Grievance.id).label('count')
-        ).group_by(Grievance.ai_category).all()
-        
-        category_data = {c[0]: c[1] for c in category_counts}
-        
-        # Campaign breakdown
-        campaign_counts = db.session.query(
-            Grievance.campaign,
-            func.count(Grievance.id).label('count')
-        ).group_by(Grievance.campaign).all()
-        
-        campaign_data = {c[0]: c[1] for c in campaign_counts}
+        totals, breakdowns, monthly_data = _grievance_metrics(twelve_months_ago)
         
         return jsonify({
             'success': True,
             'metrics': {
-                'total_grievances': Grievance.query.count(),
-                'open_cases': Grievance.query.filter_by(status='Open').count(),
-                'resolved_cases': Grievance.query.filter_by(status='Resolved').count(),
-                'high_priority_cases': Grievance.query.filter_by(ai_priority='High').count(),
-                'escalated_cases': Grievance.query.filter_by(escalated_to_senior_hr=True).count(),
+                **totals,
                 'monthly_totals': monthly_data,
-                'status_breakdown': status_data,
-                'priority_breakdown': priority_data,
-                'category_breakdown': category_data,
-                'campaign_breakdown': campaign_data
+                'status_breakdown': breakdowns['status'],
+                'priority_breakdown': breakdowns['priority'],
+                'category_breakdown': breakdowns['category'],
+                'campaign_breakdown': breakdowns['campaign']
             }
         }), 200
     
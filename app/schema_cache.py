@@ -0,0 +1,78 @@
+"""
+Process-local cache of departments and their tracking field definitions.
+
+Departments and TrackingFields change a few times a month but are read on almost every
+request. Each worker keeps an immutable snapshot of both tables (departments by id and by
+name, each with its fields in display order) tagged with the SCHEMA_DATA version. The
+version is read at most once per request; when an admin change has bumped it, the next
+lookup reloads the snapshot with two queries.
+
+Snapshots are plain read-only objects, not ORM instances: use them for ids, names and field
+definitions, and query the models for anything that changes often (Department.last_entry_no).
+"""
+
+from app import db
+from app.cache import SCHEMA_DATA, request_data_version
+from app.jsoncodec import loads
+from app.models import Department, TrackingField
+from collections import namedtuple
+import threading
+
+
+class CachedField(namedtuple('CachedField', 'id department_id field_name field_type field_label is_required order choices')):
+    """Read-only copy of a TrackingField; choices is a tuple."""
+    __slots__ = ()
+
+    def get_choices(self):
+        return list(self.choices)
+
+
+class CachedDepartment(namedtuple('CachedDepartment', 'id name description tracking_fields')):
+    """Read-only copy of a Department; tracking_fields is a tuple of CachedField in display order."""
+    __slots__ = ()
+
+
+_lock = threading.Lock()
+_snapshot = {'version': None, 'by_id': {}, 'by_name': {}}
+
+
+def _load():
+    fields = {}
+    for f in TrackingField.query.order_by(TrackingField.order, TrackingField.id).all():
+        choices = tuple(loads(f.choices)) if f.choices else ()
+        fields.setdefault(f.department_id, []).append(CachedField(
+            f.id, f.department_id, f.field_name, f.field_type, f.field_label, f.is_required, f.order, choices
+        ))
+
+    by_id = {}
+    for d in Department.query.order_by(Department.id).all():
+        by_id[d.id] = CachedDepartment(d.id, d.name, d.description, tuple(fields.get(d.id, ())))
+    return by_id
+
+
+def _current():
+    version = request_data_version(SCHEMA_DATA)
+    snapshot = _snapshot
+    if snapshot['version'] != version:
+        with _lock:
+            if _snapshot['version'] != version:
+                by_id = _load()
+                _snapshot.update(by_id=by_id, by_name={d.name: d for d in by_id.values()}, version=version)
+            snapshot = _snapshot
+    return snapshot
+
+
+def get_department(department_id):
+    """CachedDepartment for an id, or None."""
+    return _current()['by_id'].get(department_id)
+
+
+def get_department_by_name(name):
+    """CachedDepartment for a name (User.department stores the name), or None."""
+    return _current()['by_name'].get(name)
+
+
+def all_departments():
+    """Every CachedDepartment, by id."""
+    return list(_current()['by_id'].values())
+
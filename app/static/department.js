@@ -42,3 +42,26 @@ function saveData() {
     .then(data => alert(data.message))
     .catch(err => console.error(err));
 }
+
+// Background exports: start the job, show progress on the button, then download the file
+async function runExportJob(submitUrl, button) {
+    const label = button.textContent;
+    button.disabled = true;
+    try {
+        const res = await fetch(submitUrl, {method: 'POST'});
+        if (!res.ok) { alert('Export failed'); return; }
+        let job = await res.json();
+        while (job.status === 'queued' || job.status === 'running') {
+            button.textContent = `Exporting… ${job.progress || 0}%`;
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            const poll = await fetch(`/api/export-jobs/${job.job_id}`);
+            if (!poll.ok) { alert('Export failed'); return; }
+            job = await poll.json();
+        }
+        if (job.status !== 'done') { alert('Export failed: ' + (job.error || job.status)); return; }
+        window.location = job.download_url;
+    } finally {
+        button.textContent = label;
+        button.disabled = false;
+    }
+}
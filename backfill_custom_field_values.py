@@ -0,0 +1,27 @@
+#!/usr/bin/env python
+"""
+Fill tracking_field_value from the custom_fields_data JSON of existing entries.
+Resumable: by default only entries without values are processed. Pass --rebuild to
+recompute every value (after bulk imports or manual edits of custom_fields_data).
+"""
+
+from app import create_app, db
+from app.models import TrackingFieldValue
+from app.custom_fields import backfill_custom_field_values
+import sys
+
+def backfill(rebuild=False):
+    app = create_app()
+    with app.app_context():
+        TrackingFieldValue.__table__.create(db.engine, checkfirst=True)
+
+        try:
+            written = backfill_custom_field_values(rebuild=rebuild)
+            print(f"✓ Custom field values backfilled ({written} rows)")
+        except Exception as e:
+            db.session.rollback()
+            print(f"✗ Backfill failed: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    backfill(rebuild='--rebuild' in sys.argv[1:])
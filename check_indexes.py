@@ -0,0 +1,30 @@
+#!/usr/bin/env python
+"""
+Run the index advisor: EXPLAIN the hot activity queries and report any full table or index scans.
+Exits non-zero if a query scans a whole table or index, so it can gate a deploy after migrate_tracking_indexes.py.
+"""
+
+from app import create_app
+from app.index_advisor import run_index_advisor
+import sys
+
+def check():
+    app = create_app()
+    with app.app_context():
+        results = run_index_advisor()
+
+    scans = 0
+    for result in results:
+        if result['full_scans']:
+            scans += 1
+            print(f"✗ {result['name']}: full scan of {', '.join(result['full_scans'])}")
+            for line in result['plan']:
+                print(f"    {line}")
+        else:
+            print(f"✓ {result['name']}")
+    return scans
+
+if __name__ == '__main__':
+    scans = check()
+    print(f"\n📊 {scans} checked queries scan a whole table or index" if scans else "\n📊 No full scans")
+    sys.exit(1 if scans else 0)
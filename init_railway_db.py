@@ -62,6 +62,18 @@ def init_db():
             print("\n→ Running database migrations...")
             from migrate_tracking_fields import upgrade
             upgrade()
+            from migrate_entry_sequence import upgrade as upgrade_entry_sequence
+            upgrade_entry_sequence()
+            from migrate_time_buckets import upgrade as upgrade_time_buckets
+            upgrade_time_buckets()
+            from migrate_tracking_indexes import upgrade as upgrade_tracking_indexes
+            upgrade_tracking_indexes()
+            from migrate_rollup_key import upgrade as upgrade_rollup_key
+            upgrade_rollup_key()
+            from migrate_custom_field_values import upgrade as upgrade_custom_field_values
+            upgrade_custom_field_values()
+            from migrate_user_department import upgrade as upgrade_user_department
+            upgrade_user_department()
             print("✓ Migrations applied successfully")
             
             # Check if departments exist, if not create them
@@ -0,0 +1,26 @@
+#!/usr/bin/env python
+"""
+Migration script to create the tracking_field_value table (typed, indexed copies of
+custom_fields_data, see app/custom_fields.py) and backfill it from existing entries.
+Safe to run repeatedly; only entries without values are backfilled.
+"""
+
+from app import create_app, db
+from app.custom_fields import backfill_custom_field_values
+from app.models import TrackingFieldValue
+
+def upgrade():
+    """Create the value table and its indexes, then backfill"""
+    app = create_app()
+    with app.app_context():
+        TrackingFieldValue.__table__.create(db.engine, checkfirst=True)
+        for index in TrackingFieldValue.__table__.indexes:
+            index.create(db.engine, checkfirst=True)
+        print("✓ tracking_field_value table ready")
+
+        written = backfill_custom_field_values()
+        print(f"✓ Backfilled {written} custom field values")
+
+if __name__ == '__main__':
+    upgrade()
+    print("\n📊 Migration completed!")
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+"""
+Migration script to add department.last_entry_no, the per-department entry number counter
+used by Department.allocate_entry_no(). Each department is backfilled with the larger of its
+entry count and the highest entry_no already stored. Safe to run repeatedly.
+"""
+
+from app import create_app, db
+from app.models import Department, DepartmentTracking
+from sqlalchemy import func, inspect, text
+import json
+
+def upgrade():
+    """Add the counter column and backfill it"""
+    app = create_app()
+    with app.app_context():
+        inspector = inspect(db.engine)
+        existing = [col["name"] for col in inspector.get_columns('department')]
+        if 'last_entry_no' in existing:
+            print("✓ department.last_entry_no already exists")
+        else:
+            db.session.execute(text("ALTER TABLE department ADD COLUMN last_entry_no INTEGER NOT NULL DEFAULT 0"))
+            db.session.commit()
+            print("✓ department.last_entry_no added")
+
+        last_numbers = dict(
+            db.session.query(DepartmentTracking.department_id, func.count(DepartmentTracking.id))
+            .group_by(DepartmentTracking.department_id).all()
+        )
+        numbered = db.session.query(DepartmentTracking.department_id, DepartmentTracking.custom_fields_data).filter(
+            DepartmentTracking.custom_fields_data.like('%"entry_no"%')
+        ).yield_per(1000)
+        for department_id, data in numbered:
+            try:
+                entry_no = int(json.loads(data).get('entry_no') or 0)
+            except (TypeError, ValueError):
+                continue
+            if entry_no > last_numbers.get(department_id, 0):
+                last_numbers[department_id] = entry_no
+
+        for department_id, last_entry_no in last_numbers.items():
+            Department.query.filter(
+                Department.id == department_id, Department.last_entry_no < last_entry_no
+            ).update({Department.last_entry_no: last_entry_no}, synchronize_session=False)
+        db.session.commit()
+        print(f"✓ Entry counters backfilled for {len(last_numbers)} departments")
+
+if __name__ == '__main__':
+    upgrade()
+    print("\n📊 Migration completed!")
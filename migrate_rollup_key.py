@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+"""
+Migration script to key activity_rollup by its dimension columns (uq_activity_rollup_key) so
+record_entry_in_rollup() can upsert with INSERT ... ON CONFLICT, and to backfill the rollup.
+Existing rows are rebuilt first: NULL priority/type/status become '' and duplicate keys are merged.
+
+This is also where an empty rollup is backfilled, once, in the release step; web workers never
+rebuild it. Safe to run repeatedly.
+"""
+
+from app import create_app, db
+from app.analytics import rebuild_activity_rollup, rollup_needs_backfill
+from app.models import ROLLUP_KEY_COLUMNS, ActivityRollup
+from sqlalchemy import inspect, text
+
+KEY_NAME = 'uq_activity_rollup_key'
+TEXT_COLUMNS = ('priority', 'ticket_request_type', 'status')
+
+def _has_key(inspector):
+    names = {c['name'] for c in inspector.get_unique_constraints('activity_rollup')}
+    names |= {i['name'] for i in inspector.get_indexes('activity_rollup') if i.get('unique')}
+    return KEY_NAME in names
+
+def upgrade():
+    """Rebuild the rollup and add its unique key if missing, otherwise backfill an empty rollup"""
+    app = create_app()
+    with app.app_context():
+        ActivityRollup.__table__.create(db.engine, checkfirst=True)
+
+        if _has_key(inspect(db.engine)):
+            print(f"✓ {KEY_NAME} already exists")
+            if rollup_needs_backfill():
+                row_count = rebuild_activity_rollup()
+                db.session.commit()
+                print(f"✓ Activity rollup backfilled ({row_count} rows)")
+            return
+
+        row_count = rebuild_activity_rollup()
+        columns = ', '.join(ROLLUP_KEY_COLUMNS)
+        if db.engine.dialect.name == 'postgresql':
+            for column in TEXT_COLUMNS:
+                db.session.execute(text(
+                    f"ALTER TABLE activity_rollup ALTER COLUMN {column} SET DEFAULT '', ALTER COLUMN {column} SET NOT NULL"
+                ))
+            db.session.execute(text(f"ALTER TABLE activity_rollup ADD CONSTRAINT {KEY_NAME} UNIQUE ({columns})"))
+        else:
+            # SQLite cannot add a constraint to an existing table; a unique index serves ON CONFLICT the same way
+            db.session.execute(text(f"CREATE UNIQUE INDEX {KEY_NAME} ON activity_rollup ({columns})"))
+        db.session.commit()
+        print(f"✓ Activity rollup rebuilt ({row_count} rows) and {KEY_NAME} added")
+
+if __name__ == '__main__':
+    upgrade()
+    print("\n📊 Migration completed!")
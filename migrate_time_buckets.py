@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""
+Migration script to add precomputed time bucket columns and their indexes:
+- department_tracking: log_day, log_weekday, log_hour
+- grievance: submitted_day, submitted_month, submitted_weekday, submitted_hour
+- activity_rollup: weekday
+Existing rows are backfilled in SQL and the activity rollup is rebuilt. Safe to run repeatedly.
+"""
+
+from app import create_app, db
+from app.analytics import fill_missing_tracking_buckets, rebuild_activity_rollup
+from app.buckets import day_bucket, hour_bucket, month_bucket, weekday_bucket
+from app.models import DepartmentTracking, Grievance, ActivityRollup
+from sqlalchemy import inspect, text
+
+NEW_COLUMNS = {
+    'department_tracking': [('log_day', 'DATE'), ('log_weekday', 'INTEGER'), ('log_hour', 'INTEGER')],
+    'grievance': [('submitted_day', 'DATE'), ('submitted_month', 'DATE'),
+                  ('submitted_weekday', 'INTEGER'), ('submitted_hour', 'INTEGER')],
+    'activity_rollup': [('weekday', 'INTEGER')],
+}
+
+def upgrade():
+    """Add bucket columns and indexes, then backfill"""
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        inspector = inspect(db.engine)
+
+        for table_name, columns in NEW_COLUMNS.items():
+            existing = [col["name"] for col in inspector.get_columns(table_name)]
+            for column_name, column_type in columns:
+                if column_name in existing:
+                    print(f"✓ {table_name}.{column_name} already exists")
+                    continue
+                db.session.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}"))
+                db.session.commit()
+                print(f"✓ {table_name}.{column_name} added")
+
+        for model in (DepartmentTracking, Grievance):
+            for index in model.__table__.indexes:
+                index.create(db.engine, checkfirst=True)
+        print("✓ Time bucket indexes created")
+
+        updated = fill_missing_tracking_buckets()
+        print(f"✓ Backfilled time buckets for {updated} tracking entries")
+
+        updated = Grievance.query.filter(Grievance.submitted_day.is_(None)).update({
+            Grievance.submitted_day: day_bucket(Grievance.submitted_at),
+            Grievance.submitted_month: month_bucket(Grievance.submitted_at),
+            Grievance.submitted_weekday: weekday_bucket(Grievance.submitted_at),
+            Grievance.submitted_hour: hour_bucket(Grievance.submitted_at)
+        }, synchronize_session=False)
+        print(f"✓ Backfilled time buckets for {updated} grievances")
+
+        # Rollup rows written before the weekday column existed are recomputed
+        if db.session.query(ActivityRollup.id).filter(ActivityRollup.weekday.is_(None)).first():
+            row_count = rebuild_activity_rollup()
+            print(f"✓ Activity rollup rebuilt ({row_count} rows)")
+
+        db.session.commit()
+
+if __name__ == '__main__':
+    upgrade()
+    print("\n📊 Migration completed!")
@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+"""
+Migration script to add the indexes on department_tracking and activity_rollup used by the
+hot activity queries (see DepartmentTracking/ActivityRollup.__table_args__). Safe to run repeatedly.
+Run check_indexes.py afterwards to confirm no analytics query does a full table or index scan.
+"""
+
+from app import create_app, db
+from app.models import ActivityRollup, DepartmentTracking
+from sqlalchemy import inspect
+
+def upgrade():
+    """Create any missing department_tracking and activity_rollup indexes"""
+    app = create_app()
+    with app.app_context():
+        inspector = inspect(db.engine)
+        for table in (DepartmentTracking.__table__, ActivityRollup.__table__):
+            if not inspector.has_table(table.name):
+                print(f"⚠ {table.name} does not exist yet, skipping")
+                continue
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing:
+                    print(f"✓ {index.name} already exists")
+                    continue
+                index.create(db.engine)
+                print(f"✓ {index.name} created")
+
+if __name__ == '__main__':
+    upgrade()
+    print("\n📊 Migration completed!")
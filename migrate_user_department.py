@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+"""
+Migration script to add user.department_id, an indexed foreign key to department, and
+backfill it from the user.department name column. Safe to run repeatedly.
+Users whose department name matches no department are listed and left unlinked.
+"""
+
+from app import create_app, db
+from app.models import Department, User
+from sqlalchemy import inspect, text
+
+def upgrade():
+    """Add the department_id column and index, then backfill"""
+    app = create_app()
+    with app.app_context():
+        inspector = inspect(db.engine)
+        existing = [col["name"] for col in inspector.get_columns('user')]
+        if 'department_id' in existing:
+            print("✓ user.department_id already exists")
+        else:
+            # "user" is a reserved word in PostgreSQL
+            db.session.execute(text('ALTER TABLE "user" ADD COLUMN department_id INTEGER REFERENCES department(id)'))
+            db.session.commit()
+            print("✓ user.department_id added")
+
+        for index in User.__table__.indexes:
+            index.create(db.engine, checkfirst=True)
+        print("✓ user.department_id index created")
+
+        department_id = db.select(Department.id).where(Department.name == User.department).scalar_subquery()
+        updated = User.query.filter(
+            User.department_id.is_(None), User.department.in_(db.select(Department.name))
+        ).update(
+            {User.department_id: department_id}, synchronize_session=False
+        )
+        db.session.commit()
+        print(f"✓ Linked {updated} users to their department")
+
+        unmatched = db.session.query(User.login_id, User.department).filter(User.department_id.is_(None)).all()
+        for login_id, department in unmatched:
+            print(f"  ⚠ {login_id}: no department named '{department}'")
+
+if __name__ == '__main__':
+    upgrade()
+    print("\n📊 Migration completed!")
@@ -0,0 +1,27 @@
+#!/usr/bin/env python
+"""
+Rebuild the ActivityRollup table from DepartmentTracking.
+Run this after bulk imports or manual data fixes so the management charts match the raw entries.
+"""
+
+from app import create_app, db
+from app.models import ActivityRollup
+from app.analytics import rebuild_activity_rollup
+
+def rebuild():
+    app = create_app()
+    with app.app_context():
+        # Make sure the rollup table exists
+        ActivityRollup.__table__.create(db.engine, checkfirst=True)
+
+        try:
+            row_count = rebuild_activity_rollup()
+            db.session.commit()
+            print(f"✓ Activity rollup rebuilt ({row_count} rows)")
+        except Exception as e:
+            db.session.rollback()
+            print(f"✗ Rollup rebuild failed: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    rebuild()
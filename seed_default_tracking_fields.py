@@ -4,6 +4,7 @@ Seed default tracking fields for each department.
 """
 
 from app import create_app, db
+from app.cache import SCHEMA_DATA, bump_data_version
 from app.models import Department, TrackingField
 from default_tracking_fields import get_default_tracking_fields_by_key, match_department_key
 
@@ -48,6 +49,9 @@ def seed_defaults():
                 db.session.add(field)
                 created += 1
 
+        # Running app workers reload their department and field cache
+        bump_data_version(SCHEMA_DATA)
+
         db.session.commit()
         print(f"Default fields added: {created}")
         print(f"Departments skipped (already configured or no match): {skipped}")
@@ -0,0 +1,89 @@
+"""
+Shared fixtures: an app on a fresh in-memory SQLite database with one department (two custom
+fields), an admin and a staff user, and a client that can log in as either.
+
+No app context is held open between requests, so every request gets its own g, as it would
+in production; wrap direct database access in app.app_context().
+"""
+
+from app import create_app, db
+from app.analytics import analytics_cache
+from app.cache import user_identity_cache
+from app.models import Department, TrackingField, User
+from app.routes import grievance_count_cache
+from types import SimpleNamespace
+import app.schema_cache as schema_cache
+import pytest
+
+
+@pytest.fixture
+def database_url():
+    """In-memory by default; override in a test module that needs a database other processes can open."""
+    return 'sqlite://'
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path, database_url):
+    monkeypatch.setenv('DATABASE_URL', database_url)
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False, EXPORT_JOB_DIR=str(tmp_path / 'exports'))
+
+    # Process-wide caches outlive a test database; start each test cold, with fresh counters
+    for cache in (analytics_cache, grievance_count_cache, user_identity_cache):
+        cache.clear()
+        cache.hits = cache.misses = cache.invalidations = 0
+    schema_cache._snapshot.update(version=None, by_id={}, by_name={})
+
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def data(app):
+    """Ids of the seeded department, its fields and users."""
+    with app.app_context():
+        dept = Department(name='IT - Daily Tracking', description='IT')
+        db.session.add(dept)
+        db.session.flush()
+        hours = TrackingField(department_id=dept.id, field_name='hours', field_type='number',
+                              field_label='Hours', is_required=False, order=1)
+        channel = TrackingField(department_id=dept.id, field_name='channel', field_type='select',
+                                field_label='Channel', is_required=False, order=2)
+        channel.set_choices(['Email', 'Phone'])
+        admin = User(name='Admin', employee_id='A1', department=dept.name, login_id='admin',
+                     password='x', is_admin=True)
+        staff = User(name='Staff', employee_id='S1', department=dept.name, login_id='staff', password='x')
+        db.session.add_all([hours, channel, admin, staff])
+        db.session.commit()
+        return SimpleNamespace(dept_id=dept.id, hours_id=hours.id, channel_id=channel.id,
+                               admin_id=admin.id, staff_id=staff.id)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def login(client):
+    """login(user_id): make client's session belong to that user."""
+    def login(user_id):
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+    return login
+
+
+@pytest.fixture
+def add_entry(client, login):
+    """add_entry(user_id, **form): log an entry through the add-entry form, as that user."""
+    def add_entry(user_id, **form):
+        login(user_id)
+        form.setdefault('activity_description', 'Handled a ticket')
+        response = client.post('/add-department-entry', data=form)
+        assert response.status_code == 302, response.get_data(as_text=True)[:500]
+    return add_entry
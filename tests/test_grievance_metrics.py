@@ -0,0 +1,84 @@
+from app import db
+from app.models import Grievance
+from datetime import datetime, timedelta
+from sqlalchemy import event
+
+GRIEVANCES = [
+    # status, ai_priority, ai_category, campaign, escalated
+    ('Open', 'High', 'Payroll', 'Alpha', False),
+    ('Open', 'Low', None, 'Alpha', True),
+    ('Resolved', 'High', 'Payroll', 'Beta', False),
+    ('Escalated', 'Medium', 'Harassment', 'Beta', True),
+    ('Resolved', 'Low', 'Harassment', 'Gamma', False),
+]
+
+
+def _add_grievances(app, submitted_at=None):
+    with app.app_context():
+        db.session.add_all([
+            Grievance(case_id=f'GRV-{i}', employee_name='E', employee_id=f'E{i}', contact_number='1',
+                      grievance_text='Text', status=status, ai_priority=priority, ai_category=category,
+                      campaign=campaign, escalated_to_senior_hr=escalated,
+                      submitted_at=submitted_at or datetime.utcnow())
+            for i, (status, priority, category, campaign, escalated) in enumerate(GRIEVANCES)
+        ])
+        db.session.commit()
+
+
+def test_metrics_match_per_column_counts(app, data, client, login):
+    _add_grievances(app)
+
+    login(data.admin_id)
+    response = client.get('/api/grievances/dashboard/metrics')
+    assert response.status_code == 200
+    metrics = response.get_json()['metrics']
+
+    assert (metrics['total_grievances'], metrics['open_cases'], metrics['resolved_cases'],
+            metrics['high_priority_cases'], metrics['escalated_cases']) == (5, 2, 2, 2, 2)
+    assert metrics['status_breakdown'] == {'Open': 2, 'Resolved': 2, 'Escalated': 1}
+    assert metrics['priority_breakdown'] == {'High': 2, 'Low': 2, 'Medium': 1}
+    assert metrics['category_breakdown'] == {'Payroll': 2, 'Harassment': 2, 'Unknown': 1}
+    assert metrics['campaign_breakdown'] == {'Alpha': 2, 'Beta': 2, 'Gamma': 1}
+
+
+def test_metrics_on_an_empty_table(data, client, login):
+    login(data.admin_id)
+    metrics = client.get('/api/grievances/dashboard/metrics').get_json()['metrics']
+    assert metrics['total_grievances'] == metrics['escalated_cases'] == 0
+    assert metrics['status_breakdown'] == {}
+
+
+def test_metrics_cost_one_aggregate_statement(app, data, client, login):
+    _add_grievances(app)
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM grievance' in statement:
+            statements.append(statement)
+
+    login(data.admin_id)
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        assert client.get('/api/grievances/dashboard/metrics').status_code == 200
+    finally:
+        with app.app_context():
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+    # The ETag watermark's max(id) plus the single aggregate pass
+    assert len(statements) == 2
+    assert sum('GROUP BY' in statement for statement in statements) == 1
+
+
+def test_monthly_totals_only_count_the_last_year(app, data, client, login):
+    _add_grievances(app, submitted_at=datetime.utcnow() - timedelta(days=800))
+    with app.app_context():
+        db.session.add(Grievance(case_id='GRV-new', employee_name='E', employee_id='E9', contact_number='1',
+                                 campaign='Alpha', grievance_text='Text', status='Open', submitted_at=datetime.utcnow()))
+        db.session.commit()
+        month = str(Grievance.query.filter_by(case_id='GRV-new').one().submitted_month)
+
+    login(data.admin_id)
+    metrics = client.get('/api/grievances/dashboard/metrics').get_json()['metrics']
+    assert metrics['total_grievances'] == 6
+    assert metrics['monthly_totals'] == [{'month': month, 'count': 1}]
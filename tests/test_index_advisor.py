@@ -0,0 +1,19 @@
+from app import db
+from app.index_advisor import explain, run_index_advisor
+from app.models import ActivityRollup
+
+
+def test_hot_queries_use_an_index_search(app, data, add_entry):
+    add_entry(data.staff_id, hours=2, channel='Email', duration_mins=10)
+
+    with app.app_context():
+        results = run_index_advisor()
+    assert results
+    assert {r['name']: r['full_scans'] for r in results if r['full_scans']} == {}
+
+
+def test_full_index_scans_are_reported(app):
+    with app.app_context():
+        # Ordering the whole table by an indexed column walks the full index
+        _, plan, full_scans = explain(db.select(ActivityRollup.day).order_by(ActivityRollup.day))
+    assert full_scans, plan
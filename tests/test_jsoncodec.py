@@ -0,0 +1,45 @@
+from app.jsoncodec import loads_many
+from app.models import DepartmentTracking, TrackingField
+import json
+import pytest
+
+
+def test_loads_many_keeps_order_and_fills_empty_rows():
+    decoded = loads_many(['{"a": 1}', None, '', '{"b": [2]}'])
+    assert decoded == [{'a': 1}, {}, {}, {'b': [2]}]
+    assert decoded[1] is not decoded[2]
+
+
+def test_loads_many_custom_empty():
+    assert loads_many([None, '["x"]'], empty=list) == [[], ['x']]
+
+
+def test_loads_many_does_not_let_a_bad_row_shift_the_batch():
+    # '1,2' splices into the array as two documents; each row must still decode on its own
+    with pytest.raises(ValueError):
+        loads_many(['{"a": 1}', '1,2'])
+
+
+def test_loads_many_raises_for_malformed_json():
+    with pytest.raises(ValueError):
+        loads_many(['{"a": 1}', '{oops'])
+
+
+def test_custom_fields_data_is_decoded_again_after_a_change():
+    entry = DepartmentTracking()
+    entry.set_custom_fields_data({'hours': 1})
+    assert entry.get_custom_fields_data() == {'hours': 1}
+
+    entry.set_custom_fields_data({'hours': 2})
+    assert entry.get_custom_fields_data() == {'hours': 2}
+
+    entry.custom_fields_data = json.dumps({'hours': 3})  # assigned directly, as a load from the database would
+    assert entry.get_custom_fields_data() == {'hours': 3}
+
+
+def test_choices_are_decoded_again_after_a_change():
+    field = TrackingField()
+    field.set_choices(['Email'])
+    assert field.get_choices() == ['Email']
+    field.choices = json.dumps(['Phone'])
+    assert field.get_choices() == ['Phone']
@@ -0,0 +1,104 @@
+from app import db
+from app.models import DepartmentTracking, Grievance
+from app.pagination import decode_cursor, keyset_page
+from datetime import datetime, timedelta
+import pytest
+
+
+@pytest.fixture
+def entries(app, data):
+    """Ids of 11 entries, newest first; several share a timestamp so paging must break ties on id."""
+    base = datetime(2026, 1, 1, 9, 0)
+    with app.app_context():
+        rows = [DepartmentTracking(user_id=data.staff_id, department_id=data.dept_id,
+                                   activity_description=f'Entry {i}', date_logged=base + timedelta(hours=i // 3))
+                for i in range(11)]
+        db.session.add_all(rows)
+        db.session.commit()
+        return [e.id for e in sorted(rows, key=lambda e: (e.date_logged, e.id), reverse=True)]
+
+
+def _walk(direction, cursor=None, per_page=4):
+    pages = []
+    query = DepartmentTracking.query
+    while True:
+        items, next_cursor, prev_cursor = keyset_page(
+            query, DepartmentTracking.date_logged, DepartmentTracking.id, per_page, cursor
+        )
+        pages.append([e.id for e in items])
+        cursor = next_cursor if direction == 'next' else prev_cursor
+        if cursor is None:
+            return pages, next_cursor, prev_cursor
+
+
+def test_next_cursors_visit_every_row_once_in_order(app, entries):
+    with app.app_context():
+        pages, _, _ = _walk('next')
+    assert [len(p) for p in pages] == [4, 4, 3]
+    assert [entry_id for page in pages for entry_id in page] == entries
+
+
+def test_prev_cursors_walk_back_to_the_first_page(app, entries):
+    with app.app_context():
+        forward, _, last_prev = _walk('next')
+        backward, _, _ = _walk('prev', cursor=last_prev)
+    assert backward == forward[-2::-1]
+
+
+def test_first_page_has_no_prev_and_last_page_no_next(app, entries):
+    with app.app_context():
+        _, next_cursor, prev_cursor = keyset_page(
+            DepartmentTracking.query, DepartmentTracking.date_logged, DepartmentTracking.id, 20
+        )
+    assert next_cursor is None and prev_cursor is None
+
+
+def test_malformed_cursor_is_rejected(app):
+    with pytest.raises(ValueError):
+        decode_cursor('not-a-cursor', DepartmentTracking.date_logged)
+
+
+def test_grievance_list_pages_by_cursor(app, data, client, login):
+    base = datetime(2026, 2, 1)
+    with app.app_context():
+        db.session.add_all([
+            Grievance(case_id=f'GRV-{i}', employee_name='E', employee_id=f'E{i}', campaign='Alpha',
+                      contact_number='1', grievance_text='Text', submitted_at=base + timedelta(days=i // 2))
+            for i in range(7)
+        ])
+        db.session.commit()
+
+    login(data.admin_id)
+    seen, cursor = [], None
+    while True:
+        url = '/api/grievances?per_page=3' + (f'&cursor={cursor}' if cursor else '')
+        body = client.get(url).get_json()
+        assert body['total'] == 7
+        seen += [g['case_id'] for g in body['grievances']]
+        cursor = body['next_cursor']
+        if cursor is None:
+            break
+    assert sorted(seen) == [f'GRV-{i}' for i in range(7)]
+    assert len(seen) == len(set(seen))
+
+    assert client.get('/api/grievances?cursor=bogus').status_code == 400
+
+
+def test_department_history_pages_only_the_current_users_entries(app, data, entries, client, login):
+    with app.app_context():
+        db.session.add(DepartmentTracking(user_id=data.admin_id, department_id=data.dept_id,
+                                          activity_description='Admin entry', date_logged=datetime(2026, 1, 2)))
+        db.session.commit()
+
+    login(data.staff_id)
+    seen, cursor = [], None
+    while True:
+        url = f'/api/department/{data.dept_id}/history?per_page=5' + (f'&cursor={cursor}' if cursor else '')
+        body = client.get(url).get_json()
+        seen += [e['id'] for e in body['entries']]
+        cursor = body['next_cursor']
+        if cursor is None:
+            break
+    assert seen == entries
+
+    assert client.get(f'/api/department/{data.dept_id}/history?cursor=bogus').status_code == 400
@@ -0,0 +1,57 @@
+from app import db
+from app.analytics import department_stats, rebuild_activity_rollup, user_activity_totals
+from app.models import ActivityRollup, Department, DepartmentTracking
+from sqlalchemy import func
+
+
+def _rollup_totals():
+    return db.session.query(
+        func.coalesce(func.sum(ActivityRollup.entry_count), 0),
+        func.coalesce(func.sum(ActivityRollup.duration_total), 0)
+    ).one()
+
+
+def _entry_totals():
+    return db.session.query(
+        func.count(DepartmentTracking.id),
+        func.coalesce(func.sum(DepartmentTracking.duration_mins), 0)
+    ).one()
+
+
+def test_rollup_matches_entries_after_inserts(app, data, add_entry):
+    add_entry(data.staff_id, priority='High', duration_mins=30)
+    add_entry(data.staff_id, priority='High', duration_mins=45)
+    add_entry(data.admin_id, priority='Low', duration_mins=10, status='Pending')
+
+    with app.app_context():
+        assert tuple(_rollup_totals()) == tuple(_entry_totals()) == (3, 85)
+        assert user_activity_totals(data.staff_id, data.dept_id) == (2, 75)
+        stats = department_stats(Department.query.all())
+        assert stats['total_entries'] == 3
+        assert stats['total_duration'] == 85
+
+
+def test_rollup_drops_deleted_users_entries(app, data, add_entry, client, login):
+    add_entry(data.staff_id, duration_mins=20)
+    add_entry(data.staff_id, duration_mins=25)
+    add_entry(data.admin_id, duration_mins=5)
+
+    login(data.admin_id)
+    assert client.post(f'/admin/delete-user/{data.staff_id}').status_code == 302
+
+    with app.app_context():
+        assert tuple(_rollup_totals()) == tuple(_entry_totals()) == (1, 5)
+
+
+def test_rebuild_reproduces_incremental_rollup(app, data, add_entry):
+    add_entry(data.staff_id, priority='High', duration_mins=30)
+    add_entry(data.staff_id, priority='High', duration_mins=40)
+    add_entry(data.admin_id, priority='Medium', duration_mins=15)
+
+    columns = (ActivityRollup.day, ActivityRollup.hour, ActivityRollup.department_id, ActivityRollup.user_id,
+               ActivityRollup.priority, ActivityRollup.entry_count, ActivityRollup.duration_total)
+    with app.app_context():
+        incremental = sorted(db.session.query(*columns).all())
+        rebuild_activity_rollup()
+        db.session.commit()
+        assert sorted(db.session.query(*columns).all()) == incremental
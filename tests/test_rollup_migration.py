@@ -0,0 +1,71 @@
+from app import db
+from app.models import ActivityRollup, DepartmentTracking
+from datetime import datetime
+from sqlalchemy import func, inspect, text
+import migrate_rollup_key
+import pytest
+
+LEGACY_TABLE = """
+CREATE TABLE activity_rollup (
+    id INTEGER PRIMARY KEY, day DATE NOT NULL, weekday INTEGER NOT NULL, hour INTEGER NOT NULL,
+    department_id INTEGER NOT NULL, user_id INTEGER NOT NULL, priority VARCHAR(50),
+    ticket_request_type VARCHAR(200), status VARCHAR(50),
+    entry_count INTEGER NOT NULL, duration_total INTEGER NOT NULL
+)
+"""
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    # The migration opens the database through its own create_app()
+    return f"sqlite:///{tmp_path / 'rollup.db'}"
+
+
+def _totals():
+    return db.session.query(func.sum(ActivityRollup.entry_count), func.sum(ActivityRollup.duration_total)).one()
+
+
+def test_migration_merges_legacy_rows_and_adds_the_key(app, data):
+    logged = datetime(2026, 3, 2, 10, 15)
+    with app.app_context():
+        for minutes in (10, 20):
+            db.session.add(DepartmentTracking(user_id=data.staff_id, department_id=data.dept_id,
+                                              activity_description='Legacy', duration_mins=minutes, date_logged=logged))
+        ActivityRollup.__table__.drop(db.engine)
+        db.session.execute(text(LEGACY_TABLE))
+        # What two racing first writes left behind: the same NULL-priority key twice
+        for minutes in (10, 20):
+            db.session.execute(text(
+                "INSERT INTO activity_rollup (day, weekday, hour, department_id, user_id, entry_count, duration_total) "
+                f"VALUES ('2026-03-02', 1, 10, {data.dept_id}, {data.staff_id}, 1, {minutes})"
+            ))
+        db.session.commit()
+
+    migrate_rollup_key.upgrade()
+    migrate_rollup_key.upgrade()  # safe to run again
+
+    with app.app_context():
+        assert 'uq_activity_rollup_key' in {i['name'] for i in inspect(db.engine).get_indexes('activity_rollup')}
+        assert db.session.query(ActivityRollup.priority, ActivityRollup.entry_count).all() == [('', 2)]
+        assert tuple(_totals()) == (2, 30)
+
+
+def test_migration_backfills_an_empty_rollup(app, data, add_entry):
+    add_entry(data.staff_id, duration_mins=15)
+    with app.app_context():
+        ActivityRollup.query.delete()
+        db.session.commit()
+
+    migrate_rollup_key.upgrade()
+
+    with app.app_context():
+        assert tuple(_totals()) == (1, 15)
+
+
+def test_first_writes_for_a_key_upsert_into_one_row(app, data, add_entry):
+    add_entry(data.staff_id, duration_mins=5)
+    add_entry(data.staff_id, duration_mins=7)
+
+    with app.app_context():
+        assert ActivityRollup.query.count() == 1
+        assert tuple(_totals()) == (2, 12)
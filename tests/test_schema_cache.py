@@ -0,0 +1,48 @@
+from app import db
+from app.cache import SCHEMA_DATA, bump_data_version
+from app.models import TrackingField
+from app.schema_cache import get_department, get_department_by_name
+
+
+def _relabel_elsewhere(app, field_id, label):
+    """Change a field the way another worker would: in the database, with a SCHEMA_DATA bump."""
+    with app.app_context():
+        db.session.get(TrackingField, field_id).field_label = label
+        bump_data_version(SCHEMA_DATA)
+        db.session.commit()
+
+
+def _labels(department):
+    return [f.field_label for f in department.tracking_fields]
+
+
+def test_snapshot_has_fields_in_display_order(app, data):
+    with app.test_request_context():
+        department = get_department(data.dept_id)
+        assert _labels(department) == ['Hours', 'Channel']
+        assert department.tracking_fields[1].get_choices() == ['Email', 'Phone']
+        assert get_department_by_name('IT - Daily Tracking') is department
+        assert get_department(999) is None
+
+
+def test_version_is_read_once_per_request(app, data):
+    with app.test_request_context():
+        assert _labels(get_department(data.dept_id))[0] == 'Hours'
+        _relabel_elsewhere(app, data.hours_id, 'Hours spent')
+        assert _labels(get_department(data.dept_id))[0] == 'Hours'
+
+    with app.test_request_context():
+        assert _labels(get_department(data.dept_id))[0] == 'Hours spent'
+
+
+def test_another_workers_field_change_reaches_the_form(app, data, client, login):
+    login(data.staff_id)
+    assert 'Hours' in client.get('/add-department-entry').get_data(as_text=True)
+
+    with app.app_context():
+        db.session.add(TrackingField(department_id=data.dept_id, field_name='ticket_ref', field_type='text',
+                                     field_label='Ticket reference', is_required=False, order=3))
+        bump_data_version(SCHEMA_DATA)
+        db.session.commit()
+
+    assert 'Ticket reference' in client.get('/add-department-entry').get_data(as_text=True)
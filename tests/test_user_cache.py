@@ -0,0 +1,73 @@
+from app import db
+from app.cache import USER_DATA, TTLCache, bump_data_version, user_identity_cache
+from app.models import DepartmentTracking, User
+import time
+
+
+def _change_elsewhere(app, user_id, delete=False, **changes):
+    """Edit or delete a user the way another worker would: in the database, with a USER_DATA bump."""
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        if delete:
+            db.session.delete(user)
+        else:
+            for name, value in changes.items():
+                setattr(user, name, value)
+        bump_data_version(USER_DATA)
+        db.session.commit()
+
+
+def test_ttl_cache_versions_and_expiry():
+    cache = TTLCache(ttl=0.05)
+    cache.set('k', 'v', version=1)
+    assert cache.get('k', version=1) == 'v'
+    assert cache.get('k', version=2) is None
+    assert cache.get('k', version=1) is None  # a version mismatch drops the entry
+
+    cache.set('k', 'v', version=1)
+    time.sleep(0.06)
+    assert cache.get('k', version=1) is None
+    assert cache.stats()['expirations'] == 1
+
+
+def test_identity_is_served_from_cache(data, client, login):
+    login(data.admin_id)
+    for _ in range(3):
+        assert client.get('/debug/user-cache').status_code == 200
+    assert user_identity_cache.stats()['hits'] == 2
+
+
+def test_admin_demoted_on_another_worker_loses_access_at_once(app, data, client, login):
+    login(data.admin_id)
+    assert client.get('/debug/user-cache').status_code == 200
+
+    _change_elsewhere(app, data.admin_id, is_admin=False)
+    assert client.get('/debug/user-cache').status_code == 403
+
+
+def test_user_deleted_on_another_worker_is_logged_out(app, data, client, login):
+    login(data.staff_id)
+    assert client.get(f'/api/department/{data.dept_id}/history').status_code == 200
+
+    with app.app_context():
+        DepartmentTracking.query.filter_by(user_id=data.staff_id).delete()
+        db.session.commit()
+    _change_elsewhere(app, data.staff_id, delete=True)
+
+    response = client.get(f'/api/department/{data.dept_id}/history')
+    assert response.status_code == 302
+    assert '/login' in response.headers['Location']
+
+
+def test_admin_edit_applies_to_cached_identity(app, data, client, login):
+    login(data.staff_id)
+    client.get(f'/api/department/{data.dept_id}/history')
+
+    login(data.admin_id)
+    response = client.post(f'/admin/edit-user/{data.staff_id}', data={
+        'name': 'Staff', 'employee_id': 'S1', 'login_id': 'staff', 'department': data.dept_id, 'is_admin': 'y'
+    })
+    assert response.status_code == 302
+
+    login(data.staff_id)
+    assert client.get('/debug/user-cache').status_code == 200
@@ -0,0 +1,80 @@
+from app import db
+from app.models import Department, User
+from sqlalchemy import event
+import pytest
+
+
+@pytest.fixture
+def departments(app, data):
+    """Two more departments: HR with one user, Finance with none."""
+    with app.app_context():
+        hr = Department(name='HR - Daily Tracking', description='HR')
+        finance = Department(name='Finance - Daily Tracking', description='Finance')
+        db.session.add_all([hr, finance])
+        db.session.flush()
+        db.session.add(User(name='Hana', employee_id='H1', department=hr.name, login_id='hana', password='x'))
+        db.session.commit()
+        return hr.id, finance.id
+
+
+def test_department_id_is_filled_from_the_name(app, data, departments):
+    with app.app_context():
+        assert db.session.get(User, data.staff_id).department_id == data.dept_id
+        hana = User.query.filter_by(login_id='hana').one()
+        assert hana.department_id == departments[0]
+
+        hana.department = 'IT - Daily Tracking'
+        db.session.commit()
+        assert hana.department_id == data.dept_id
+
+
+def test_explicit_department_id_is_kept(app, data, departments):
+    with app.app_context():
+        user = User(name='Mixed', employee_id='M1', department='IT - Daily Tracking',
+                    department_id=departments[1], login_id='mixed', password='x')
+        db.session.add(user)
+        db.session.commit()
+        assert user.department_id == departments[1]
+
+
+def _user_count_statements(app, client, url):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM user' in statement and 'count(' in statement.lower():
+            statements.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(url)
+    finally:
+        with app.app_context():
+            event.remove(db.engine, 'before_cursor_execute', record)
+    assert response.status_code == 200
+    return response.get_json(), statements
+
+
+def test_users_by_dept_counts_every_department_in_one_query(app, data, departments, client, login):
+    login(data.admin_id)
+    payload, statements = _user_count_statements(app, client, '/api/management/users-by-dept?mode=all')
+
+    assert dict(zip(payload['labels'], payload['counts'])) == {
+        'IT - Daily Tracking': 2, 'HR - Daily Tracking': 1, 'Finance - Daily Tracking': 0
+    }
+    assert payload['mode'] == 'all'
+    assert len(statements) == 1 and 'GROUP BY' in statements[0]
+
+
+def test_department_stats_report_user_counts(app, data, departments, add_entry, client, login):
+    add_entry(data.staff_id, duration_mins=30)
+
+    login(data.admin_id)
+    payload, statements = _user_count_statements(app, client, '/debug/department-stats')
+
+    stats = {s['name']: s for s in payload['department_stats']}
+    assert {name: s['users_count'] for name, s in stats.items()} == {
+        'IT - Daily Tracking': 2, 'HR - Daily Tracking': 1, 'Finance - Daily Tracking': 0
+    }
+    assert (stats['IT - Daily Tracking']['total_entries'], payload['total_entries'], payload['departments_count']) == (1, 1, 3)
+    assert len(statements) == 1
@@ -4,6 +4,7 @@ Script to update admin user's department to Management
 """
 
 from app import create_app, db
+from app.cache import USER_DATA, bump_data_version
 from app.models import User, Department
 
 def update_admin_department():
@@ -37,6 +38,8 @@ def update_admin_department():
                 print(f"User '{admin.name}' (ID: {admin.id}) already in Management department")
         
         if updated_count > 0:
+            # Running workers reload their cached login identities
+            bump_data_version(USER_DATA)
             db.session.commit()
             print(f"\n✓ Successfully updated {updated_count} admin user(s) to Management department.")
         else:
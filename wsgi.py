@@ -52,6 +52,9 @@ with app.app_context():
             db.session.add(admin)
             db.session.commit()
             print("Created default admin user")
+        
+        # The activity rollup and custom field values are backfilled by the release step
+        # (init_railway_db.py), never here: every worker runs this block concurrently
     except Exception as e:
         print(f"Warning: Database initialization issue: {e}")
 